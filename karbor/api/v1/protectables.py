@@ -195,14 +195,9 @@ class ProtectablesController(wsgi.Controller):
             filters=filters, offset=offset, parameters=parameters)
 
         for instance in instances:
-            protectable_id = instance.get("id")
             instance["type"] = protectable_type
-            protectable_name = instance.get("name", None)
-            if protectable_id is None:
+            if instance.get("id") is None:
                 raise exception.InvalidProtectableInstance()
-            dependents = self.protection_api.list_protectable_dependents(
-                context, protectable_id, protectable_type, protectable_name)
-            instance["dependent_resources"] = dependents
 
         retval_instances = self._view_builder.detail_list(req, instances)
 
@@ -229,7 +224,9 @@ class ProtectablesController(wsgi.Controller):
         if filters:
             LOG.debug("Searching by: %s.", six.text_type(filters))
 
-        instances = self.protection_api.list_protectable_instances(
+        list_instances = (
+            self.protection_api.list_protectable_instances_with_dependents)
+        instances = list_instances(
             context, protectable_type, marker, limit,
             sort_keys=sort_keys,
             sort_dirs=sort_dirs,
@@ -26,6 +26,8 @@ import karbor.services.operationengine.engine.triggers.timetrigger as time_trigg
 import karbor.services.operationengine.karbor_client
 import karbor.services.operationengine.manager
 import karbor.services.operationengine.operations.base as base
+import karbor.services.protection.checkpoint
+import karbor.services.protection.client_factory
 import karbor.services.protection.clients.cinder
 import karbor.services.protection.clients.glance
 import karbor.services.protection.clients.manila
@@ -33,7 +35,11 @@ import karbor.services.protection.clients.neutron
 import karbor.services.protection.clients.nova
 import karbor.services.protection.flows.restore
 import karbor.services.protection.flows.worker
+import karbor.services.protection.flows.workflow
 import karbor.services.protection.manager
+import karbor.services.protection.protectable_registry as protectable_registry  # noqa
+import karbor.services.protection.rpcapi
+import karbor.services.protection.status_notifications as status_notifications  # noqa
 import karbor.wsgi.eventlet_server
 
 __all__ = ['list_opts']
@@ -61,6 +67,7 @@ _opts = [
     ('nova_client', list(itertools.chain(
         karbor.common.config.service_client_opts,
         karbor.services.protection.clients.nova.nova_client_opts))),
+    ('upgrade_levels', [karbor.services.protection.rpcapi.rpcapi_cap_opt]),
     ('DEFAULT', list(itertools.chain(
         karbor.common.config.core_opts,
         karbor.common.config.debug_opts,
@@ -73,8 +80,13 @@ _opts = [
         thread_pool_executor.executor_opts,
         time_trigger.time_trigger_opts,
         base.record_operation_log_executor_opts,
+        karbor.services.protection.checkpoint.checkpoint_opts,
+        karbor.services.protection.client_factory.client_factory_opts,
+        protectable_registry.protectable_registry_opts,
+        status_notifications.status_notifications_opts,
         karbor.services.protection.flows.restore.sync_status_opts,
         karbor.services.protection.flows.worker.workflow_opts,
+        karbor.services.protection.flows.workflow.flow_executor_opts,
         karbor.services.protection.manager.protection_manager_opts,
         karbor.wsgi.eventlet_server.socket_opts,
         karbor.exception.exc_log_opts,
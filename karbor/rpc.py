@@ -21,6 +21,7 @@ __all__ = [
     'get_client',
     'get_server',
     'get_notifier',
+    'get_notification_listener',
 ]
 
 from oslo_config import cfg
@@ -142,3 +143,12 @@ def get_notifier(service=None, host=None, publisher_id=None):
     if not publisher_id:
         publisher_id = "%s.%s" % (service, host or CONF.host)
     return NOTIFIER.prepare(publisher_id=publisher_id)
+
+
+def get_notification_listener(targets, endpoints, pool=None):
+    assert NOTIFICATION_TRANSPORT is not None
+    return messaging.get_notification_listener(NOTIFICATION_TRANSPORT,
+                                               targets,
+                                               endpoints,
+                                               executor='eventlet',
+                                               pool=pool)
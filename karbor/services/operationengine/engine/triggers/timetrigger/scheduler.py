@@ -0,0 +1,180 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from datetime import datetime
+import heapq
+import itertools
+
+import eventlet
+from eventlet import event
+from eventlet import greenpool
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+LOG = logging.getLogger(__name__)
+
+# The stale heap entries, left by cancelled and rescheduled triggers, are
+# dropped once they outnumber the live ones and this minimum.
+_MIN_COMPACT_SIZE = 64
+
+
+def _get_delay(now, run_time):
+    """Whole seconds until run_time, the resolution of the time triggers"""
+    if run_time <= now:
+        return 0
+    return int(timeutils.delta_seconds(now, run_time))
+
+
+class ScheduledTrigger(object):
+    """A function run by the scheduler at the run times it returns
+
+    The function is called with its expected run time, and returns the next
+    one, or None when it is done.
+    """
+
+    def __init__(self, scheduler, function):
+        super(ScheduledTrigger, self).__init__()
+        self._scheduler = scheduler
+        self._function = function
+        self._running = True
+        self._pre_run_time = None
+        # The sequence number of the live heap entry of the trigger
+        self._seq = None
+
+    def kill(self):
+        if not self._running:
+            return
+        self._running = False
+        self._pre_run_time = None
+        self._scheduler._cancel(self)
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def pre_run_time(self):
+        return self._pre_run_time
+
+
+class TriggerScheduler(object):
+    """Run the functions of all the time triggers from one green thread
+
+    The next run times of the triggers are kept in a heap. The scheduler
+    thread sleeps until the earliest one, then runs every due function in a
+    green pool. A function is scheduled again at the run time it returns,
+    once it is done.
+
+    Cancelled entries are left in the heap and skipped when popped, so
+    that scheduling and cancelling are O(log n).
+    """
+
+    def __init__(self, pool_size=1000):
+        super(TriggerScheduler, self).__init__()
+        self._heap = []
+        self._counter = itertools.count()
+        self._stale = 0
+        self._pool = greenpool.GreenPool(pool_size)
+        self._thread = None
+        self._wakeup = None
+
+    def schedule(self, first_run_time, function):
+        """Run function at first_run_time, then at the times it returns"""
+        trigger = ScheduledTrigger(self, function)
+        self._push(first_run_time, trigger)
+        return trigger
+
+    def stats(self):
+        return {
+            'scheduled': len(self._heap) - self._stale,
+            'running': self._pool.running(),
+        }
+
+    def _push(self, run_time, trigger):
+        trigger._seq = next(self._counter)
+        entry = (run_time, trigger._seq, trigger)
+        heapq.heappush(self._heap, entry)
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+        elif self._heap[0] is entry and self._wakeup is not None and (
+                not self._wakeup.ready()):
+            # The new entry is the earliest, stop sleeping until the former
+            self._wakeup.send()
+
+    def _cancel(self, trigger):
+        if trigger._seq is None:
+            return
+        trigger._seq = None
+        self._stale += 1
+        if self._stale > _MIN_COMPACT_SIZE and (
+                self._stale * 2 > len(self._heap)):
+            self._heap = [entry for entry in self._heap
+                          if entry[1] == entry[2]._seq]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and _get_delay(now, self._heap[0][0]) == 0:
+            run_time, seq, trigger = heapq.heappop(self._heap)
+            if seq != trigger._seq:
+                self._stale -= 1
+                continue
+            trigger._seq = None
+            due.append((run_time, trigger))
+        return due
+
+    def _run(self):
+        try:
+            while self._heap:
+                for run_time, trigger in self._pop_due(datetime.utcnow()):
+                    self._pool.spawn_n(self._run_trigger, run_time, trigger)
+                if not self._heap:
+                    break
+                delay = _get_delay(datetime.utcnow(), self._heap[0][0])
+                if delay > 0:
+                    self._wakeup = event.Event()
+                    with eventlet.Timeout(delay, False):
+                        self._wakeup.wait()
+                    self._wakeup = None
+        finally:
+            # Restarted when a trigger is scheduled again
+            self._thread = None
+
+    def _run_trigger(self, run_time, trigger):
+        if not trigger.running:
+            return
+        trigger._pre_run_time = run_time
+        try:
+            next_run_time = trigger._function(run_time)
+        except Exception:
+            LOG.exception("Running the time trigger function %s failed",
+                          trigger._function)
+            next_run_time = None
+        if not trigger.running:
+            return
+        if next_run_time is None:
+            trigger._running = False
+            trigger._pre_run_time = None
+            return
+        self._push(next_run_time, trigger)
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Return the scheduler shared by the time triggers"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TriggerScheduler()
+    return _scheduler
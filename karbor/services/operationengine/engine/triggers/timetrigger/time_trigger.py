@@ -12,7 +12,6 @@
 
 from datetime import datetime
 from datetime import timedelta
-import eventlet
 import functools
 
 from oslo_config import cfg
@@ -22,71 +21,14 @@ from oslo_utils import timeutils
 from karbor import exception
 from karbor.i18n import _
 from karbor.services.operationengine.engine import triggers
+from karbor.services.operationengine.engine.triggers.timetrigger import \
+    scheduler
 from karbor.services.operationengine.engine.triggers.timetrigger import utils
 
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
-class TriggerOperationGreenThread(object):
-    def __init__(self, first_run_time, function):
-        super(TriggerOperationGreenThread, self).__init__()
-        self._is_sleeping = True
-        self._pre_run_time = None
-        self._running = False
-        self._thread = None
-
-        self._function = function
-
-        self._start(first_run_time)
-
-    def kill(self):
-        self._running = False
-        if self._is_sleeping:
-            self._thread.kill()
-
-    @property
-    def running(self):
-        return self._running
-
-    @property
-    def pre_run_time(self):
-        return self._pre_run_time
-
-    def _start(self, first_run_time):
-        self._running = True
-
-        now = datetime.utcnow()
-        initial_delay = 0 if first_run_time <= now else (
-            int(timeutils.delta_seconds(now, first_run_time)))
-
-        self._thread = eventlet.spawn_after(
-            initial_delay, self._run, first_run_time)
-        self._thread.link(self._on_done)
-
-    def _on_done(self, gt, *args, **kwargs):
-        self._is_sleeping = True
-        self._pre_run_time = None
-        self._running = False
-        self._thread = None
-
-    def _run(self, expect_run_time):
-        while self._running:
-            self._is_sleeping = False
-            self._pre_run_time = expect_run_time
-
-            expect_run_time = self._function(expect_run_time)
-            if expect_run_time is None or not self._running:
-                break
-
-            self._is_sleeping = True
-
-            now = datetime.utcnow()
-            idle_time = 0 if expect_run_time <= now else int(
-                timeutils.delta_seconds(now, expect_run_time))
-            eventlet.sleep(idle_time)
-
-
 class TimeTrigger(triggers.BaseTrigger):
     TRIGGER_TYPE = "time"
     IS_ENABLED = (CONF.scheduling_strategy == 'default')
@@ -98,22 +40,22 @@ class TimeTrigger(triggers.BaseTrigger):
         self._trigger_property = self.check_trigger_definition(
             trigger_property)
 
-        self._greenthread = None
+        self._schedule = None
 
     def shutdown(self):
-        self._kill_greenthread()
+        self._cancel_schedule()
 
     def register_operation(self, operation_id, **kwargs):
         if operation_id in self._operation_ids:
             msg = (_("The operation_id(%s) is exist") % operation_id)
             raise exception.ScheduledOperationExist(msg)
 
-        if self._greenthread and not self._greenthread.running:
+        if self._schedule and not self._schedule.running:
             raise exception.TriggerIsInvalid(trigger_id=self._id)
 
         self._operation_ids.add(operation_id)
-        if self._greenthread is None:
-            self._start_greenthread()
+        if self._schedule is None:
+            self._start_schedule()
 
     def unregister_operation(self, operation_id, **kwargs):
         if operation_id not in self._operation_ids:
@@ -121,7 +63,7 @@ class TimeTrigger(triggers.BaseTrigger):
 
         self._operation_ids.remove(operation_id)
         if 0 == len(self._operation_ids):
-            self._kill_greenthread()
+            self._cancel_schedule()
 
     def update_trigger_property(self, trigger_property):
         valid_trigger_property = self.check_trigger_definition(
@@ -138,8 +80,8 @@ class TimeTrigger(triggers.BaseTrigger):
                      "Can not find the first run time"))
             raise exception.InvalidInput(msg)
 
-        if self._greenthread is not None:
-            pre_run_time = self._greenthread.pre_run_time
+        if self._schedule is not None:
+            pre_run_time = self._schedule.pre_run_time
             if pre_run_time:
                 end_time = pre_run_time + timedelta(
                     seconds=self._trigger_property['window'])
@@ -152,17 +94,17 @@ class TimeTrigger(triggers.BaseTrigger):
         self._trigger_property = valid_trigger_property
 
         if len(self._operation_ids) > 0:
-            # Restart greenthread to take the change of trigger property
+            # Reschedule the trigger to take the change of trigger property
             # effect immediately
-            self._kill_greenthread()
-            self._create_green_thread(first_run_time, timer)
+            self._cancel_schedule()
+            self._create_schedule(first_run_time, timer)
 
-    def _kill_greenthread(self):
-        if self._greenthread:
-            self._greenthread.kill()
-            self._greenthread = None
+    def _cancel_schedule(self):
+        if self._schedule:
+            self._schedule.kill()
+            self._schedule = None
 
-    def _start_greenthread(self):
+    def _start_schedule(self):
         # Find the first time.
         # We don't known when using this trigger first time.
         timer = self._get_timer(self._trigger_property)
@@ -171,15 +113,15 @@ class TimeTrigger(triggers.BaseTrigger):
         if not first_run_time:
             raise exception.TriggerIsInvalid(trigger_id=self._id)
 
-        self._create_green_thread(first_run_time, timer)
+        self._create_schedule(first_run_time, timer)
 
-    def _create_green_thread(self, first_run_time, timer):
+    def _create_schedule(self, first_run_time, timer):
         func = functools.partial(
             self._trigger_operations,
             trigger_property=self._trigger_property.copy(),
             timer=timer)
 
-        self._greenthread = TriggerOperationGreenThread(
+        self._schedule = scheduler.get_scheduler().schedule(
             first_run_time, func)
 
     def _trigger_operations(self, expect_run_time, trigger_property, timer):
@@ -86,6 +86,23 @@ class API(base.Base):
             parameters
         )
 
+    def list_protectable_instances_with_dependents(self, context,
+                                                   protectable_type,
+                                                   marker, limit, sort_keys,
+                                                   sort_dirs, filters, offset,
+                                                   parameters):
+        rpcapi = self.protection_rpcapi
+        return rpcapi.list_protectable_instances_with_dependents(
+            context,
+            protectable_type,
+            marker,
+            limit,
+            sort_keys,
+            sort_dirs,
+            filters,
+            parameters
+        )
+
     def list_protectable_dependents(self, context,
                                     protectable_id,
                                     protectable_type,
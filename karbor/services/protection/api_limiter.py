@@ -0,0 +1,358 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import contextlib
+import copy
+import functools
+import time
+
+try:
+    from collections import abc as collections_abc
+except ImportError:
+    import collections as collections_abc
+
+import eventlet
+from eventlet import semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+import six
+
+from karbor import exception
+from karbor.i18n import _
+
+api_limiter_opts = [
+    cfg.DictOpt('concurrency',
+                default={},
+                help='The maximum number of client calls run at once, by '
+                     'name. A name is a service, a service resource or a '
+                     'service resource operation, for example '
+                     '"cinder:20,cinder.backups.create:4". Calls over the '
+                     'limit wait for a running call to finish.'),
+    cfg.DictOpt('rate',
+                default={},
+                help='The maximum number of client calls started per '
+                     'second, by name, for example '
+                     '"glance.images.upload:0.5". Calls over the rate wait '
+                     'for their turn.'),
+]
+
+LOG = logging.getLogger(__name__)
+
+# The client attributes are limited down to service.resource.operation
+_MAX_PROXY_DEPTH = 2
+
+
+def _parse_limits(limits, value_type, option):
+    parsed = {}
+    for name, value in limits.items():
+        try:
+            parsed[name] = value_type(value)
+        except (TypeError, ValueError):
+            parsed[name] = None
+        if not parsed[name] or parsed[name] <= 0:
+            raise exception.InvalidInput(
+                reason=_('Invalid %(option)s limit of %(name)s: %(value)s')
+                % {'option': option, 'name': name, 'value': value})
+    return parsed
+
+
+@six.add_metaclass(abc.ABCMeta)
+class _Limit(object):
+    def __init__(self, name):
+        super(_Limit, self).__init__()
+        self.name = name
+        self.waiting = 0
+        self.acquired = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self):
+        start = time.time()
+        self.waiting += 1
+        try:
+            self._acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.time() - start
+        self.acquired += 1
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        return waited
+
+    @abc.abstractmethod
+    def _acquire(self):
+        pass
+
+    def release(self):
+        pass
+
+    def stats(self):
+        return {
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'wait_time': self.wait_time,
+            'max_wait_time': self.max_wait_time,
+        }
+
+
+class ConcurrencyLimit(_Limit):
+    """Bound the number of calls run at once"""
+
+    def __init__(self, name, size):
+        super(ConcurrencyLimit, self).__init__(name)
+        self.size = size
+        self._semaphore = semaphore.Semaphore(size)
+
+    def _acquire(self):
+        self._semaphore.acquire()
+
+    def release(self):
+        self._semaphore.release()
+
+    def stats(self):
+        stats = super(ConcurrencyLimit, self).stats()
+        stats['running'] = self.size - self._semaphore.balance
+        return stats
+
+
+class RateLimit(_Limit):
+    """Token bucket bounding the number of calls started per second
+
+    Callers reserve their token in order, those over the rate sleep until
+    their token is refilled. The bucket holds at most one second of
+    tokens, and at least one.
+    """
+
+    def __init__(self, name, rate):
+        super(RateLimit, self).__init__(name)
+        self.rate = rate
+        self._capacity = max(1.0, rate)
+        self._tokens = self._capacity
+        self._last = time.time()
+
+    def _acquire(self):
+        now = time.time()
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            eventlet.sleep(-self._tokens / self.rate)
+
+
+class ApiLimiter(object):
+    """Concurrency and rate limits of the client calls of a provider
+
+    The limits are named after a service, a service resource or a service
+    resource operation, such as "cinder", "cinder.backups" and
+    "cinder.backups.create". A call is subject to the limits of every
+    prefix of its name.
+    """
+
+    def __init__(self, concurrency=None, rate=None):
+        super(ApiLimiter, self).__init__()
+        self._concurrency_limits = {
+            name: ConcurrencyLimit(name, size)
+            for name, size in (concurrency or {}).items()}
+        self._rate_limits = {
+            name: RateLimit(name, rate)
+            for name, rate in (rate or {}).items()}
+        self._names = (set(self._concurrency_limits) |
+                       set(self._rate_limits))
+        self._call_limits = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Create the limiter of a provider config, None without limits"""
+        if config is None:
+            return None
+        config.register_opts(api_limiter_opts, 'api_limits')
+        concurrency = _parse_limits(config.api_limits.concurrency, int,
+                                    'concurrency')
+        rate = _parse_limits(config.api_limits.rate, float, 'rate')
+        if not concurrency and not rate:
+            return None
+        return cls(concurrency, rate)
+
+    def _covers(self, name):
+        """Whether some limit applies to name or to a part of it"""
+        return any(limit_name == name or
+                   limit_name.startswith(name + '.') or
+                   name.startswith(limit_name + '.')
+                   for limit_name in self._names)
+
+    def get_limits(self, name):
+        """Return the limits of the calls named name, in acquiring order
+
+        The concurrency limits are acquired before the rate limits, each
+        from the most general name to the most specific one.
+        """
+        limits = self._call_limits.get(name)
+        if limits is None:
+            parts = name.split('.')
+            prefixes = ['.'.join(parts[:i + 1]) for i in range(len(parts))]
+            limits = [self._concurrency_limits[prefix]
+                      for prefix in prefixes
+                      if prefix in self._concurrency_limits]
+            limits.extend(self._rate_limits[prefix]
+                          for prefix in prefixes
+                          if prefix in self._rate_limits)
+            self._call_limits[name] = limits
+        return limits
+
+    def acquire(self, name):
+        """Acquire the limits of a call, return them to release"""
+        acquired = []
+        try:
+            for limit in self.get_limits(name):
+                waited = limit.acquire()
+                acquired.append(limit)
+                if waited >= 1:
+                    LOG.debug('Call %(call)s waited %(time).1fs for limit '
+                              '%(limit)s',
+                              {'call': name, 'time': waited,
+                               'limit': limit.name})
+        except BaseException:
+            self.release(acquired)
+            raise
+        return acquired
+
+    @staticmethod
+    def release(acquired):
+        for limit in reversed(acquired):
+            limit.release()
+
+    @contextlib.contextmanager
+    def limit(self, name):
+        acquired = self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(acquired)
+
+    def wrap_client(self, client, service):
+        """Return client with its calls subject to the limits of service"""
+        if not self._covers(service):
+            return client
+        return _LimitedProxy(self, client, service, 0)
+
+    def stats(self):
+        """Return the queue depth and wait times of each limit"""
+        stats = {'concurrency': {}, 'rate': {}}
+        for name, limit in self._concurrency_limits.items():
+            stats['concurrency'][name] = limit.stats()
+        for name, limit in self._rate_limits.items():
+            stats['rate'][name] = limit.stats()
+        return stats
+
+
+class _LimitedProxy(object):
+    def __init__(self, limiter, obj, name, depth):
+        super(_LimitedProxy, self).__init__()
+        self._limiter = limiter
+        self._obj = obj
+        self._name = name
+        self._depth = depth
+
+    def __getattr__(self, attr):
+        value = getattr(self._obj, attr)
+        if attr.startswith('_'):
+            return value
+        name = '{}.{}'.format(self._name, attr)
+        if not self._limiter._covers(name):
+            return value
+        if callable(value):
+            return self._limit_call(value, name)
+        if self._depth < _MAX_PROXY_DEPTH - 1 and hasattr(value, '__dict__'):
+            return _LimitedProxy(self._limiter, value, name, self._depth + 1)
+        return value
+
+    def _limit_call(self, func, name):
+        limiter = self._limiter
+
+        @functools.wraps(func)
+        def _limited_call(*args, **kwargs):
+            acquired = limiter.acquire(name)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                limiter.release(acquired)
+                raise
+            if isinstance(result, collections_abc.Iterator):
+                # Streamed responses, such as image data, are limited
+                # until they are read
+                return _LimitedIterator(
+                    result, functools.partial(limiter.release, acquired))
+            limiter.release(acquired)
+            return result
+        return _limited_call
+
+
+class _LimitedIterator(six.Iterator):
+    """Iterator holding the limits of its call until it is exhausted
+
+    The limits are also released when it is closed or garbage collected.
+    Other attributes are looked up on the wrapped response.
+    """
+
+    _response = None
+    _release = None
+
+    def __init__(self, response, release):
+        super(_LimitedIterator, self).__init__()
+        self._response = response
+        self._iterator = iter(response)
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self._response)
+
+    def __getattr__(self, attr):
+        return getattr(self._response, attr)
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._iterator, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+def bind_context(context, limiter):
+    """Return a copy of context whose clients are subject to limiter"""
+    if limiter is None or context is None:
+        return context
+    context = copy.copy(context)
+    context.api_limiter = limiter
+    return context
+
+
+def get_context_limiter(context):
+    return getattr(context, 'api_limiter', None)
@@ -11,13 +11,55 @@
 #    under the License.
 
 import abc
+import collections
 import os
 import re
 import six
+import zlib
+
+from eventlet import greenpool
+from eventlet import greenthread
+from oslo_config import cfg
 
 from karbor import exception
 from karbor.i18n import _
 
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+bank_plugin_opts = [
+    cfg.StrOpt('object_compression',
+               default='none',
+               choices=['none', 'zlib', 'lzma'],
+               help='The codec used to compress binary bank objects, such '
+                    'as image data. The codec of each object is recorded '
+                    'in its metadata, objects can be read back whatever '
+                    'the current value.'),
+    cfg.IntOpt('object_compression_level',
+               default=1,
+               min=0,
+               max=9,
+               help='The compression level of binary bank objects, 1 is '
+                    'the fastest.'),
+    cfg.IntOpt('bulk_operation_concurrency',
+               default=8,
+               min=1,
+               help='The number of objects read, written or deleted at '
+                    'once by a bulk operation on a bank which has no '
+                    'native bulk operation.'),
+]
+
+_COMPRESSION_CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, level),
+             zlib.decompress),
+}
+if lzma is not None:
+    _COMPRESSION_CODECS['lzma'] = (
+        lambda data, level: lzma.compress(data, preset=level),
+        lzma.decompress)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class LeasePlugin(object):
@@ -39,6 +81,22 @@ class BankPlugin(object):
     def __init__(self, config=None):
         super(BankPlugin, self).__init__()
         self._config = config
+        self._compression = None
+        self._compression_level = None
+        self._bulk_concurrency = 8
+        if config is not None:
+            config.register_opts(bank_plugin_opts, 'bank_plugin')
+            self._bulk_concurrency = (
+                config.bank_plugin.bulk_operation_concurrency)
+            compression = config.bank_plugin.object_compression
+            if compression != 'none':
+                if compression not in _COMPRESSION_CODECS:
+                    raise exception.InvalidInput(
+                        reason=_('Compression codec %s is not available')
+                        % compression)
+                self._compression = compression
+                self._compression_level = (
+                    config.bank_plugin.object_compression_level)
 
     @abc.abstractmethod
     def update_object(self, key, value, context=None):
@@ -61,6 +119,75 @@ class BankPlugin(object):
     def get_owner_id(self, context=None):
         return
 
+    def object_exists(self, key, context=None):
+        """Return whether an object exists, without reading it if possible
+
+        Plugins of a backend with a metadata request override it, by
+        default the object is read. An object which can't be read is
+        reported as missing.
+        """
+        try:
+            self.get_object(key, context=context)
+        except exception.BankGetObjectFailed:
+            return False
+        return True
+
+    def update_objects(self, objects, context=None):
+        """Update several objects, given as a dict of key: value
+
+        Plugins of a backend with a bulk write override it, by default the
+        objects are updated concurrently.
+        """
+        self._map_objects(
+            lambda key: self.update_object(key, objects[key],
+                                           context=context),
+            objects)
+
+    def get_objects(self, keys, context=None):
+        """Return several objects, as a dict of key: value"""
+        keys = list(keys)
+        values = self._map_objects(
+            lambda key: self.get_object(key, context=context), keys)
+        return dict(zip(keys, values))
+
+    def delete_objects(self, keys, context=None):
+        """Delete several objects
+
+        Plugins of a backend with a bulk delete override it, by default the
+        objects are deleted concurrently.
+        """
+        self._map_objects(
+            lambda key: self.delete_object(key, context=context), keys)
+
+    def _map_objects(self, func, keys):
+        keys = list(keys)
+        if len(keys) <= 1:
+            return [func(key) for key in keys]
+        pool = greenpool.GreenPool(min(len(keys), self._bulk_concurrency))
+        return list(pool.imap(func, keys))
+
+    def _compress_object(self, value):
+        """Compress a binary value with the configured codec.
+
+        Returns the value to store and the codec to record in its metadata,
+        None when the value is stored as is.
+        """
+        if self._compression is None or not isinstance(value,
+                                                       six.binary_type):
+            return value, None
+        compress = _COMPRESSION_CODECS[self._compression][0]
+        return compress(value, self._compression_level), self._compression
+
+    @staticmethod
+    def _decompress_object(value, compression):
+        if not compression or compression == 'none':
+            return value
+        if compression not in _COMPRESSION_CODECS:
+            raise exception.InvalidInput(
+                reason=_('Compression codec %s is not available')
+                % compression)
+        return _COMPRESSION_CODECS[compression][1](value)
+
 
 def validate_key(key):
     pass
@@ -124,6 +251,11 @@ class Bank(object):
         return self._plugin.get_object(self._normalize_key(key),
                                        context=context)
 
+    def object_exists(self, key, context=None):
+        self._validate_key(key)
+        return self._plugin.object_exists(self._normalize_key(key),
+                                          context=context)
+
     def list_objects(self, prefix=None, limit=None, marker=None,
                      sort_dir=None, context=None):
         if not prefix:
@@ -144,6 +276,29 @@ class Bank(object):
         return self._plugin.delete_object(self._normalize_key(key),
                                           context=context)
 
+    def update_objects(self, objects, context=None):
+        for key in objects:
+            self._validate_key(key)
+        return self._plugin.update_objects(
+            {self._normalize_key(key): value
+             for key, value in objects.items()},
+            context=context)
+
+    def get_objects(self, keys, context=None):
+        keys = list(keys)
+        for key in keys:
+            self._validate_key(key)
+        objects = self._plugin.get_objects(
+            [self._normalize_key(key) for key in keys], context=context)
+        return {key: objects[self._normalize_key(key)] for key in keys}
+
+    def delete_objects(self, keys, context=None):
+        keys = list(keys)
+        for key in keys:
+            self._validate_key(key)
+        return self._plugin.delete_objects(
+            [self._normalize_key(key) for key in keys], context=context)
+
     def get_sub_section(self, section, is_writable=True):
         return BankSection(self, section, is_writable)
 
@@ -206,6 +361,10 @@ class BankSection(object):
     def is_writable(self):
         return self._is_writable
 
+    @property
+    def prefix(self):
+        return self._prefix
+
     def _prepend_prefix(self, key):
         if not isinstance(key, six.string_types):
             raise exception.InvalidParameterValue(
@@ -247,6 +406,12 @@ class BankSection(object):
             context=context
         )
 
+    def object_exists(self, key, context=None):
+        return self._bank.object_exists(
+            self._prepend_prefix(key),
+            context=context
+        )
+
     def list_objects(self, prefix=None, limit=None, marker=None,
                      sort_dir=None, context=None):
         if not prefix:
@@ -275,6 +440,29 @@ class BankSection(object):
             context=context
         )
 
+    def update_objects(self, objects, context=None):
+        self._validate_writable()
+        return self._bank.update_objects(
+            {self._prepend_prefix(key): value
+             for key, value in objects.items()},
+            context=context
+        )
+
+    def get_objects(self, keys, context=None):
+        keys = list(keys)
+        objects = self._bank.get_objects(
+            [self._prepend_prefix(key) for key in keys],
+            context=context
+        )
+        return {key: objects[self._prepend_prefix(key)] for key in keys}
+
+    def delete_objects(self, keys, context=None):
+        self._validate_writable()
+        return self._bank.delete_objects(
+            [self._prepend_prefix(key) for key in keys],
+            context=context
+        )
+
     def get_owner_id(self):
         return self._bank.get_owner_id()
 
@@ -284,12 +472,21 @@ class BankSection(object):
 
 
 class BankIO(object):
-    def __init__(self, bank_section, sorted_objects):
+    """File like reader of a sequence of bank objects.
+
+    Each read returns the content of the next object. With prefetch > 0,
+    following objects are fetched in the background, at most prefetch
+    objects being fetched or held at a time, including the returned one.
+    """
+
+    def __init__(self, bank_section, sorted_objects, prefetch=0):
         super(BankIO, self).__init__()
         self.bank_section = bank_section
         self.sorted_objects = sorted_objects
         self.obj_size = len(sorted_objects)
         self.length = 0
+        self.prefetch = prefetch
+        self._pending = collections.deque()
 
     def readable(self):
         return True
@@ -298,8 +495,21 @@ class BankIO(object):
         return self
 
     def read(self, length=None):
+        if self.prefetch > 0:
+            return self._read_ahead()
         obj_index = self.length
         self.length += 1
         if self.length > self.obj_size:
             return ''
         return self.bank_section.get_object(self.sorted_objects[obj_index])
+
+    def _read_ahead(self):
+        while (self.length < self.obj_size and
+               len(self._pending) < self.prefetch):
+            self._pending.append(greenthread.spawn(
+                self.bank_section.get_object,
+                self.sorted_objects[self.length]))
+            self.length += 1
+        if not self._pending:
+            return ''
+        return self._pending.popleft().wait()
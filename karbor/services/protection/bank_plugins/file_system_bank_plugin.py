@@ -9,6 +9,7 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
 import errno
 import os
 
@@ -107,14 +108,17 @@ class FileSystemBankPlugin(BankPlugin):
         obj_file_name = self.object_container_path + path
         try:
             os.remove(obj_file_name)
-            if not os.listdir(obj_path) and (
-                    obj_path != self.object_container_path):
-                os.rmdir(obj_path)
+            self._remove_empty_dir(obj_path)
         except OSError:
             LOG.exception(_("Delete the object failed. name: %s"),
                           obj_file_name)
             raise
 
+    def _remove_empty_dir(self, obj_path):
+        if not os.listdir(obj_path) and (
+                obj_path != self.object_container_path):
+            os.rmdir(obj_path)
+
     def _list_object(self, path):
         obj_file_path = self.object_container_path + path
         if not os.path.isdir(obj_file_path):
@@ -161,6 +165,28 @@ class FileSystemBankPlugin(BankPlugin):
             raise exception.BankDeleteObjectFailed(reason=err,
                                                    key=key)
 
+    def delete_objects(self, keys, context=None):
+        """Delete the objects directory by directory
+
+        Each directory left empty is removed once all its objects are
+        deleted, instead of being checked after each object.
+        """
+        dirs = collections.OrderedDict()
+        for key in keys:
+            self._validate_path(key)
+            dirs.setdefault(key.rsplit('/', 1)[0], []).append(key)
+        LOG.debug("FsBank: delete_objects. directories: %s", list(dirs))
+        for obj_dir, dir_keys in dirs.items():
+            key = None
+            try:
+                for key in dir_keys:
+                    os.remove(self.object_container_path + key)
+                key = obj_dir
+                self._remove_empty_dir(self.object_container_path + obj_dir)
+            except OSError as err:
+                LOG.error("Delete objects failed. err: %s", err)
+                raise exception.BankDeleteObjectFailed(reason=err, key=key)
+
     def get_object(self, key, context=None):
         LOG.debug("FsBank: get_object. key: %s", key)
         self._validate_path(key)
@@ -177,6 +203,10 @@ class FileSystemBankPlugin(BankPlugin):
                 pass
         return data
 
+    def object_exists(self, key, context=None):
+        self._validate_path(key)
+        return os.path.isfile(self.object_container_path + key)
+
     def list_objects(self, prefix=None, limit=None, marker=None,
                      sort_dir=None, context=None):
         LOG.debug("FsBank: list_objects. key: %s", prefix)
@@ -38,6 +38,9 @@ s3_bank_plugin_opts = [
 LOG = logging.getLogger(__name__)
 log.getLogger('botocore').setLevel(log.WARNING)
 
+# The maximum number of objects of a DeleteObjects request
+_MAX_DELETE_OBJECTS = 1000
+
 lease_opt = [cfg.IntOpt('lease_expire_window',
                         default=600,
                         help='expired_window for bank lease, in seconds'),
@@ -116,16 +119,19 @@ class S3BankPlugin(BankPlugin, LeasePlugin):
 
     def update_object(self, key, value, context=None):
         serialized = False
+        value, compression = self._compress_object(value)
+        headers = {}
         try:
-            if not isinstance(value, str):
+            if compression is not None:
+                headers['x-object-meta-compression'] = compression
+            elif not isinstance(value, str):
                 value = jsonutils.dumps(value)
                 serialized = True
+            headers['x-object-meta-serialized'] = str(serialized)
             self._put_object(bucket=self.bank_object_bucket,
                              obj=key,
                              contents=value,
-                             headers={
-                                 'x-object-meta-serialized': str(serialized)
-                             })
+                             headers=headers)
         except S3ConnectionFailed as err:
             LOG.error("update object failed, err: %s.", err)
             raise exception.BankUpdateObjectFailed(reason=err, key=key)
@@ -138,6 +144,23 @@ class S3BankPlugin(BankPlugin, LeasePlugin):
             LOG.error("delete object failed, err: %s.", err)
             raise exception.BankDeleteObjectFailed(reason=err, key=key)
 
+    def delete_objects(self, keys, context=None):
+        keys = list(keys)
+        for i in range(0, len(keys), _MAX_DELETE_OBJECTS):
+            try:
+                errors = self._delete_objects(
+                    bucket=self.bank_object_bucket,
+                    objs=keys[i:i + _MAX_DELETE_OBJECTS])
+            except S3ConnectionFailed as err:
+                LOG.error("delete objects failed, err: %s.", err)
+                raise exception.BankDeleteObjectFailed(reason=err,
+                                                       key=keys[i])
+            if errors:
+                reason = errors[0].get('Message')
+                LOG.error("delete objects failed, err: %s.", reason)
+                raise exception.BankDeleteObjectFailed(
+                    reason=reason, key=errors[0].get('Key'))
+
     def get_object(self, key, context=None):
         try:
             return self._get_object(bucket=self.bank_object_bucket,
@@ -146,6 +169,18 @@ class S3BankPlugin(BankPlugin, LeasePlugin):
             LOG.error("get object failed, err: %s.", err)
             raise exception.BankGetObjectFailed(reason=err, key=key)
 
+    def object_exists(self, key, context=None):
+        try:
+            self.connection.head_object(Bucket=self.bank_object_bucket,
+                                        Key=key)
+        except ClientError as err:
+            if err.response.get('Error', {}).get('Code') in ('404',
+                                                             'NoSuchKey'):
+                return False
+            LOG.error("head object failed, err: %s.", err)
+            raise exception.BankGetObjectFailed(reason=err, key=key)
+        return True
+
     def list_objects(self, prefix=None, limit=None, marker=None,
                      sort_dir=None, context=None):
         try:
@@ -205,6 +240,8 @@ class S3BankPlugin(BankPlugin, LeasePlugin):
         try:
             response = self.connection.get_object(Bucket=bucket, Key=obj)
             body = response['Body'].read()
+            body = self._decompress_object(
+                body, response['Metadata'].get("x-object-meta-compression"))
             if response['Metadata']["x-object-meta-serialized"]\
                     .lower() == "true":
                 body = jsonutils.loads(body)
@@ -219,6 +256,17 @@ class S3BankPlugin(BankPlugin, LeasePlugin):
         except ClientError as err:
             raise S3ConnectionFailed(reason=err)
 
+    def _delete_objects(self, bucket, objs):
+        """Delete objects in one request, return the failed ones"""
+        try:
+            response = self.connection.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': obj} for obj in objs],
+                        'Quiet': True})
+        except ClientError as err:
+            raise S3ConnectionFailed(reason=err)
+        return response.get('Errors', [])
+
     def _get_bucket(self, bucket, prefix=None, limit=None,
                     marker=None):
         try:
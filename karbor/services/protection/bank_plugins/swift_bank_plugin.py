@@ -14,6 +14,8 @@ import logging as log
 import math
 import time
 
+from six.moves.urllib import parse
+
 from karbor import exception
 from karbor.i18n import _
 from karbor.services.protection.bank_plugin import BankPlugin
@@ -75,6 +77,9 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
         self.lease_expire_time = 0
         self.bank_leases_container = "leases"
         self._connection = None
+        # The maximum number of objects of a bulk delete request, 0 when
+        # the cluster does not support bulk deletes
+        self._bulk_delete_limit = None
 
     def _setup_connection(self):
         return client_factory.ClientFactory.create_client('swift',
@@ -113,16 +118,19 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
 
     def update_object(self, key, value, context=None):
         serialized = False
+        value, compression = self._compress_object(value)
+        headers = {}
         try:
-            if not isinstance(value, str):
+            if compression is not None:
+                headers['x-object-meta-compression'] = compression
+            elif not isinstance(value, str):
                 value = jsonutils.dumps(value)
                 serialized = True
+            headers['x-object-meta-serialized'] = str(serialized)
             self._put_object(container=self.bank_object_container,
                              obj=key,
                              contents=value,
-                             headers={
-                                 'x-object-meta-serialized': str(serialized)
-                             })
+                             headers=headers)
         except SwiftConnectionFailed as err:
             LOG.error("update object failed, err: %s.", err)
             raise exception.BankUpdateObjectFailed(reason=err, key=key)
@@ -135,6 +143,15 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
             LOG.error("delete object failed, err: %s.", err)
             raise exception.BankDeleteObjectFailed(reason=err, key=key)
 
+    def delete_objects(self, keys, context=None):
+        keys = list(keys)
+        limit = self._get_bulk_delete_limit() if len(keys) > 1 else 0
+        if not limit:
+            return super(SwiftBankPlugin, self).delete_objects(
+                keys, context=context)
+        for i in range(0, len(keys), limit):
+            self._bulk_delete(self.bank_object_container, keys[i:i + limit])
+
     def get_object(self, key, context=None):
         try:
             return self._get_object(container=self.bank_object_container,
@@ -143,6 +160,17 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
             LOG.error("get object failed, err: %s.", err)
             raise exception.BankGetObjectFailed(reason=err, key=key)
 
+    def object_exists(self, key, context=None):
+        try:
+            self.connection.head_object(
+                container=self.bank_object_container, obj=key)
+        except ClientException as err:
+            if err.http_status == 404:
+                return False
+            LOG.error("head object failed, err: %s.", err)
+            raise exception.BankGetObjectFailed(reason=err, key=key)
+        return True
+
     def list_objects(self, prefix=None, limit=None, marker=None,
                      sort_dir=None, context=None):
         try:
@@ -209,6 +237,8 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
         try:
             (_resp, body) = self.connection.get_object(container=container,
                                                        obj=obj)
+            body = self._decompress_object(
+                body, _resp.get("x-object-meta-compression"))
             if _resp.get("x-object-meta-serialized").lower() == "true":
                 body = jsonutils.loads(body)
             return body
@@ -230,6 +260,45 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
 
+    def _get_bulk_delete_limit(self):
+        if self._bulk_delete_limit is None:
+            try:
+                capabilities = self.connection.get_capabilities()
+            except ClientException as err:
+                LOG.warning("Failed to get the swift capabilities, bulk "
+                            "delete is disabled. err: %s.", err)
+                capabilities = {}
+            bulk_delete = capabilities.get('bulk_delete')
+            self._bulk_delete_limit = (
+                bulk_delete.get('max_deletes_per_request', 0)
+                if bulk_delete else 0)
+        return self._bulk_delete_limit
+
+    def _bulk_delete(self, container, keys):
+        """Delete objects with the bulk delete middleware
+
+        Objects which do not exist are ignored.
+        """
+        data = '\n'.join(parse.quote('%s/%s' % (container, key))
+                         for key in keys)
+        try:
+            _resp, body = self.connection.post_account(
+                headers={'Accept': 'application/json',
+                         'Content-Type': 'text/plain'},
+                query_string='bulk-delete',
+                data=data)
+            result = jsonutils.loads(body) if body else {}
+        except (ClientException, ValueError) as err:
+            LOG.error("bulk delete objects failed, err: %s.", err)
+            raise exception.BankDeleteObjectFailed(reason=err, key=keys[0])
+        errors = result.get('Errors')
+        if errors or not result.get('Response Status', '').startswith('2'):
+            key = parse.unquote(errors[0][0]) if errors else keys[0]
+            reason = result.get('Response Body') or result.get(
+                'Response Status')
+            LOG.error("bulk delete objects failed, err: %s.", reason)
+            raise exception.BankDeleteObjectFailed(reason=reason, key=key)
+
     def _put_container(self, container):
         try:
             self.connection.put_container(container=container)
@@ -10,7 +10,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from datetime import datetime
+import collections
+import copy
+from datetime import timedelta
+from eventlet import greenpool
 from karbor.common import constants
 from karbor import exception
 from karbor.i18n import _
@@ -20,37 +23,145 @@ from oslo_log import log as logging
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
+checkpoint_opts = [
+    cfg.IntOpt('checkpoint_fetch_concurrency',
+               default=16,
+               min=1,
+               help='Number of checkpoint metadata objects fetched from the '
+                    'bank concurrently when listing checkpoints'),
+    cfg.IntOpt('checkpoint_cache_size',
+               default=1000,
+               min=0,
+               help='Maximum number of checkpoint metadata objects cached '
+                    'in memory by the protection service. 0 disables the '
+                    'cache'),
+    cfg.IntOpt('checkpoint_cache_ttl',
+               default=30,
+               min=0,
+               help='Time in seconds a cached checkpoint metadata object '
+                    'may be served without reading it from the bank again. '
+                    'Only checkpoints in a final status are cached'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(checkpoint_opts)
 
 LOG = logging.getLogger(__name__)
 
 _INDEX_FILE_NAME = "index.json"
 _UUID_STR_LEN = 36
+_CACHEABLE_STATUSES = (
+    constants.CHECKPOINT_STATUS_AVAILABLE,
+    constants.CHECKPOINT_STATUS_ERROR,
+    constants.CHECKPOINT_STATUS_DELETED,
+)
+
+
+class CheckpointMetadataCache(object):
+    """LRU cache of checkpoint metadata with a TTL.
+
+    Only metadata of checkpoints in a final status is kept, as it rarely
+    changes. Checkpoints invalidate their entry when they are committed or
+    deleted, changes made by other nodes are seen after at most ttl seconds.
+    """
+
+    def __init__(self, size, ttl):
+        super(CheckpointMetadataCache, self).__init__()
+        self._size = size
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, checkpoint_id):
+        entry = self._entries.pop(checkpoint_id, None)
+        if entry is None or timeutils.is_older_than(entry[0], self._ttl):
+            self.misses += 1
+            return None
+        self._entries[checkpoint_id] = entry
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, checkpoint_id, md):
+        self._entries.pop(checkpoint_id, None)
+        if (self._size == 0 or self._ttl == 0 or
+                md.get("status") not in _CACHEABLE_STATUSES):
+            return
+        self._entries[checkpoint_id] = (timeutils.utcnow(),
+                                        copy.deepcopy(md))
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, checkpoint_id):
+        self._entries.pop(checkpoint_id, None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
 
 
 class Checkpoint(object):
-    VERSION = "0.9"
-    SUPPORTED_VERSIONS = ["0.9"]
+    # Version 1.0: The resource graph is encoded by
+    #              graph.encode_resource_graph
+    VERSION = "1.0"
+    SUPPORTED_VERSIONS = ["0.9", "1.0"]
+    # Versions whose resource graph is serialized by
+    # graph.serialize_resource_graph
+    _SERIALIZED_GRAPH_VERSIONS = ["0.9"]
 
     def __init__(self, checkpoint_section, indices_section,
-                 bank_lease, checkpoint_id):
+                 bank_lease, checkpoint_id, metadata_cache=None):
         super(Checkpoint, self).__init__()
         self._id = checkpoint_id
         self._checkpoint_section = checkpoint_section
         self._indices_section = indices_section
         self._bank_lease = bank_lease
-        self.reload_meta_data()
+        self._metadata_cache = metadata_cache
+        self._resource_graph_cache = None
+        md = None
+        if metadata_cache is not None:
+            md = metadata_cache.get(checkpoint_id)
+        if md is None:
+            self.reload_meta_data()
+        else:
+            self._assert_supported_version(md)
+            self._md_cache = md
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "status": self.status,
-            "protection_plan": self.protection_plan,
-            "extra_info": self._md_cache.get("extra_info", None),
-            "project_id": self.project_id,
-            "resource_graph": self._md_cache.get("resource_graph", None),
-            "created_at": self._md_cache.get("created_at", None)
+    def to_dict(self, with_resource_graph=True):
+        return self._md_to_dict(self.id, self._md_cache,
+                                with_resource_graph=with_resource_graph)
+
+    @classmethod
+    def _md_to_dict(cls, checkpoint_id, md, with_resource_graph=True):
+        checkpoint_dict = {
+            "id": checkpoint_id,
+            "status": md["status"],
+            "protection_plan": md["protection_plan"],
+            "extra_info": md.get("extra_info", None),
+            "project_id": md["project_id"],
+            "created_at": md.get("created_at", None)
         }
+        if with_resource_graph:
+            resource_graph = md.get("resource_graph", None)
+            if (resource_graph is not None and
+                    md["version"] not in cls._SERIALIZED_GRAPH_VERSIONS):
+                # API consumers expect the serialized packed graph
+                resource_graph = graph.serialize_resource_graph(
+                    graph.decode_resource_graph(resource_graph))
+            checkpoint_dict["resource_graph"] = resource_graph
+        return checkpoint_dict
+
+    @classmethod
+    def _decode_resource_graph(cls, md):
+        resource_graph = md.get("resource_graph", None)
+        if resource_graph is None:
+            return None
+        if md["version"] in cls._SERIALIZED_GRAPH_VERSIONS:
+            return graph.deserialize_resource_graph(resource_graph)
+        return graph.decode_resource_graph(resource_graph)
 
     @property
     def checkpoint_section(self):
@@ -86,15 +197,34 @@ class Checkpoint(object):
         # TODO(yinwei): check for valid values and transitions
         return self._md_cache["owner_id"]
 
+    def _load_resource_graph(self):
+        encoded_resource_graph = self._md_cache.get("resource_graph", None)
+        if encoded_resource_graph is None:
+            return None
+        cache = self._resource_graph_cache
+        if cache is None or cache[0] is not encoded_resource_graph:
+            resource_graph = self._decode_resource_graph(self._md_cache)
+            cache = (encoded_resource_graph, resource_graph,
+                     graph.index_resource_graph(resource_graph))
+            self._resource_graph_cache = cache
+        return cache
+
     @property
     def resource_graph(self):
-        serialized_resource_graph = self._md_cache.get("resource_graph", None)
-        if serialized_resource_graph is not None:
-            resource_graph = graph.deserialize_resource_graph(
-                serialized_resource_graph)
-            return resource_graph
-        else:
+        cache = self._load_resource_graph()
+        if cache is None:
             return None
+        return list(cache[1])
+
+    def get_resource_graph_node(self, resource_id):
+        """Return the GraphNode of a resource of the resource graph
+
+        Returns None when the resource is not part of the graph.
+        """
+        cache = self._load_resource_graph()
+        if cache is None:
+            return None
+        return cache[2].get(resource_id)
 
     @property
     def protection_plan(self):
@@ -110,9 +240,12 @@ class Checkpoint(object):
 
     @resource_graph.setter
     def resource_graph(self, resource_graph):
-        serialized_resource_graph = graph.serialize_resource_graph(
-            resource_graph)
-        self._md_cache["resource_graph"] = serialized_resource_graph
+        encoded_resource_graph = graph.encode_resource_graph(resource_graph)
+        self._md_cache["resource_graph"] = encoded_resource_graph
+        self._md_cache["version"] = self.VERSION
+        self._resource_graph_cache = (
+            encoded_resource_graph, list(resource_graph),
+            graph.index_resource_graph(resource_graph))
 
     def _is_supported_version(self, version):
         return version in self.SUPPORTED_VERSIONS
@@ -125,15 +258,22 @@ class Checkpoint(object):
             raise RuntimeError(
                 _("Checkpoint was created in an unsupported version"))
 
-    def reload_meta_data(self):
+    @staticmethod
+    def _load_meta_data(checkpoint_section, checkpoint_id, context=None):
         try:
-            new_md = self._checkpoint_section.get_object(_INDEX_FILE_NAME)
+            return checkpoint_section.get_object(_INDEX_FILE_NAME,
+                                                 context=context)
         except exception.BankGetObjectFailed:
             LOG.error("unable to reload metadata for checkpoint id: %s",
-                      self.id)
-            raise exception.CheckpointNotFound(checkpoint_id=self.id)
+                      checkpoint_id)
+            raise exception.CheckpointNotFound(checkpoint_id=checkpoint_id)
+
+    def reload_meta_data(self):
+        new_md = self._load_meta_data(self._checkpoint_section, self.id)
         self._assert_supported_version(new_md)
         self._md_cache = new_md
+        if self._metadata_cache is not None:
+            self._metadata_cache.put(self.id, new_md)
 
     @classmethod
     def _generate_id(self):
@@ -141,11 +281,13 @@ class Checkpoint(object):
 
     @classmethod
     def get_by_section(cls, checkpoints_section, indices_section,
-                       bank_lease, checkpoint_id, context=None):
+                       bank_lease, checkpoint_id, context=None,
+                       metadata_cache=None):
         # TODO(yuvalbr) add validation that the checkpoint exists
         checkpoint_section = checkpoints_section.get_sub_section(checkpoint_id)
         return Checkpoint(checkpoint_section, indices_section,
-                          bank_lease, checkpoint_id)
+                          bank_lease, checkpoint_id,
+                          metadata_cache=metadata_cache)
 
     @staticmethod
     def _get_checkpoint_path_by_provider(
@@ -169,7 +311,7 @@ class Checkpoint(object):
     def create_in_section(cls, checkpoints_section, indices_section,
                           bank_lease, owner_id, plan,
                           checkpoint_id=None, checkpoint_properties=None,
-                          context=None):
+                          context=None, metadata_cache=None):
         checkpoint_id = checkpoint_id or cls._generate_id()
         checkpoint_section = checkpoints_section.get_sub_section(checkpoint_id)
 
@@ -207,33 +349,32 @@ class Checkpoint(object):
             context=context
         )
 
-        indices_section.update_object(
-            key=cls._get_checkpoint_path_by_provider(
+        index_keys = (
+            cls._get_checkpoint_path_by_provider(
                 provider_id, project_id, timestamp, checkpoint_id),
-            value=checkpoint_id,
-            context=context
-        )
-
-        indices_section.update_object(
-            key=cls._get_checkpoint_path_by_date(
+            cls._get_checkpoint_path_by_date(
                 created_at, project_id, timestamp, checkpoint_id),
-            value=checkpoint_id,
-            context=context
-        )
-
-        indices_section.update_object(
-            key=cls._get_checkpoint_path_by_plan(
+            cls._get_checkpoint_path_by_plan(
                 plan.get("id"), project_id, created_at, timestamp,
                 checkpoint_id),
-            value=checkpoint_id,
-            context=context)
+        )
+        indices_section.update_objects(
+            {key: checkpoint_id for key in index_keys},
+            context=context
+        )
 
         return Checkpoint(checkpoint_section,
                           indices_section,
                           bank_lease,
-                          checkpoint_id)
+                          checkpoint_id,
+                          metadata_cache=metadata_cache)
+
+    def _invalidate_cache(self):
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(self.id)
 
     def commit(self, context=None):
+        self._invalidate_cache()
         self._checkpoint_section.update_object(
             key=_INDEX_FILE_NAME,
             value=self._md_cache,
@@ -253,16 +394,16 @@ class Checkpoint(object):
             plan_id = self._md_cache["protection_plan"]["id"]
             provider_id = self._md_cache["protection_plan"]["provider_id"]
             project_id = self._md_cache["project_id"]
-            self._indices_section.delete_object(
+            self._indices_section.delete_objects([
                 self._get_checkpoint_path_by_provider(
-                    provider_id, project_id, timestamp, self.id))
-            self._indices_section.delete_object(
+                    provider_id, project_id, timestamp, self.id),
                 self._get_checkpoint_path_by_date(
-                    created_at, project_id, timestamp, self.id))
-            self._indices_section.delete_object(
+                    created_at, project_id, timestamp, self.id),
                 self._get_checkpoint_path_by_plan(
-                    plan_id, project_id, created_at, timestamp, self.id))
+                    plan_id, project_id, created_at, timestamp, self.id),
+            ])
 
+            self._invalidate_cache()
             self._checkpoint_section.delete_object(_INDEX_FILE_NAME)
         else:
             raise RuntimeError(_("Could not delete: Checkpoint is not empty"))
@@ -276,18 +417,14 @@ class Checkpoint(object):
         plan_id = self._md_cache["protection_plan"]["id"]
         provider_id = self._md_cache["protection_plan"]["provider_id"]
         project_id = self._md_cache["project_id"]
-        self._indices_section.delete_object(
+        self._indices_section.delete_objects([
             self._get_checkpoint_path_by_provider(
                 provider_id, project_id, timestamp, self.id),
-            context=context)
-        self._indices_section.delete_object(
             self._get_checkpoint_path_by_date(
                 created_at, project_id, timestamp, self.id),
-            context=context)
-        self._indices_section.delete_object(
             self._get_checkpoint_path_by_plan(
                 plan_id, project_id, created_at, timestamp, self.id),
-            context=context)
+        ], context=context)
 
     def get_resource_bank_section(self, resource_id):
         prefix = "/resource-data/%s/" % resource_id
@@ -302,10 +439,32 @@ class CheckpointCollection(object):
         self._bank_lease = bank_lease
         self._checkpoints_section = bank.get_sub_section("/checkpoints")
         self._indices_section = bank.get_sub_section("/indices")
+        self._metadata_cache = CheckpointMetadataCache(
+            CONF.checkpoint_cache_size, CONF.checkpoint_cache_ttl)
+
+    def cache_stats(self):
+        return self._metadata_cache.stats()
+
+    def _imap(self, func, items):
+        pool = greenpool.GreenPool(min(CONF.checkpoint_fetch_concurrency,
+                                       len(items)))
+        return list(pool.imap(func, items))
+
+    @staticmethod
+    def _get_id_from_key(key):
+        return key[key.find("@") + 1:]
 
     def list_ids(self, project_id, provider_id, limit=None, marker=None,
                  plan_id=None, start_date=None, end_date=None, sort_dir=None,
                  context=None):
+        return [self._get_id_from_key(key) for key in self._list_keys(
+            project_id, provider_id, limit=limit, marker=marker,
+            plan_id=plan_id, start_date=start_date, end_date=end_date,
+            sort_dir=sort_dir, context=context)]
+
+    def _list_keys(self, project_id, provider_id, limit=None, marker=None,
+                   plan_id=None, start_date=None, end_date=None,
+                   sort_dir=None, context=None):
         marker_checkpoint = None
         if marker is not None:
             checkpoint_section = self._checkpoints_section.get_sub_section(
@@ -317,51 +476,74 @@ class CheckpointCollection(object):
         if start_date is not None:
             if end_date is None:
                 end_date = timeutils.utcnow()
+            return self._list_keys_by_date(
+                project_id, plan_id, limit, marker, marker_checkpoint,
+                start_date, end_date, sort_dir, context=context)
 
-        if plan_id is None and start_date is None:
+        if plan_id is None:
             prefix = "/by-provider/%s/%s/" % (provider_id, project_id)
-            if marker is not None:
-                marker = "/%s" % marker
-        elif plan_id is not None:
-            prefix = "/by-plan/%s/%s/" % (plan_id, project_id)
-            if marker is not None:
-                date = marker_checkpoint["created_at"]
-                marker = "/by-plan/%s/%s/%s/%s" % (
-                    plan_id, project_id, date, marker)
         else:
-            prefix = "/by-date/"
+            prefix = "/by-plan/%s/%s/" % (plan_id, project_id)
             if marker is not None:
-                date = marker_checkpoint["created_at"]
-                marker = "/by-date/%s/%s/%s" % (date, project_id, marker)
-
-        return self._list_ids(project_id, prefix, limit, marker, start_date,
-                              end_date, sort_dir, context=context)
-
-    def _list_ids(self, project_id, prefix, limit, marker, start_date,
-                  end_date, sort_dir, context=None):
-        if start_date is None:
-            return [key[key.find("@") + 1:]
-                    for key in self._indices_section.list_objects(
-                    prefix=prefix,
-                    limit=limit,
-                    marker=marker,
-                    sort_dir=sort_dir,
-                    context=context
-                    )]
-        else:
-            ids = []
-            for key in self._indices_section.list_objects(prefix=prefix,
-                                                          marker=marker,
-                                                          sort_dir=sort_dir,
-                                                          context=context):
-                date = datetime.strptime(key.split("/")[-3], "%Y-%m-%d")
-                checkpoint_project_id = key.split("/")[-2]
-                if start_date <= date <= end_date and (
-                        checkpoint_project_id == project_id):
-                    ids.append(key[key.find("@") + 1:])
-                if limit is not None and len(ids) == limit:
-                    return ids
-            return ids
+                marker = "%s/%s" % (marker_checkpoint["created_at"], marker)
+
+        return self._indices_section.list_objects(
+            prefix=prefix,
+            limit=limit,
+            marker=marker,
+            sort_dir=sort_dir,
+            context=context
+        )
+
+    def _list_keys_by_date(self, project_id, plan_id, limit, marker,
+                           marker_checkpoint, start_date, end_date, sort_dir,
+                           context=None):
+        """List index keys created between start_date and end_date.
+
+        Each day in the range is listed separately, using a key prefix which
+        includes both the day and the project, so the listing never reads
+        keys outside of the requested range. Days are listed concurrently,
+        in batches of checkpoint_fetch_concurrency, and the following days
+        are not listed once limit keys are found.
+        """
+        def _get_day_prefix(day):
+            if plan_id is None:
+                return "/by-date/%s/%s/" % (day, project_id)
+            return "/by-plan/%s/%s/%s/" % (plan_id, project_id, day)
+
+        days = []
+        day = start_date.date()
+        while day <= end_date.date():
+            days.append(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+        if sort_dir == "desc":
+            days.reverse()
+
+        marker_day = None
+        if marker_checkpoint is not None:
+            marker_day = marker_checkpoint["created_at"]
+            if sort_dir == "desc":
+                days = [day for day in days if day <= marker_day]
+            else:
+                days = [day for day in days if day >= marker_day]
+
+        keys = []
+
+        def _list_day(day):
+            return list(self._indices_section.list_objects(
+                prefix=_get_day_prefix(day),
+                limit=None if limit is None else limit - len(keys),
+                marker=marker if day == marker_day else None,
+                sort_dir=sort_dir,
+                context=context))
+
+        batch_size = CONF.checkpoint_fetch_concurrency
+        for i in range(0, len(days), batch_size):
+            for day_keys in self._imap(_list_day, days[i:i + batch_size]):
+                keys.extend(day_keys)
+            if limit is not None and len(keys) >= limit:
+                return keys[:limit]
+        return keys
 
     def get(self, checkpoint_id, context=None):
         # TODO(saggi): handle multiple instances of the same checkpoint
@@ -369,7 +551,36 @@ class CheckpointCollection(object):
                                          self._indices_section,
                                          self._bank_lease,
                                          checkpoint_id,
-                                         context=context)
+                                         context=context,
+                                         metadata_cache=self._metadata_cache)
+
+    def get_many(self, checkpoint_ids, with_resource_graph=True,
+                 context=None):
+        """Fetch the metadata of several checkpoints concurrently.
+
+        Returns a list of checkpoint dicts, as returned by
+        Checkpoint.to_dict, in the same order as checkpoint_ids.
+        """
+        checkpoint_ids = list(checkpoint_ids)
+        if not checkpoint_ids:
+            return []
+
+        def _load(checkpoint_id):
+            md = self._metadata_cache.get(checkpoint_id)
+            if md is None:
+                checkpoint_section = (
+                    self._checkpoints_section.get_sub_section(checkpoint_id))
+                md = Checkpoint._load_meta_data(checkpoint_section,
+                                                checkpoint_id,
+                                                context=context)
+                if md["version"] not in Checkpoint.SUPPORTED_VERSIONS:
+                    raise RuntimeError(
+                        _("Checkpoint was created in an unsupported version"))
+                self._metadata_cache.put(checkpoint_id, md)
+            return Checkpoint._md_to_dict(
+                checkpoint_id, md, with_resource_graph=with_resource_graph)
+
+        return self._imap(_load, checkpoint_ids)
 
     def create(self, plan, checkpoint_properties=None, context=None):
         # TODO(saggi): Serialize plan to checkpoint. Will be done in
@@ -381,4 +592,5 @@ class CheckpointCollection(object):
             self._bank.get_owner_id(),
             plan,
             checkpoint_properties=checkpoint_properties,
-            context=context)
+            context=context,
+            metadata_cache=self._metadata_cache)
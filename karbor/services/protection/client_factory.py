@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
 from keystoneauth1 import service_token
 from keystoneauth1 import session as keystone_session
 
@@ -17,17 +19,109 @@ import os
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
+from oslo_utils import timeutils
+import requests
 
 from karbor.common import karbor_keystone_plugin
 from karbor import exception
 from karbor.i18n import _
+from karbor.services.protection import api_limiter
+
+client_factory_opts = [
+    cfg.IntOpt('client_cache_size',
+               default=100,
+               min=0,
+               help='The maximum number of service clients kept for reuse '
+                    'by the tasks of the protection service. Clients are '
+                    'kept by service, project and token. 0 disables the '
+                    'cache.'),
+    cfg.IntOpt('client_cache_ttl',
+               default=600,
+               min=0,
+               help='The number of seconds a service client is kept for '
+                    'reuse. Clients of a user token are dropped before the '
+                    'token expires. 0 disables the cache.'),
+    cfg.IntOpt('client_connection_pool_size',
+               default=50,
+               min=1,
+               help='The maximum number of HTTP connections kept open to '
+                    'each service endpoint, shared by all the clients.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(client_factory_opts)
 
 LOG = logging.getLogger(__name__)
 
+# Clients of a user token are dropped this number of seconds before it
+# expires, so that a call does not start with an almost expired token.
+_TOKEN_EXPIRY_MARGIN = 60
+
+
+def _get_token_expiry(context):
+    token_info = getattr(context, 'auth_token_info', None)
+    if not isinstance(token_info, dict):
+        return None
+    token = (token_info.get('token') or
+             token_info.get('access', {}).get('token') or {})
+    expires = token.get('expires_at') or token.get('expires')
+    if not expires:
+        return None
+    try:
+        return timeutils.normalize_time(timeutils.parse_isotime(expires))
+    except ValueError:
+        return None
+
+
+class ClientCache(object):
+    """LRU cache of service clients, each kept until an expiry time"""
+
+    def __init__(self, size, ttl):
+        super(ClientCache, self).__init__()
+        self._size = size
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self._size > 0 and self._ttl > 0
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or timeutils.utcnow() >= entry[0]:
+            self.misses += 1
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, client, token_expiry=None):
+        if not self.enabled:
+            return
+        expiry = timeutils.utcnow() + datetime.timedelta(seconds=self._ttl)
+        if token_expiry is not None:
+            expiry = min(expiry, token_expiry - datetime.timedelta(
+                seconds=_TOKEN_EXPIRY_MARGIN))
+        self._entries.pop(key, None)
+        self._entries[key] = (expiry, client)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
 
 class ClientFactory(object):
     _factory = None
     _keystone_plugin = None
+    _client_cache = None
+    _http_session = None
 
     @staticmethod
     def _list_clients():
@@ -68,7 +162,51 @@ class ClientFactory(object):
         except Exception:
             verify = True
 
-        return keystone_session.Session(auth=auth_plugin, verify=verify)
+        return keystone_session.Session(auth=auth_plugin, verify=verify,
+                                        session=cls.get_http_session())
+
+    @classmethod
+    def get_http_session(cls):
+        """Return the HTTP session shared by the keystone sessions
+
+        Its connection pools, one per endpoint, let the clients reuse the
+        connections opened by each other.
+        """
+        if cls._http_session is None:
+            http_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=CONF.client_connection_pool_size)
+            http_session.mount('http://', adapter)
+            http_session.mount('https://', adapter)
+            cls._http_session = http_session
+        return cls._http_session
+
+    @classmethod
+    def get_client_cache(cls):
+        if cls._client_cache is None:
+            cls._client_cache = ClientCache(CONF.client_cache_size,
+                                            CONF.client_cache_ttl)
+        return cls._client_cache
+
+    @classmethod
+    def clear_client_cache(cls):
+        cls._client_cache = None
+
+    @classmethod
+    def cache_stats(cls):
+        return cls.get_client_cache().stats()
+
+    @staticmethod
+    def _cache_key(service, context, conf, privileged_user, kwargs):
+        """Return the cache key of a client, None if it is not cached"""
+        if conf is not cfg.CONF or kwargs:
+            return None
+        if privileged_user is True:
+            # The service auth plugin renews its own token
+            return (service, None, None, True)
+        if context is None or not context.auth_token:
+            return None
+        return (service, context.project_id, context.auth_token, False)
 
     @classmethod
     def get_keystone_plugin(cls):
@@ -93,9 +231,24 @@ class ClientFactory(object):
         if module is None:
             raise exception.KarborException(_('Unknown service(%s)') % service)
 
-        kwargs['privileged_user'] = privileged_user
-        kwargs['keystone_plugin'] = cls.get_keystone_plugin()
-        if context or privileged_user:
-            kwargs['session'] = cls._generate_session(context, service,
-                                                      privileged_user)
-        return module.create(context, conf, **kwargs)
+        cache = cls.get_client_cache()
+        key = None
+        if cache.enabled:
+            key = cls._cache_key(service, context, conf, privileged_user,
+                                 kwargs)
+        client = cache.get(key) if key is not None else None
+        if client is None:
+            kwargs['privileged_user'] = privileged_user
+            kwargs['keystone_plugin'] = cls.get_keystone_plugin()
+            if context or privileged_user:
+                kwargs['session'] = cls._generate_session(context, service,
+                                                          privileged_user)
+            client = module.create(context, conf, **kwargs)
+            if key is not None:
+                token_expiry = (None if privileged_user is True
+                                else _get_token_expiry(context))
+                cache.put(key, client, token_expiry)
+        limiter = api_limiter.get_context_limiter(context)
+        if limiter is not None:
+            client = limiter.wrap_client(client, service)
+        return client
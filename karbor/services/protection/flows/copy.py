@@ -90,6 +90,7 @@ def get_flow(context, protectable_registry, workflow_engine, plan, provider,
         resource_graph=resource_graph,
         plugins=plugins,
         parameters=parameters,
+        limiter=provider.api_limiter,
     )
     store_dict = {'context': context,
                   'checkpoint': checkpoint,
@@ -183,9 +184,12 @@ def create_flows(context, protectable_registry, workflow_engine,
                 flow="copy",
                 error=e.msg if hasattr(e, 'msg') else 'Internal error')
         workflow_engine.add_tasks(copy_flows, copy_flow)
-    flows_engine = workflow_engine.get_engine(copy_flows, store={
-        'context': context
-    })
+    flows_engine = workflow_engine.get_engine(
+        copy_flows,
+        store={
+            'context': context
+        },
+        **provider.get_flow_executor_options(constants.OPERATION_COPY))
     LOG.debug("Creating flows for the plan. copy_flows: %s", copy_flows)
 
     return flows_engine
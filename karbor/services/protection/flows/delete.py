@@ -64,7 +64,8 @@ def get_flow(context, workflow_engine, checkpoint, provider):
         workflow_engine=workflow_engine,
         resource_graph=resource_graph,
         plugins=plugins,
-        parameters=None
+        parameters=None,
+        limiter=provider.api_limiter,
     )
     workflow_engine.add_tasks(
         delete_flow,
@@ -77,6 +78,7 @@ def get_flow(context, workflow_engine, checkpoint, provider):
         store={
             'context': context,
             'checkpoint': checkpoint,
-            'operation_log': operation_log}
+            'operation_log': operation_log},
+        **provider.get_flow_executor_options(constants.OPERATION_DELETE)
     )
     return flow_engine
@@ -72,6 +72,7 @@ def get_flow(context, protectable_registry, workflow_engine, plan, provider,
         resource_graph=resource_graph,
         plugins=plugins,
         parameters=parameters,
+        limiter=provider.api_limiter,
     )
     workflow_engine.add_tasks(
         protection_flow,
@@ -79,9 +80,12 @@ def get_flow(context, protectable_registry, workflow_engine, plan, provider,
         resources_task_flow,
         CompleteProtectTask(),
     )
-    flow_engine = workflow_engine.get_engine(protection_flow, store={
-        'context': context,
-        'checkpoint': checkpoint,
-        'operation_log': operation_log
-    })
+    flow_engine = workflow_engine.get_engine(
+        protection_flow,
+        store={
+            'context': context,
+            'checkpoint': checkpoint,
+            'operation_log': operation_log
+        },
+        **provider.get_flow_executor_options(constants.OPERATION_PROTECT))
     return flow_engine
@@ -76,7 +76,8 @@ def get_flow(context, workflow_engine, checkpoint, provider, restore,
         workflow_engine=workflow_engine,
         resource_graph=resource_graph,
         plugins=plugins,
-        parameters=parameters
+        parameters=parameters,
+        limiter=provider.api_limiter,
     )
 
     workflow_engine.add_tasks(
@@ -93,6 +94,7 @@ def get_flow(context, workflow_engine, checkpoint, provider, restore,
             'restore': restore,
             'new_resources': {},
             'operation_log': operation_log
-        }
+        },
+        **provider.get_flow_executor_options(constants.OPERATION_RESTORE)
     )
     return flow_engine
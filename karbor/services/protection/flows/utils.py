@@ -23,7 +23,7 @@ LOG = logging.getLogger(__name__)
 
 
 def create_operation_log(context, checkpoint, operation_type=None):
-    checkpoint_dict = checkpoint.to_dict()
+    checkpoint_dict = checkpoint.to_dict(with_resource_graph=False)
     extra_info = checkpoint_dict.get('extra_info', None)
     scheduled_operation_id = None
     if extra_info:
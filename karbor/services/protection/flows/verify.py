@@ -69,7 +69,8 @@ def get_flow(context, workflow_engine, checkpoint, provider, verify):
         workflow_engine=workflow_engine,
         resource_graph=resource_graph,
         plugins=plugins,
-        parameters=parameters
+        parameters=parameters,
+        limiter=provider.api_limiter,
     )
 
     workflow_engine.add_tasks(
@@ -87,6 +88,7 @@ def get_flow(context, workflow_engine, checkpoint, provider, verify):
             'verify': verify,
             'new_resources': {},
             'operation_log': operation_log
-        }
+        },
+        **provider.get_flow_executor_options(constants.OPERATION_VERIFY)
     )
     return flow_engine
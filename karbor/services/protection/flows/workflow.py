@@ -16,6 +16,7 @@ import six
 
 from karbor import exception
 from karbor.i18n import _
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from taskflow import engines
@@ -24,6 +25,32 @@ from taskflow.patterns import linear_flow
 from taskflow import task
 
 
+FLOW_EXECUTORS = ('green', 'serial')
+
+flow_executor_opts = [
+    cfg.StrOpt('flow_executor',
+               default='green',
+               choices=FLOW_EXECUTORS,
+               help='How the tasks of a flow are run: "green" runs the '
+                    'tasks that do not depend on each other in parallel on '
+                    'a pool of green threads shared by the flows, "serial" '
+                    'runs them one at a time.'),
+    cfg.IntOpt('flow_executor_max_workers',
+               default=1000,
+               min=1,
+               help='The size of the green thread pool shared by the flows. '
+                    'It bounds the number of tasks run at once by all the '
+                    'flows of the protection service.'),
+    cfg.DictOpt('flow_executor_operations',
+                default={},
+                help='The flow executor of some operation types, overriding '
+                     'flow_executor. For example "protect:green,'
+                     'delete:serial".'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(flow_executor_opts)
+
 LOG = logging.getLogger(__name__)
 
 
@@ -95,7 +122,32 @@ class TaskFlowEngine(WorkFlowEngine):
         else:
             raise ValueError(_("unsupported flow type: %s") % flow_type)
 
+    # Green thread pools shared by the flows, by group and size
+    _executors = {}
+
+    @classmethod
+    def _get_executor(cls, max_workers, group=None):
+        key = (group, max_workers)
+        executor = cls._executors.get(key)
+        if executor is None or not executor.alive:
+            executor = futurist.GreenThreadPoolExecutor(
+                max_workers=max_workers)
+            cls._executors[key] = executor
+        return executor
+
     def get_engine(self, flow, **kwargs):
+        """Load an engine running flow
+
+        :param executor: The executor running the tasks, by default a green
+                         thread pool shared by the flows.
+        :param executor_type: 'green' or 'serial', default: flow_executor
+        :param max_workers: The size of the shared green thread pool,
+                            default: flow_executor_max_workers
+        :param executor_group: The name of the flows sharing the green
+                               thread pool, such as a provider id. By
+                               default the pool is shared by all the flows
+                               of the protection service.
+        """
         if flow is None:
             LOG.error("The flow is None, build it first")
             raise exception.InvalidTaskFlowObject(
@@ -103,10 +155,17 @@ class TaskFlowEngine(WorkFlowEngine):
         executor = kwargs.get('executor', None)
         engine = kwargs.get('engine', None)
         store = kwargs.get('store', None)
-        if not executor:
-            executor = futurist.GreenThreadPoolExecutor()
+        executor_type = kwargs.get('executor_type') or CONF.flow_executor
+        max_workers = (kwargs.get('max_workers') or
+                       CONF.flow_executor_max_workers)
+        if executor_type not in FLOW_EXECUTORS:
+            raise exception.InvalidInput(
+                reason=_("unsupported flow executor: %s") % executor_type)
         if not engine:
-            engine = 'parallel'
+            engine = 'serial' if executor_type == 'serial' else 'parallel'
+        if not executor and engine == 'parallel':
+            executor = self._get_executor(max_workers,
+                                          kwargs.get('executor_group'))
         flow_engine = engines.load(flow,
                                    executor=executor,
                                    engine=engine,
@@ -235,3 +235,87 @@ def deserialize_resource_graph(serialized_resource_graph):
                                                     extra_info=node[3])
     resource_graph = unpack_graph(packed_resource_graph)
     return resource_graph
+
+
+RESOURCE_GRAPH_ENCODING_VERSION = 1
+
+
+def encode_resource_graph(resource_graph):
+    """Encode a resource graph to a compact JSON serializable dict
+
+    Resource types, ids and names are stored once in a string table and each
+    node refers to its child nodes by index. Nodes are listed children first,
+    so that the graph can be decoded in a single pass.
+    """
+    strings = []
+    string_indices = {}
+    nodes = []
+    children = []
+    node_indices = {}
+
+    def string_index(value):
+        index = string_indices.get(value)
+        if index is None:
+            index = string_indices[value] = len(strings)
+            strings.append(value)
+        return index
+
+    def encode_node(node):
+        resource = node.value
+        if resource in node_indices:
+            return node_indices[resource]
+        child_indices = [encode_node(child) for child in node.child_nodes]
+        node_indices[resource] = len(nodes)
+        nodes.append((string_index(resource.type),
+                      string_index(resource.id),
+                      string_index(resource.name),
+                      resource.extra_info))
+        children.append(child_indices)
+        return node_indices[resource]
+
+    roots = [encode_node(node) for node in resource_graph]
+    return {
+        "version": RESOURCE_GRAPH_ENCODING_VERSION,
+        "strings": strings,
+        "nodes": nodes,
+        "children": children,
+        "roots": roots,
+    }
+
+
+def decode_resource_graph(encoded_resource_graph):
+    """Return a list of GraphNodes from an encoded resource graph"""
+    version = encoded_resource_graph.get("version")
+    if version != RESOURCE_GRAPH_ENCODING_VERSION:
+        raise exception.InvalidInput(
+            reason=_("Unsupported resource graph encoding version: %s")
+            % version)
+
+    strings = encoded_resource_graph["strings"]
+    graph_nodes = []
+    for node, child_indices in zip(encoded_resource_graph["nodes"],
+                                   encoded_resource_graph["children"]):
+        if any(not 0 <= index < len(graph_nodes) for index in child_indices):
+            raise exception.InvalidInput(
+                reason=_("Encoded resource graph nodes must be topologically "
+                         "ordered"))
+        resource = Resource(type=strings[node[0]],
+                            id=strings[node[1]],
+                            name=strings[node[2]],
+                            extra_info=node[3])
+        graph_nodes.append(GraphNode(
+            resource, tuple(graph_nodes[index] for index in child_indices)))
+    return [graph_nodes[index] for index in encoded_resource_graph["roots"]]
+
+
+def index_resource_graph(resource_graph):
+    """Return a dict mapping the id of each resource to its GraphNode"""
+    index = {}
+    nodes = list(resource_graph)
+    while nodes:
+        node = nodes.pop()
+        if node.value.id in index:
+            continue
+        index[node.value.id] = node
+        nodes.extend(node.child_nodes)
+    return index
@@ -32,6 +32,7 @@ from karbor import manager
 from karbor.resource import Resource
 from karbor.services.protection.flows import worker as flow_manager
 from karbor.services.protection.protectable_registry import ProtectableRegistry
+from karbor.services.protection import status_notifications
 from karbor import utils
 
 LOG = logging.getLogger(__name__)
@@ -44,7 +45,14 @@ protection_manager_opts = [
                default=0,
                help='number of maximum concurrent operation (protect, restore,'
                     ' delete) flows. 0 means no hard limit'
-               )
+               ),
+    cfg.BoolOpt('async_protect',
+                default=False,
+                help='Return the id of the checkpoint of a protect request '
+                     'as soon as the checkpoint is created. The resource '
+                     'graph of the plan is then built and the protection '
+                     'flow run in the background, a failure to build them '
+                     'sets the status of the checkpoint to error.'),
 ]
 
 CONF = cfg.CONF
@@ -56,7 +64,7 @@ PROVIDER_NAMESPACE = 'karbor.provider'
 class ProtectionManager(manager.Manager):
     """karbor Protection Manager."""
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -69,6 +77,7 @@ class ProtectionManager(manager.Manager):
         self.protectable_registry = ProtectableRegistry()
         self.protectable_registry.load_plugins()
         self.worker = flow_manager.Worker()
+        self._status_listener = None
         self._greenpool = None
         self._greenpool_size = CONF.max_concurrent_operations
         if self._greenpool_size != 0:
@@ -85,6 +94,17 @@ class ProtectionManager(manager.Manager):
         # TODO(wangliuan)
         LOG.info("Starting protection service")
 
+    def init_host_with_rpc(self):
+        if CONF.status_notifications:
+            self._status_listener = \
+                status_notifications.StatusNotificationListener()
+            self._status_listener.start()
+
+    def cleanup_host(self):
+        if self._status_listener is not None:
+            self._status_listener.stop()
+            self._status_listener = None
+
     @messaging.expected_exceptions(exception.InvalidPlan,
                                    exception.ProviderNotFound,
                                    exception.FlowError)
@@ -114,8 +134,17 @@ class ProtectionManager(manager.Manager):
             exc = exception.FlowError(flow="protect",
                                       error="Error creating checkpoint")
             six.raise_from(exc, e)
+        if CONF.async_protect:
+            self._spawn(self._run_protect_flow, context, plan, provider,
+                        checkpoint)
+            return checkpoint.id
+        flow = self._get_protect_flow(context, plan, provider, checkpoint)
+        self._spawn(self.worker.run_flow, flow)
+        return checkpoint.id
+
+    def _get_protect_flow(self, context, plan, provider, checkpoint):
         try:
-            flow = self.worker.get_flow(
+            return self.worker.get_flow(
                 context=context,
                 protectable_registry=self.protectable_registry,
                 operation_type=constants.OPERATION_PROTECT,
@@ -124,12 +153,29 @@ class ProtectionManager(manager.Manager):
                 checkpoint=checkpoint)
         except Exception as e:
             LOG.exception("Failed to create protection flow, plan: %s",
-                          plan_id)
+                          plan.get('id', None))
             raise exception.FlowError(
                 flow="protect",
                 error=e.msg if hasattr(e, 'msg') else 'Internal error')
-        self._spawn(self.worker.run_flow, flow)
-        return checkpoint.id
+
+    def _run_protect_flow(self, context, plan, provider, checkpoint):
+        """Build the protection flow of checkpoint and run it
+
+        Runs in the background when protect requests are asynchronous, the
+        checkpoint is set in error when the flow can not be built.
+        """
+        try:
+            flow = self._get_protect_flow(context, plan, provider,
+                                          checkpoint)
+        except exception.FlowError:
+            try:
+                checkpoint.status = constants.CHECKPOINT_STATUS_ERROR
+                checkpoint.commit()
+            except Exception:
+                LOG.exception("Failed to set the status of checkpoint %s "
+                              "to error", checkpoint.id)
+            return
+        self.worker.run_flow(flow)
 
     @messaging.expected_exceptions(exception.InvalidPlan,
                                    exception.ProviderNotFound,
@@ -327,7 +373,7 @@ class ProtectionManager(manager.Manager):
             raise exception.InvalidInput(
                 reason=_("Invalid checkpoint_id or provider_id"))
 
-        checkpoint_dict = checkpoint.to_dict()
+        checkpoint_dict = checkpoint.to_dict(with_resource_graph=False)
         if not context.is_admin and (
                 context.project_id != checkpoint_dict['project_id']):
             LOG.warn("Delete checkpoint(%s) is not allowed." % checkpoint_id)
@@ -387,12 +433,9 @@ class ProtectionManager(manager.Manager):
             project_id, provider_id, limit=limit, marker=marker,
             plan_id=plan_id, start_date=start_date, end_date=end_date,
             sort_dir=sort_dir, context=context)
-        checkpoints = []
-        for checkpoint_id in checkpoint_ids:
-            checkpoint = provider.get_checkpoint(checkpoint_id,
-                                                 context=context)
-            checkpoints.append(checkpoint.to_dict())
-        return checkpoints
+        checkpoint_collection = provider.get_checkpoint_collection()
+        return checkpoint_collection.get_many(checkpoint_ids,
+                                              context=context)
 
     @messaging.expected_exceptions(exception.ProviderNotFound,
                                    exception.CheckpointNotFound,
@@ -488,6 +531,45 @@ class ProtectionManager(manager.Manager):
 
         return resource_instance.to_dict() if resource_instance else None
 
+    @messaging.expected_exceptions(exception.ListProtectableResourceFailed)
+    def list_protectable_instances_with_dependents(self, context,
+                                                   protectable_type=None,
+                                                   marker=None,
+                                                   limit=None,
+                                                   sort_keys=None,
+                                                   sort_dirs=None,
+                                                   filters=None,
+                                                   parameters=None):
+        """List protectable instances with their dependent resources.
+
+        The dependent resources of all the instances are listed in bulk,
+        once per dependent resource type.
+        """
+        LOG.info("Start to list protectable instances with dependents of "
+                 "type: %s", protectable_type)
+
+        registry = self.protectable_registry
+        try:
+            resource_instances = registry.list_resources(
+                context, protectable_type, parameters)
+            dependents = registry.fetch_dependent_resources_bulk(
+                context, resource_instances)
+        except exception.ListProtectableResourceFailed as err:
+            LOG.error("List resources of type %(type)s with dependents "
+                      "failed: %(err)s",
+                      {'type': protectable_type, 'err': six.text_type(err)})
+            raise
+
+        result = []
+        for resource in resource_instances:
+            result.append(dict(
+                id=resource.id, name=resource.name,
+                extra_info=resource.extra_info,
+                dependent_resources=[dependent.to_dict() for dependent
+                                     in dependents[resource]]))
+
+        return result
+
     @messaging.expected_exceptions(exception.ListProtectableResourceFailed)
     def list_protectable_dependents(self, context,
                                     protectable_id,
@@ -71,3 +71,17 @@ class ProtectablePlugin(object):
         :return: the list of dependent resource instances.
         """
         pass
+
+    def get_dependent_resources_bulk(self, context, parent_resources):
+        """List dependent resource instances of several parent resources.
+
+        Plugins which can find the dependent resources of many parents with
+        fewer requests than one per parent should override it.
+
+        :param parent_resources: the parent resource instances.
+        :return: a dict mapping each parent resource instance to the list of
+                 its dependent resource instances.
+        """
+        return {parent_resource: self.get_dependent_resources(
+                context, parent_resource)
+                for parent_resource in parent_resources}
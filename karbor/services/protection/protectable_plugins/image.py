@@ -119,6 +119,52 @@ class ImageProtectablePlugin(protectable_plugin.ProtectablePlugin):
             return resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
                                      id=image.id, name=image.name)
 
+    def get_dependent_resources_bulk(self, context, parent_resources):
+        """Get the images of many servers with one server listing."""
+        servers = [parent_resource for parent_resource in parent_resources
+                   if parent_resource.type == constants.SERVER_RESOURCE_TYPE]
+        result = {}
+        if len(servers) > 1:
+            try:
+                server_list = self._nova_client(context).servers.list(
+                    detailed=True)
+            except Exception as e:
+                LOG.exception("List all server from nova failed.")
+                raise exception.ListProtectableResourceFailed(
+                    type=self._SUPPORT_RESOURCE_TYPE,
+                    reason=six.text_type(e))
+
+            server_images = {server.id: server.image for server in server_list}
+            image_names = {}
+            for parent_resource in servers:
+                if parent_resource.id not in server_images:
+                    continue
+                server_image = server_images[parent_resource.id]
+                if not server_image:
+                    result[parent_resource] = []
+                    continue
+                image_id = server_image['id']
+                if image_id not in image_names:
+                    try:
+                        image = self._glance_client(context).images.get(
+                            image_id)
+                    except Exception as e:
+                        LOG.exception("Getting image from glance failed.")
+                        raise exception.ListProtectableResourceFailed(
+                            type=self._SUPPORT_RESOURCE_TYPE,
+                            reason=six.text_type(e))
+                    image_names[image_id] = image.name
+                result[parent_resource] = [resource.Resource(
+                    type=self._SUPPORT_RESOURCE_TYPE,
+                    id=image_id,
+                    name=image_names[image_id])]
+
+        for parent_resource in parent_resources:
+            if parent_resource not in result:
+                result[parent_resource] = self.get_dependent_resources(
+                    context, parent_resource)
+        return result
+
     def get_dependent_resources(self, context, parent_resource):
         if parent_resource.type == constants.SERVER_RESOURCE_TYPE:
             return self._get_dependent_resources_by_server(context,
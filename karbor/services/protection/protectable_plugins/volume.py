@@ -156,6 +156,48 @@ class VolumeProtectablePlugin(protectable_plugin.ProtectablePlugin):
                 extra_info={'availability_zone': vol.availability_zone})
                 for vol in volumes if _is_attached_to(vol)]
 
+    def get_dependent_resources_bulk(self, context, parent_resources):
+        """List the volumes of many servers and projects with one listing."""
+        by_server = [parent_resource for parent_resource in parent_resources
+                     if parent_resource.type in (
+                         constants.SERVER_RESOURCE_TYPE,
+                         constants.PROJECT_RESOURCE_TYPE)]
+        result = {}
+        if by_server:
+            try:
+                volumes = self._client(context).volumes.list(detailed=True)
+            except Exception as e:
+                LOG.exception("List all detailed volumes from cinder failed.")
+                raise exception.ListProtectableResourceFailed(
+                    type=self._SUPPORT_RESOURCE_TYPE,
+                    reason=six.text_type(e))
+
+            volumes_by_parent = {}
+            for vol in volumes:
+                vol_resource = resource.Resource(
+                    type=self._SUPPORT_RESOURCE_TYPE, id=vol.id,
+                    name=vol.name,
+                    extra_info={
+                        'availability_zone': vol.availability_zone})
+                parent_keys = set(
+                    (constants.SERVER_RESOURCE_TYPE, s.get('server_id'))
+                    for s in vol.attachments)
+                parent_keys.add((
+                    constants.PROJECT_RESOURCE_TYPE,
+                    getattr(vol, 'os-vol-tenant-attr:tenant_id', None)))
+                for parent_key in parent_keys:
+                    volumes_by_parent.setdefault(parent_key, []).append(
+                        vol_resource)
+            for parent_resource in by_server:
+                result[parent_resource] = volumes_by_parent.get(
+                    (parent_resource.type, parent_resource.id), [])
+
+        for parent_resource in parent_resources:
+            if parent_resource not in result:
+                result[parent_resource] = self.get_dependent_resources(
+                    context, parent_resource)
+        return result
+
     def get_dependent_resources(self, context, parent_resource):
         if parent_resource.type in (constants.SERVER_RESOURCE_TYPE,
                                     constants.PROJECT_RESOURCE_TYPE):
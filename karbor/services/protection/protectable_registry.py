@@ -10,13 +10,41 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+from eventlet import event
+from eventlet import greenpool
 from karbor.exception import ListProtectableResourceFailed
 from karbor.services.protection.graph import build_graph
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from stevedore import extension
 
+protectable_registry_opts = [
+    cfg.IntOpt('protectable_cache_size',
+               default=1000,
+               min=0,
+               help='The maximum number of resource listings kept in the '
+                    'protectable resource cache. 0 disables the cache.'),
+    cfg.IntOpt('protectable_cache_ttl',
+               default=10,
+               min=0,
+               help='The number of seconds a resource listing is kept in the '
+                    'protectable resource cache. 0 disables the cache.'),
+    cfg.IntOpt('protectable_graph_build_concurrency',
+               default=8,
+               min=1,
+               help='The number of protectable plugins listing the '
+                    'dependent resources of a resource graph level in '
+                    'parallel when the graph is built.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(protectable_registry_opts)
+
 LOG = logging.getLogger(__name__)
 
 
@@ -24,12 +52,100 @@ def _warn_missing_protectable(extmanager, ep, err):
     LOG.warning("Could not load %(name)s: %(error)s")
 
 
+class ResourceListingCache(object):
+    """LRU cache of protectable resource listings with a TTL.
+
+    Concurrent loads of the same key are coalesced: the first caller lists
+    the resources while the others wait for its result.
+    """
+
+    def __init__(self, size, ttl):
+        super(ResourceListingCache, self).__init__()
+        self._size = size
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self):
+        return self._size > 0 and self._ttl > 0
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or timeutils.is_older_than(entry[0], self._ttl):
+            self.misses += 1
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        return list(entry[1])
+
+    def put(self, key, resources):
+        if not self.enabled:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (timeutils.utcnow(), list(resources))
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def get_or_load(self, key, load_func, bypass=False):
+        """Get the listing of key, calling load_func on a miss.
+
+        With bypass, load_func is always called and its result replaces the
+        cached one.
+        """
+        if not self.enabled:
+            return load_func()
+        if not bypass:
+            resources = self.get(key)
+            if resources is not None:
+                return resources
+            loading = self._loading.get(key)
+            if loading is not None:
+                self.coalesced += 1
+                return list(loading.wait())
+
+        loading = event.Event()
+        self._loading.setdefault(key, loading)
+        try:
+            resources = load_func()
+        except Exception as e:
+            loading.send_exception(e)
+            raise
+        else:
+            self.put(key, resources)
+            loading.send(resources)
+        finally:
+            if self._loading.get(key) is loading:
+                del self._loading[key]
+        return list(resources)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
 class ProtectableRegistry(object):
 
     def __init__(self):
         super(ProtectableRegistry, self).__init__()
         self._protectable_map = {}
         self._plugin_map = {}
+        self._cache = ResourceListingCache(CONF.protectable_cache_size,
+                                           CONF.protectable_cache_ttl)
+
+    @staticmethod
+    def _cache_key(context, *args):
+        return (getattr(context, 'project_id', None), ) + args
+
+    def cache_stats(self):
+        return self._cache.stats()
 
     def load_plugins(self):
         """Load all protectable plugins configured and register them.
@@ -66,14 +182,23 @@ class ProtectableRegistry(object):
         """Get the protectable plugin with the specified type."""
         return self._plugin_map.get(resource_type)
 
-    def list_resources(self, context, resource_type, parameters=None):
+    def list_resources(self, context, resource_type, parameters=None,
+                       use_cache=True):
         """List resource instances of given type.
 
         :param resource_type: The resource type to list instance.
+        :param use_cache: Whether a listing cached less than
+                          protectable_cache_ttl seconds ago can be returned.
         :return: The list of resource instance.
         """
         protectable = self._get_protectable(context, resource_type)
-        return protectable.list_resources(context, parameters=parameters)
+        key = self._cache_key(context, 'list', resource_type,
+                              jsonutils.dumps(parameters, sort_keys=True))
+        return self._cache.get_or_load(
+            key,
+            lambda: protectable.list_resources(context,
+                                               parameters=parameters),
+            bypass=not use_cache)
 
     def show_resource(self, context, resource_type, resource_id,
                       parameters=None):
@@ -87,21 +212,27 @@ class ProtectableRegistry(object):
         return protectable.show_resource(context, resource_id,
                                          parameters=parameters)
 
-    def fetch_dependent_resources(self, context, resource):
+    def fetch_dependent_resources(self, context, resource, use_cache=True):
         """List dependent resources under given parent resource.
 
         :param resource: The parent resource to list dependent resources.
+        :param use_cache: Whether listings cached less than
+                          protectable_cache_ttl seconds ago can be returned.
         :return: The list of dependent resources.
         """
         result = []
         for plugin in self._plugin_map.values():
             if resource.type in plugin.get_parent_resource_types():
-                protectable = self._get_protectable(
-                    context,
-                    plugin.get_resource_type())
+                resource_type = plugin.get_resource_type()
+                protectable = self._get_protectable(context, resource_type)
+                key = self._cache_key(context, 'dependents', resource_type,
+                                      resource.key)
                 try:
-                    protectable_resources = \
-                        protectable.get_dependent_resources(context, resource)
+                    protectable_resources = self._cache.get_or_load(
+                        key,
+                        lambda: protectable.get_dependent_resources(
+                            context, resource),
+                        bypass=not use_cache)
                 except ListProtectableResourceFailed as e:
                     LOG.error("List resources failed, so skip it. "
                               "Error: {0}".format(e))
@@ -110,11 +241,98 @@ class ProtectableRegistry(object):
 
         return result
 
+    def fetch_dependent_resources_bulk(self, context, resources,
+                                       use_cache=True):
+        """List dependent resources under several parent resources.
+
+        Each protectable plugin is asked once for the dependent resources of
+        all the parents it supports, up to protectable_graph_build_concurrency
+        plugins are asked in parallel. When that fails, the dependent resources
+        are listed parent by parent like fetch_dependent_resources does.
+
+        :param resources: The parent resources to list dependent resources.
+        :param use_cache: Whether listings cached less than
+                          protectable_cache_ttl seconds ago can be returned.
+        :return: A dict mapping each parent resource to the list of its
+                 dependent resources.
+        """
+        result = {resource: [] for resource in resources}
+        pool = greenpool.GreenPool(CONF.protectable_graph_build_concurrency)
+        plugins = list(self._plugin_map.values())
+        plugin_results = pool.imap(
+            lambda plugin: self._fetch_plugin_dependent_resources(
+                context, plugin, resources, use_cache),
+            plugins)
+        # Merge in plugin order, so that the dependent resources are listed
+        # in the same order however the plugins were scheduled.
+        for dependents in plugin_results:
+            for parent, children in dependents:
+                result[parent].extend(children)
+
+        return result
+
+    def _fetch_plugin_dependent_resources(self, context, plugin, resources,
+                                          use_cache):
+        parent_types = plugin.get_parent_resource_types()
+        resource_type = plugin.get_resource_type()
+        result = []
+        parents = []
+        for resource in resources:
+            if resource.type not in parent_types:
+                continue
+            cached = None
+            if use_cache and self._cache.enabled:
+                cached = self._cache.get(self._cache_key(
+                    context, 'dependents', resource_type, resource.key))
+            if cached is None:
+                parents.append(resource)
+            else:
+                result.append((resource, cached))
+        if not parents:
+            return result
+
+        protectable = self._get_protectable(context, resource_type)
+        try:
+            dependents = protectable.get_dependent_resources_bulk(
+                context, parents)
+        except ListProtectableResourceFailed as e:
+            LOG.warning("Bulk list of %(type)s resources failed, list "
+                        "them by parent resource. Error: %(error)s",
+                        {'type': resource_type, 'error': e})
+            dependents = {}
+            for parent in parents:
+                try:
+                    dependents[parent] = \
+                        protectable.get_dependent_resources(context, parent)
+                except ListProtectableResourceFailed as e:
+                    LOG.error("List resources failed, so skip it. "
+                              "Error: {0}".format(e))
+
+        for parent in parents:
+            if parent in dependents:
+                self._cache.put(self._cache_key(
+                    context, 'dependents', resource_type, parent.key),
+                    dependents[parent])
+            result.append((parent, dependents.get(parent) or []))
+        return result
+
     def build_graph(self, context, resources):
-        def fetch_dependent_resources_context(resource):
-            return self.fetch_dependent_resources(context, resource)
+        # Fetch the dependent resources of the graph level by level, so that
+        # the resources of each level are listed in bulk. Graphs are built
+        # to be protected, cached listings may be out of date.
+        dependents = {}
+        level = list(resources)
+        while level:
+            dependents.update(self.fetch_dependent_resources_bulk(
+                context, level, use_cache=False))
+            children = collections.OrderedDict()
+            for parent in level:
+                for child in dependents[parent]:
+                    if child not in dependents:
+                        children[child] = None
+            level = list(children)
 
         return build_graph(
             start_nodes=resources,
-            get_child_nodes_func=fetch_dependent_resources_context,
+            get_child_nodes_func=dependents.__getitem__,
         )
@@ -28,6 +28,22 @@ image_backup_opts = [
                help='The size in bytes of instance image objects. '
                     'The value must be a multiple of 65536('
                     'the size of image\'s chunk).'),
+    cfg.IntOpt('backup_image_upload_concurrency',
+               default=4,
+               min=1,
+               help='The number of image objects uploaded to the bank '
+                    'concurrently while the image is being downloaded.'),
+    cfg.IntOpt('restore_image_download_concurrency',
+               default=4,
+               min=0,
+               help='The maximum number of image objects downloaded from '
+                    'the bank or waiting for the restored image upload. 0 '
+                    'or 1 downloads them one at a time.'),
+    cfg.BoolOpt('backup_image_dedup',
+                default=False,
+                help='Store image objects once in a chunk store shared by '
+                     'all the checkpoints of the bank, identified by the '
+                     'SHA-256 of their content.'),
     cfg.IntOpt('poll_interval', default=10,
                help='Poll interval for image status'),
 ]
@@ -47,12 +63,30 @@ def get_image_status(glance_client, image_id):
     return status
 
 
+def list_image_statuses(glance_client, image_ids):
+    LOG.debug('Listing the statuses of %d images', len(image_ids))
+    images = glance_client.images.list(
+        filters={'id': 'in:' + ','.join(image_ids)})
+    return {image.get('id'): image.get('status') for image in images}
+
+
+def shared_poll_args(glance_client, image_id):
+    """Arguments of utils.status_poll to poll along other images"""
+    return {
+        'poll_group': 'glance.image',
+        'resource_id': image_id,
+        'list_statuses_func': partial(list_image_statuses, glance_client),
+    }
+
+
 class ProtectOperation(protection_plugin.Operation):
     def __init__(self, backup_image_object_size,
-                 poll_interval):
+                 poll_interval, upload_concurrency=1, dedup=False):
         super(ProtectOperation, self).__init__()
         self._data_block_size_bytes = backup_image_object_size
         self._interval = poll_interval
+        self._upload_concurrency = upload_concurrency
+        self._dedup = dedup
 
     def on_main(self, checkpoint, resource, context, parameters, **kwargs):
         image_id = resource.id
@@ -71,7 +105,8 @@ class ProtectOperation(protection_plugin.Operation):
                     interval=self._interval, success_statuses={'active'},
                     ignore_statuses={'queued', 'saving'},
                     failure_statuses={'killed', 'deleted', 'pending_delete',
-                                      'deactivated', 'NotFound'}
+                                      'deactivated', 'NotFound'},
+                    **shared_poll_args(glance_client, image_info.id)
                 )
                 if is_success is not True:
                     LOG.error("The status of image (id: %s) is invalid.",
@@ -106,7 +141,9 @@ class ProtectOperation(protection_plugin.Operation):
             chunks_num = utils.backup_image_to_bank(
                 glance_client,
                 image_id, bank_section,
-                self._data_block_size_bytes
+                self._data_block_size_bytes,
+                upload_concurrency=self._upload_concurrency,
+                dedup=self._dedup
             )
 
             # Save the chunks_num to metadata
@@ -134,6 +171,10 @@ class ProtectOperation(protection_plugin.Operation):
 
 
 class DeleteOperation(protection_plugin.Operation):
+    def __init__(self, concurrency=1):
+        super(DeleteOperation, self).__init__()
+        self._concurrency = concurrency
+
     def on_main(self, checkpoint, resource, context, parameters, **kwargs):
         image_id = resource.id
         bank_section = checkpoint.get_resource_bank_section(image_id)
@@ -142,11 +183,7 @@ class DeleteOperation(protection_plugin.Operation):
         try:
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
-            objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            utils.delete_image_from_bank(bank_section, self._concurrency)
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
         except Exception as err:
@@ -161,9 +198,10 @@ class DeleteOperation(protection_plugin.Operation):
 
 
 class RestoreOperation(protection_plugin.Operation):
-    def __init__(self, poll_interval):
+    def __init__(self, poll_interval, download_concurrency=0):
         super(RestoreOperation, self).__init__()
         self._interval = poll_interval
+        self._download_concurrency = download_concurrency
 
     def on_main(self, checkpoint, resource, context, parameters, **kwargs):
         original_image_id = resource.id
@@ -175,7 +213,8 @@ class RestoreOperation(protection_plugin.Operation):
         image_info = None
         try:
             image_info = utils.restore_image_from_bank(
-                glance_client, bank_section, name)
+                glance_client, bank_section, name,
+                download_concurrency=self._download_concurrency)
 
             if image_info.status != "active":
                 is_success = utils.status_poll(
@@ -183,7 +222,8 @@ class RestoreOperation(protection_plugin.Operation):
                     interval=self._interval, success_statuses={'active'},
                     ignore_statuses={'queued', 'saving'},
                     failure_statuses={'killed', 'deleted', 'pending_delete',
-                                      'deactivated', 'not-found'}
+                                      'deactivated', 'not-found'},
+                    **shared_poll_args(glance_client, image_info.id)
                 )
                 if is_success is not True:
                     LOG.error('The status of image is invalid. status:%s',
@@ -250,6 +290,11 @@ class GlanceProtectionPlugin(protection_plugin.ProtectionPlugin):
         self._data_block_size_bytes = (
             self._plugin_config.backup_image_object_size)
         self._poll_interval = self._plugin_config.poll_interval
+        self._upload_concurrency = (
+            self._plugin_config.backup_image_upload_concurrency)
+        self._download_concurrency = (
+            self._plugin_config.restore_image_download_concurrency)
+        self._dedup = self._plugin_config.backup_image_dedup
 
         if self._data_block_size_bytes % 65536 != 0 or (
                 self._data_block_size_bytes <= 0):
@@ -283,13 +328,16 @@ class GlanceProtectionPlugin(protection_plugin.ProtectionPlugin):
 
     def get_protect_operation(self, resource):
         return ProtectOperation(self._data_block_size_bytes,
-                                self._poll_interval)
+                                self._poll_interval,
+                                self._upload_concurrency,
+                                self._dedup)
 
     def get_restore_operation(self, resource):
-        return RestoreOperation(self._poll_interval)
+        return RestoreOperation(self._poll_interval,
+                                self._download_concurrency)
 
     def get_verify_operation(self, resource):
         return VerifyOperation()
 
     def get_delete_operation(self, resource):
-        return DeleteOperation()
+        return DeleteOperation(self._upload_concurrency)
@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import copy
+from eventlet import greenpool
 from functools import partial
 from neutronclient.common import exceptions
 from oslo_config import cfg
@@ -33,6 +34,12 @@ neutron_backup_opts = [
         'poll_interval', default=15,
         help='Poll interval for Neutron backup status'
     ),
+    cfg.IntOpt(
+        'list_page_size', default=1000, min=0,
+        help='The number of network resources of a kind listed per '
+             'request when backing up the network of a project. 0 lists '
+             'them in a single request.'
+    ),
 ]
 
 
@@ -44,12 +51,31 @@ def get_network_id(cntxt):
 class ProtectOperation(protection_plugin.Operation):
     _SUPPORT_RESOURCE_TYPES = [constants.NETWORK_RESOURCE_TYPE]
 
+    def __init__(self, list_page_size=0):
+        super(ProtectOperation, self).__init__()
+        self._list_page_size = list_page_size
+
+    def _list_resources(self, cntxt, neutron_client, collection,
+                        allowed_keys):
+        """Return the metadata of the resources of a collection, by id
+
+        Only the allowed keys are requested from Neutron, and the resources
+        are listed page by page, each page being trimmed as it arrives.
+        """
+        list_resources = getattr(neutron_client, 'list_' + collection)
+        params = {'fields': allowed_keys}
+        if self._list_page_size:
+            params['limit'] = self._list_page_size
+        resources_metadata = {}
+        for page in list_resources(retrieve_all=False,
+                                   project_id=cntxt.project_id, **params):
+            for resource in page.get(collection, []):
+                resources_metadata[resource["id"]] = {
+                    k: resource[k] for k in resource if k in allowed_keys}
+        return resources_metadata
+
     def _get_resources_by_network(self, cntxt, neutron_client):
         try:
-            networks = neutron_client.list_networks(
-                project_id=cntxt.project_id).get('networks')
-            networks_metadata = {}
-
             allowed_keys = [
                 'id',
                 'admin_state_up',
@@ -68,11 +94,8 @@ class ProtectOperation(protection_plugin.Operation):
                 'tenant_id'
                 ]
 
-            for network in networks:
-                network_metadata = {
-                    k: network[k] for k in network if k in allowed_keys}
-                networks_metadata[network["id"]] = network_metadata
-            return networks_metadata
+            return self._list_resources(
+                cntxt, neutron_client, 'networks', allowed_keys)
         except Exception as e:
             LOG.exception("List all summary networks from neutron failed.")
             raise exception.GetProtectionNetworkSubResourceFailed(
@@ -83,10 +106,6 @@ class ProtectOperation(protection_plugin.Operation):
 
     def _get_resources_by_subnet(self, cntxt, neutron_client):
         try:
-            subnets = neutron_client.list_subnets(
-                project_id=cntxt.project_id).get('subnets')
-            subnets_metadata = {}
-
             allowed_keys = [
                 'cidr',
                 'allocation_pools',
@@ -105,12 +124,8 @@ class ProtectOperation(protection_plugin.Operation):
                 'tenant_id'
                 ]
 
-            for subnet in subnets:
-                subnet_metadata = {
-                    k: subnet[k] for k in subnet if k in allowed_keys}
-                subnets_metadata[subnet["id"]] = subnet_metadata
-
-            return subnets_metadata
+            return self._list_resources(
+                cntxt, neutron_client, 'subnets', allowed_keys)
         except Exception as e:
             LOG.exception("List all summary subnets from neutron failed.")
             raise exception.GetProtectionNetworkSubResourceFailed(
@@ -121,10 +136,6 @@ class ProtectOperation(protection_plugin.Operation):
 
     def _get_resources_by_port(self, cntxt, neutron_client):
         try:
-            ports = neutron_client.list_ports(
-                project_id=cntxt.project_id).get('ports')
-            ports_metadata = {}
-
             allowed_keys = [
                 'admin_state_up',
                 'allowed_address_pairs',
@@ -143,11 +154,8 @@ class ProtectOperation(protection_plugin.Operation):
                 'tenant_id'
                 ]
 
-            for port in ports:
-                port_metadata = {
-                    k: port[k] for k in port if k in allowed_keys}
-                ports_metadata[port["id"]] = port_metadata
-            return ports_metadata
+            return self._list_resources(
+                cntxt, neutron_client, 'ports', allowed_keys)
         except Exception as e:
             LOG.exception("List all summary ports from neutron failed.")
             raise exception.GetProtectionNetworkSubResourceFailed(
@@ -158,12 +166,8 @@ class ProtectOperation(protection_plugin.Operation):
 
     def _get_resources_by_router(self, cntxt, neutron_client):
         try:
-            routers = neutron_client.list_routers(
-                project_id=cntxt.project_id).get('routers')
-            routers_metadata = {}
-
             allowed_keys = [
-                'admin_state_u',
+                'admin_state_up',
                 'availability_zone_hints',
                 'description',
                 'external_gateway_info',
@@ -173,12 +177,8 @@ class ProtectOperation(protection_plugin.Operation):
                 'status'
                 ]
 
-            for router in routers:
-                router_metadata = {
-                    k: router[k] for k in router if k in allowed_keys}
-                routers_metadata[router["id"]] = router_metadata
-
-            return routers_metadata
+            return self._list_resources(
+                cntxt, neutron_client, 'routers', allowed_keys)
         except Exception as e:
             LOG.exception("List all summary routers from neutron failed.")
             raise exception.GetProtectionNetworkSubResourceFailed(
@@ -189,10 +189,6 @@ class ProtectOperation(protection_plugin.Operation):
 
     def _get_resources_by_security_group(self, cntxt, neutron_client):
         try:
-            sgs = neutron_client.list_security_groups(
-                project_id=cntxt.project_id).get('security_groups')
-            sgs_metadata = {}
-
             allowed_keys = [
                 'id',
                 'description',
@@ -201,10 +197,8 @@ class ProtectOperation(protection_plugin.Operation):
                 'tenant_id'
                 ]
 
-            for sg in sgs:
-                sg_metadata = {k: sg[k] for k in sg if k in allowed_keys}
-                sgs_metadata[sg["id"]] = sg_metadata
-            return sgs_metadata
+            return self._list_resources(
+                cntxt, neutron_client, 'security_groups', allowed_keys)
         except Exception as e:
             LOG.exception("List all summary security_groups from neutron "
                           "failed.")
@@ -222,16 +216,21 @@ class ProtectOperation(protection_plugin.Operation):
 
         resource_definition = {"resource_id": network_id}
         resource_definition["backup_name"] = backup_name
-        resource_definition["network_metadata"] = (
-            self._get_resources_by_network(context, neutron_client))
-        resource_definition["subnet_metadata"] = (
-            self._get_resources_by_subnet(context, neutron_client))
-        resource_definition["port_metadata"] = (
-            self._get_resources_by_port(context, neutron_client))
-        resource_definition["router_metadata"] = (
-            self._get_resources_by_router(context, neutron_client))
-        resource_definition["security-group_metadata"] = (
-            self._get_resources_by_security_group(context, neutron_client))
+        # The kinds of resources are listed concurrently
+        collectors = (
+            ("network_metadata", self._get_resources_by_network),
+            ("subnet_metadata", self._get_resources_by_subnet),
+            ("port_metadata", self._get_resources_by_port),
+            ("router_metadata", self._get_resources_by_router),
+            ("security-group_metadata",
+             self._get_resources_by_security_group),
+        )
+        pool = greenpool.GreenPool(len(collectors))
+        resources_metadata = pool.imap(
+            lambda collector: collector[1](context, neutron_client),
+            collectors)
+        for (key, _), metadata in zip(collectors, resources_metadata):
+            resource_definition[key] = metadata
 
         try:
             bank_section.update_object("status",
@@ -683,10 +682,8 @@ class DeleteOperation(protection_plugin.Operation):
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
             objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            bank_section.delete_objects(
+                [obj for obj in objects if obj != "status"])
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
         except Exception as err:
@@ -711,6 +708,7 @@ class NeutronProtectionPlugin(protection_plugin.ProtectionPlugin):
             'neutron_backup_protection_plugin')
         plugin_config = self._config.neutron_backup_protection_plugin
         self._poll_interval = plugin_config.poll_interval
+        self._list_page_size = plugin_config.list_page_size
 
     @classmethod
     def get_supported_resources_types(self):
@@ -738,7 +736,7 @@ class NeutronProtectionPlugin(protection_plugin.ProtectionPlugin):
         pass
 
     def get_protect_operation(self, resource):
-        return ProtectOperation()
+        return ProtectOperation(self._list_page_size)
 
     def get_restore_operation(self, resource):
         return RestoreOperation(self._poll_interval)
@@ -12,13 +12,16 @@
 
 from functools import partial
 
+from eventlet import event
 from novaclient import exceptions
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
 from karbor.common import constants
 from karbor import exception
 from karbor.services.protection.client_factory import ClientFactory
+from karbor.services.protection import graph
 from karbor.services.protection import protection_plugin
 from karbor.services.protection.protection_plugins.server \
     import server_plugin_schemas
@@ -39,7 +42,125 @@ nova_backup_opts = [
 ]
 
 
+# The number of servers whose ports are listed by one request, bounding the
+# length of its URL
+_PORT_LOOKUP_CHUNK_SIZE = 100
+
+# The number of seconds a prefetch is kept for servers of its checkpoint
+# protected late in the flow
+_PREFETCH_TTL = 600
+
+
+class _CheckpointPrefetch(object):
+    def __init__(self, servers_num):
+        super(_CheckpointPrefetch, self).__init__()
+        self.created_at = timeutils.utcnow()
+        self.result = event.Event()
+        # The number of protect operations which haven't got the result yet
+        self.remaining = servers_num
+
+
+class ServerMetadataPrefetch(object):
+    """The ports and volumes of all the servers of a checkpoint
+
+    The first protect operation of a checkpoint lists them at once for every
+    server of its resource graph, the other operations wait for and share
+    its result. Ports and volumes missing from the prefetch, or all of them
+    when it fails, are looked up one by one by the operations.
+
+    The prefetch of a checkpoint is dropped once every server of its graph
+    got it, or after _PREFETCH_TTL seconds, a later protect of the
+    checkpoint lists them again.
+    """
+
+    def __init__(self):
+        super(ServerMetadataPrefetch, self).__init__()
+        self._prefetches = {}
+
+    def _evict_expired(self):
+        for checkpoint_id, prefetch in list(self._prefetches.items()):
+            if (prefetch.result.ready() and
+                    timeutils.is_older_than(prefetch.created_at,
+                                            _PREFETCH_TTL)):
+                del self._prefetches[checkpoint_id]
+
+    def _release(self, checkpoint_id, prefetch):
+        prefetch.remaining -= 1
+        if (prefetch.remaining <= 0 and
+                self._prefetches.get(checkpoint_id) is prefetch):
+            del self._prefetches[checkpoint_id]
+
+    def get(self, checkpoint, context):
+        """Return the ports by mac address and the volumes by id"""
+        self._evict_expired()
+        prefetch = self._prefetches.get(checkpoint.id)
+        if prefetch is not None:
+            try:
+                return prefetch.result.wait()
+            finally:
+                self._release(checkpoint.id, prefetch)
+
+        server_ids, volume_ids = self._list_resources(checkpoint)
+        prefetch = _CheckpointPrefetch(len(server_ids))
+        self._prefetches[checkpoint.id] = prefetch
+        result = ({}, {})
+        try:
+            result = self._fetch(checkpoint, context, server_ids, volume_ids)
+        except Exception as e:
+            LOG.warning("Prefetching the ports and volumes of the servers "
+                        "of checkpoint %(checkpoint_id)s failed: "
+                        "%(reason)s",
+                        {'checkpoint_id': checkpoint.id, 'reason': e})
+        finally:
+            # Wake the other operations even when this one is killed, they
+            # look the ports and volumes up one by one then
+            prefetch.result.send(result)
+            self._release(checkpoint.id, prefetch)
+        return result
+
+    @staticmethod
+    def _list_resources(checkpoint):
+        server_ids = []
+        volume_ids = set()
+        nodes = graph.index_resource_graph(checkpoint.resource_graph or [])
+        for node in nodes.values():
+            if node.value.type != constants.SERVER_RESOURCE_TYPE:
+                continue
+            server_ids.append(node.value.id)
+            volume_ids.update(
+                child_node.value.id for child_node in node.child_nodes
+                if child_node.value.type == constants.VOLUME_RESOURCE_TYPE)
+        server_ids.sort()
+        return server_ids, volume_ids
+
+    def _fetch(self, checkpoint, context, server_ids, volume_ids):
+        ports = {}
+        if server_ids:
+            neutron_client = ClientFactory.create_client("neutron", context)
+            for i in range(0, len(server_ids), _PORT_LOOKUP_CHUNK_SIZE):
+                chunk = server_ids[i:i + _PORT_LOOKUP_CHUNK_SIZE]
+                for port in neutron_client.list_ports(
+                        device_id=chunk)["ports"]:
+                    ports[port["mac_address"]] = port
+
+        volumes = {}
+        if len(volume_ids) > 1:
+            cinder_client = ClientFactory.create_client("cinder", context)
+            for volume in cinder_client.volumes.list(detailed=True):
+                if volume.id in volume_ids:
+                    volumes[volume.id] = volume
+        LOG.debug("Prefetched %(ports)d ports of %(servers)d servers and "
+                  "%(volumes)d volumes for checkpoint %(checkpoint_id)s",
+                  {'ports': len(ports), 'servers': len(server_ids),
+                   'volumes': len(volumes), 'checkpoint_id': checkpoint.id})
+        return ports, volumes
+
+
 class ProtectOperation(protection_plugin.Operation):
+    def __init__(self, prefetch=None):
+        super(ProtectOperation, self).__init__()
+        self._prefetch = prefetch or ServerMetadataPrefetch()
+
     def on_main(self, checkpoint, resource, context, parameters, **kwargs):
         server_id = resource.id
         bank_section = checkpoint.get_resource_bank_section(server_id)
@@ -47,16 +168,15 @@ class ProtectOperation(protection_plugin.Operation):
         nova_client = ClientFactory.create_client("nova", context)
         cinder_client = ClientFactory.create_client("cinder", context)
         neutron_client = ClientFactory.create_client("neutron", context)
+        ports, volumes = self._prefetch.get(checkpoint, context)
 
         resource_definition = {"resource_id": server_id}
 
         # get dependent resources
         server_child_nodes = []
-        resources = checkpoint.resource_graph
-        for resource_node in resources:
-            resource = resource_node.value
-            if resource.id == server_id:
-                server_child_nodes = resource_node.child_nodes
+        server_node = checkpoint.get_resource_graph_node(server_id)
+        if server_node is not None:
+            server_child_nodes = server_node.child_nodes
 
         LOG.info("Creating server backup, server_id: %s. ", server_id)
         try:
@@ -68,7 +188,9 @@ class ProtectOperation(protection_plugin.Operation):
             for server_child_node in server_child_nodes:
                 child_resource = server_child_node.value
                 if child_resource.type == constants.VOLUME_RESOURCE_TYPE:
-                    volume = cinder_client.volumes.get(child_resource.id)
+                    volume = volumes.get(child_resource.id)
+                    if volume is None:
+                        volume = cinder_client.volumes.get(child_resource.id)
                     attachments = getattr(volume, "attachments")
                     for attachment in attachments:
                         if attachment["server_id"] == server_id:
@@ -91,8 +213,10 @@ class ProtectOperation(protection_plugin.Operation):
                     mac = network_info.get("OS-EXT-IPS-MAC:mac_addr")
                     network_type = network_info.get("OS-EXT-IPS:type")
                     if network_type == 'fixed':
-                        port = neutron_client.list_ports(
-                            mac_address=mac)["ports"][0]
+                        port = ports.get(mac)
+                        if port is None:
+                            port = neutron_client.list_ports(
+                                mac_address=mac)["ports"][0]
                         if port["network_id"] not in networks:
                             networks.append(port["network_id"])
                     elif network_type == "floating":
@@ -162,10 +286,8 @@ class DeleteOperation(protection_plugin.Operation):
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
             objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            bank_section.delete_objects(
+                [obj for obj in objects if obj != "status"])
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
             LOG.info("finish delete server, server_id: %s.", resource_id)
@@ -382,7 +504,8 @@ class RestoreOperation(protection_plugin.Operation):
             interval=self._interval,
             success_statuses={'in-use', },
             failure_statuses={'ERROR', },
-            ignore_statuses={'available', 'attaching'}
+            ignore_statuses={'available', 'attaching'},
+            poll_group='cinder.volume', resource_id=volume_id,
         )
         if not is_success:
             raise Exception('Attach the volume to server failed')
@@ -407,6 +530,7 @@ class RestoreOperation(protection_plugin.Operation):
             ignore_statuses={'BUILD', 'HARD_REBOOT', 'PASSWORD', 'REBOOT',
                              'RESCUE', 'RESIZE', 'REVERT_RESIZE', 'SHUTOFF',
                              'SUSPENDED', 'VERIFY_RESIZE'},
+            poll_group='nova.server', resource_id=server_id,
         )
         if not is_success:
             raise Exception('The server does not start successfully')
@@ -441,6 +565,9 @@ class NovaProtectionPlugin(protection_plugin.ProtectionPlugin):
                                    'nova_backup_protection_plugin')
         self._poll_interval = (
             self._config.nova_backup_protection_plugin.poll_interval)
+        # The plugin is loaded for each flow, its protect operations share
+        # the prefetch of the servers of the flow
+        self._prefetch = ServerMetadataPrefetch()
 
     @classmethod
     def get_supported_resources_types(cls):
@@ -467,7 +594,7 @@ class NovaProtectionPlugin(protection_plugin.ProtectionPlugin):
         pass
 
     def get_protect_operation(self, resource):
-        return ProtectOperation()
+        return ProtectOperation(self._prefetch)
 
     def get_restore_operation(self, resource):
         return RestoreOperation(self._poll_interval)
@@ -9,58 +9,241 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
-from io import BytesIO
-import os
+import hashlib
+import random
+import time
 
+import eventlet
+from eventlet import event
+from eventlet import greenpool
+from eventlet import queue
 from oslo_log import log as logging
-from oslo_service import loopingcall
 
 from karbor.services.protection.bank_plugin import BankIO
 
 LOG = logging.getLogger(__name__)
 
 
-def backup_image_to_bank(glance_client, image_id, bank_section, object_size):
-    image_response = glance_client.images.data(image_id, do_checksum=True)
-    bank_chunk_num = int(object_size / 65536)
+_CHUNK_STORE_SECTION = "/chunk-store"
+_CHUNK_MANIFEST = "chunks"
+
+# Status polls start after _POLL_FIRST_INTERVAL seconds and back off by
+# _POLL_BACKOFF_FACTOR up to the poll interval of the plugin, each delay is
+# shortened by up to _POLL_JITTER of its length.
+_POLL_FIRST_INTERVAL = 1
+_POLL_BACKOFF_FACTOR = 2
+_POLL_JITTER = 0.2
+
+
+class _ChunkStore(object):
+    """Content addressed store of image objects shared by all checkpoints.
+
+    An object is stored once under data/<sha256>/ and every resource section
+    using it holds a reference under refs/<sha256>/. The object is deleted
+    when its last reference is released.
+
+    A reference is written before the object is looked up, and the
+    references are listed again after the object is deleted. A backup which
+    found the object in the store checks that it is still there before
+    saving its chunks manifest, so that a backup racing the delete fails
+    instead of referencing a deleted object.
+    """
+
+    def __init__(self, bank_section):
+        super(_ChunkStore, self).__init__()
+        self.section = bank_section.bank.get_sub_section(_CHUNK_STORE_SECTION)
+        self._ref = bank_section.prefix.strip("/").replace("/", "@")
+
+    @staticmethod
+    def data_key(digest):
+        return "data/%s/object" % digest
+
+    def _ref_key(self, digest):
+        return "refs/%s/%s" % (digest, self._ref)
+
+    def exists(self, digest):
+        return self.section.object_exists(self.data_key(digest))
+
+    def _referenced(self, digest):
+        return len(self.section.list_objects(prefix="refs/%s/" % digest,
+                                             limit=1)) > 0
+
+    def put(self, digest, data):
+        """Store the object of digest, return False if it was already in"""
+        self.section.update_object(self._ref_key(digest), self._ref)
+        if self.exists(digest):
+            return False
+        self.section.update_object(self.data_key(digest), data)
+        return True
+
+    def release(self, digest):
+        try:
+            self.section.delete_object(self._ref_key(digest))
+            if self._referenced(digest):
+                return
+            self.section.delete_object(self.data_key(digest))
+            if self._referenced(digest):
+                LOG.warning("Image object %s was referenced while it was "
+                            "deleted", digest)
+        except Exception as err:
+            # A reference or an object left behind only takes space in the
+            # bank
+            LOG.warning("Failed to release image object %(digest)s: "
+                        "%(err)s", {'digest': digest, 'err': err})
+
+
+class _BankObjectUploader(object):
+    """Upload data_N bank objects in the background.
+
+    At most `concurrency` uploads are in flight, further uploads block the
+    caller until one of them finishes. The first upload error is raised by
+    the next call to upload or wait.
+
+    Objects uploaded with a digest are stored in the chunk store instead,
+    each distinct content being uploaded once.
+    """
+
+    def __init__(self, bank_section, concurrency, chunk_store=None):
+        super(_BankObjectUploader, self).__init__()
+        self._bank_section = bank_section
+        self._pool = greenpool.GreenPool(concurrency)
+        self._errors = []
+        self._chunk_store = chunk_store
+        self._digests = []
+        self._stored = set()
+        self._found = set()
+
+    def _upload(self, number, data, digest=None):
+        key = "data_" + str(number)
+        try:
+            if digest is None:
+                self._bank_section.update_object(key, data)
+            elif not self._chunk_store.put(digest, data):
+                self._found.add(digest)
+        except Exception as err:
+            LOG.error("Failed to upload bank object %(key)s: %(err)s",
+                      {'key': key, 'err': err})
+            self._errors.append(err)
+
+    def _check_errors(self):
+        if self._errors:
+            raise self._errors[0]
 
-    image_chunks_num = 0
-    chunks_num = 1
-    image_response_data = BytesIO()
+    def upload(self, number, data, digest=None):
+        """Upload data_<number>, or the object of digest if not stored yet"""
+        self._check_errors()
+        if digest is not None:
+            self._digests.append(digest)
+            if digest in self._stored:
+                return
+            self._stored.add(digest)
+        self._pool.spawn_n(self._upload, number, data, digest)
+
+    def wait(self, reraise=True):
+        self._pool.waitall()
+        if reraise:
+            self._check_errors()
+
+    def save_manifest(self):
+        """Save the digests of the uploaded objects to the chunks object.
+
+        The objects found in the chunk store instead of uploaded are checked
+        to still be there, the release of their last other reference may
+        have deleted them.
+        """
+        found = list(self._found)
+        missing = [digest for digest, exists
+                   in zip(found, self._pool.imap(self._chunk_store.exists,
+                                                 found))
+                   if not exists]
+        if missing:
+            raise Exception("The image objects %s were deleted from the "
+                            "chunk store" % ", ".join(missing))
+        self._bank_section.update_object(_CHUNK_MANIFEST, self._digests)
+
+    def release(self):
+        for digest in self._stored:
+            self._chunk_store.release(digest)
+
+
+def _split_image_data(image_response, object_size):
+    """Yield the data of an image in objects of object_size bytes."""
+    buf = memoryview(bytearray(object_size))
+    buf_len = 0
     for chunk in image_response:
-        image_response_data.write(chunk)
-        image_chunks_num += 1
-        if image_chunks_num == bank_chunk_num:
-            image_chunks_num = 0
-            image_response_data.seek(0, os.SEEK_SET)
-            data = image_response_data.read(object_size)
-            bank_section.update_object("data_" + str(chunks_num), data)
-            image_response_data.truncate(0)
-            image_response_data.seek(0, os.SEEK_SET)
-            chunks_num += 1
+        chunk = memoryview(chunk)
+        while len(chunk) > 0:
+            size = min(len(chunk), object_size - buf_len)
+            buf[buf_len:buf_len + size] = chunk[:size]
+            buf_len += size
+            chunk = chunk[size:]
+            if buf_len == object_size:
+                yield buf.tobytes()
+                buf_len = 0
 
-    image_response_data.seek(0, os.SEEK_SET)
-    data = image_response_data.read()
-    if data != '':
-        bank_section.update_object("data_" + str(chunks_num), data)
-    else:
-        chunks_num -= 1
+    if buf_len > 0:
+        yield buf[:buf_len].tobytes()
+
+
+def backup_image_to_bank(glance_client, image_id, bank_section, object_size,
+                         upload_concurrency=1, dedup=False):
+    """Copy the data of an image to data_N objects of object_size bytes.
+
+    The image is downloaded while previous objects are being uploaded, with
+    at most upload_concurrency uploads in flight.
+
+    With dedup, the objects are stored in the chunk store of the bank, which
+    is shared by all checkpoints, and the resource section only keeps their
+    digests in the chunks object.
+    """
+    image_response = glance_client.images.data(image_id, do_checksum=True)
+    chunk_store = _ChunkStore(bank_section) if dedup else None
+    uploader = _BankObjectUploader(bank_section, upload_concurrency,
+                                   chunk_store)
+    chunks_num = 0
+    try:
+        for data in _split_image_data(image_response, object_size):
+            chunks_num += 1
+            digest = None
+            if chunk_store is not None:
+                digest = hashlib.sha256(data).hexdigest()
+            uploader.upload(chunks_num, data, digest)
+        uploader.wait()
+        if chunk_store is not None:
+            uploader.save_manifest()
+    except Exception:
+        uploader.wait(reraise=False)
+        if chunk_store is not None:
+            uploader.release()
+        raise
     return chunks_num
 
 
-def restore_image_from_bank(glance_client, bank_section, restore_name):
+def restore_image_from_bank(glance_client, bank_section, restore_name,
+                            download_concurrency=0):
     resource_definition = bank_section.get_object('metadata')
     image_metadata = resource_definition['image_metadata']
-    objects = [key.split("/")[-1] for key in
-               bank_section.list_objects()
-               if (key.split("/")[-1]).startswith("data_")]
-
+    keys = [key.split("/")[-1] for key in bank_section.list_objects()]
     chunks_num = resource_definition.get("chunks_num", 0)
-    if len(objects) != int(chunks_num):
-        raise Exception("The chunks num of restored image is invalid")
 
-    sorted_objects = sorted(objects, key=lambda s: int(s[5:]))
-    image_data = BankIO(bank_section, sorted_objects)
+    if _CHUNK_MANIFEST in keys:
+        digests = bank_section.get_object(_CHUNK_MANIFEST)
+        if len(digests) != int(chunks_num):
+            raise Exception("The chunks num of restored image is invalid")
+        chunk_store = _ChunkStore(bank_section)
+        image_data = BankIO(chunk_store.section,
+                            [chunk_store.data_key(digest)
+                             for digest in digests],
+                            prefetch=download_concurrency)
+    else:
+        objects = [key for key in keys if key.startswith("data_")]
+        if len(objects) != int(chunks_num):
+            raise Exception("The chunks num of restored image is invalid")
+
+        sorted_objects = sorted(objects, key=lambda s: int(s[5:]))
+        image_data = BankIO(bank_section, sorted_objects,
+                            prefetch=download_concurrency)
+
     disk_format = image_metadata["disk_format"]
     container_format = image_metadata["container_format"]
     image = glance_client.images.create(
@@ -75,6 +258,24 @@ def restore_image_from_bank(glance_client, bank_section, restore_name):
     return image_info
 
 
+def delete_image_from_bank(bank_section, concurrency=1):
+    """Delete the image objects of a resource section, except its status.
+
+    The references of the section to objects of the chunk store are released
+    first, so that a failed delete can be retried. Objects left without
+    references are deleted from the chunk store.
+    """
+    keys = bank_section.list_objects()
+    if _CHUNK_MANIFEST in keys:
+        chunk_store = _ChunkStore(bank_section)
+        digests = set(bank_section.get_object(_CHUNK_MANIFEST))
+        pool = greenpool.GreenPool(concurrency)
+        for _ in pool.imap(chunk_store.release, digests):
+            pass
+
+    bank_section.delete_objects([key for key in keys if key != "status"])
+
+
 def update_resource_restore_result(restore_record, resource_type, resource_id,
                                    status, reason=''):
     try:
@@ -91,22 +292,219 @@ def update_resource_restore_result(restore_record, resource_type, resource_id,
         pass
 
 
-def status_poll(get_status_func, interval, success_statuses=set(),
-                failure_statuses=set(), ignore_statuses=set(),
-                ignore_unexpected=False):
-    def _poll():
-        status = get_status_func()
+def _status_checker(success_statuses, failure_statuses, ignore_statuses,
+                    ignore_unexpected):
+    def _check(status):
         if status in success_statuses:
-            raise loopingcall.LoopingCallDone(retvalue=True)
+            return True
         if status in failure_statuses:
-            raise loopingcall.LoopingCallDone(retvalue=False)
+            return False
         if status in ignore_statuses:
-            return
+            return None
         if ignore_unexpected is False:
-            raise loopingcall.LoopingCallDone(retvalue=False)
+            return False
+    return _check
+
+
+def _next_poll_delay(delay, interval):
+    """Return the delay before the next poll and the backoff to keep"""
+    backoff = min(delay * _POLL_BACKOFF_FACTOR, interval)
+    return backoff * random.uniform(1 - _POLL_JITTER, 1), backoff
+
+
+class _StatusWaiter(object):
+    def __init__(self, resource_id, get_status_func, list_statuses_func,
+                 check_func, interval, notified=False):
+        super(_StatusWaiter, self).__init__()
+        self.resource_id = resource_id
+        self.get_status_func = get_status_func
+        self.list_statuses_func = list_statuses_func
+        self.check_func = check_func
+        self.interval = interval
+        self.backoff = min(_POLL_FIRST_INTERVAL, interval)
+        self.deadline = time.time() + self.backoff
+        self.result = event.Event()
+        self.cancelled = False
+        # Statuses are notified, polls after the first one are only a
+        # fallback for missed notifications.
+        self.notified = notified
+
+    @property
+    def finished(self):
+        return self.cancelled or self.result.ready()
+
+    def update(self, status):
+        """Check a polled status, return True when the wait is over"""
+        try:
+            result = self.check_func(status)
+        except Exception as e:
+            self.result.send_exception(e)
+            return True
+        if result is not None:
+            self.result.send(result)
+            return True
+        if self.notified:
+            self.backoff = self.interval
+        delay, self.backoff = _next_poll_delay(self.backoff, self.interval)
+        self.deadline = time.time() + delay
+        return False
+
+
+class StatusPoller(object):
+    """Poll the statuses of a group of resources from a single green thread.
+
+    Whenever a resource is due, the statuses of all the waiting resources
+    that can be listed together are fetched with one call of the
+    list_statuses_func of the due resource, so that every waiter sees the
+    new status of its resource as soon as any of them polls. Resources
+    missing from the listing, or without list_statuses_func, are polled
+    with their own get_status_func.
+    """
+
+    def __init__(self, name):
+        super(StatusPoller, self).__init__()
+        self.name = name
+        self._waiters = []
+        self._wakeup = queue.LightQueue()
+        self._thread = None
+
+    def wait(self, waiter):
+        self._waiters.append(waiter)
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+        else:
+            self._wakeup.put(None)
+        try:
+            return waiter.result.wait()
+        finally:
+            # Stop polling for waiters killed while waiting
+            waiter.cancelled = True
+
+    def notify(self, resource_id, status):
+        """Update the waiters of a resource with a status it reached"""
+        for waiter in self._waiters:
+            if waiter.resource_id == resource_id and not waiter.finished:
+                waiter.update(status)
+
+    def _run(self):
+        try:
+            while True:
+                self._waiters = [waiter for waiter in self._waiters
+                                 if not waiter.finished]
+                if not self._waiters:
+                    return
+                timeout = min(waiter.deadline for waiter in self._waiters)
+                try:
+                    self._wakeup.get(timeout=max(timeout - time.time(), 0))
+                    continue
+                except queue.Empty:
+                    pass
+                self._poll(self._waiters)
+        except Exception as e:
+            LOG.exception("The status poller of %s resources failed",
+                          self.name)
+            for waiter in self._waiters:
+                if not waiter.finished:
+                    waiter.result.send_exception(e)
+        finally:
+            # The next waiter starts a new thread
+            self._thread = None
+
+    def _list_statuses(self, due, waiters):
+        listed = [waiter for waiter in waiters
+                  if waiter.list_statuses_func is not None]
+        listing = next((waiter for waiter in due
+                        if waiter.list_statuses_func is not None), None)
+        if listing is None or len(listed) < 2:
+            return {}
+        resource_ids = sorted({waiter.resource_id for waiter in listed})
+        try:
+            statuses = listing.list_statuses_func(resource_ids)
+        except Exception as e:
+            LOG.warning("Listing the statuses of %(name)s resources failed, "
+                        "poll them one by one. Error: %(error)s",
+                        {'name': self.name, 'error': e})
+            return {}
+        return {waiter: statuses[waiter.resource_id] for waiter in listed
+                if waiter.resource_id in statuses}
+
+    def _poll(self, waiters):
+        now = time.time()
+        due = [waiter for waiter in waiters if waiter.deadline <= now]
+        statuses = self._list_statuses(due, waiters)
+        for waiter in due:
+            if waiter in statuses:
+                continue
+            try:
+                statuses[waiter] = waiter.get_status_func()
+            except Exception as e:
+                # The waiter may have been notified meanwhile
+                if not waiter.finished:
+                    waiter.result.send_exception(e)
+        for waiter, status in statuses.items():
+            if not waiter.finished:
+                waiter.update(status)
+
+
+_status_pollers = {}
+_notified_poll_groups = set()
+
+
+def _get_status_poller(poll_group):
+    poller = _status_pollers.get(poll_group)
+    if poller is None:
+        poller = _status_pollers[poll_group] = StatusPoller(poll_group)
+    return poller
+
+
+def set_notified_poll_groups(poll_groups):
+    """Set the poll groups whose statuses are notified with notify_status"""
+    _notified_poll_groups.clear()
+    _notified_poll_groups.update(poll_groups)
+
+
+def notify_status(poll_group, resource_id, status):
+    """Wake the waiters of a resource polled in poll_group with its status"""
+    poller = _status_pollers.get(poll_group)
+    if poller is not None:
+        poller.notify(resource_id, status)
+
+
+def status_poll(get_status_func, interval, success_statuses=set(),
+                failure_statuses=set(), ignore_statuses=set(),
+                ignore_unexpected=False, poll_group=None, resource_id=None,
+                list_statuses_func=None):
+    """Wait for a resource to reach a success or failure status.
+
+    The status is first polled after at most _POLL_FIRST_INTERVAL seconds,
+    then with an exponential backoff and jitter up to interval seconds.
+
+    :param poll_group: The name of a shared StatusPoller, resources polled
+                       with the same poll_group are polled together.
+    :param resource_id: The id of the resource, required with poll_group.
+    :param list_statuses_func: A function returning a dict mapping resource
+                               ids to their statuses, used by the shared
+                               poller to poll several resources in one call.
+
+    When the statuses of poll_group are notified, the waiter is woken by
+    notify_status and polls after the first one happen every interval.
+    :return: True on success, False on failure.
+    """
+    check = _status_checker(success_statuses, failure_statuses,
+                            ignore_statuses, ignore_unexpected)
+    if poll_group is not None:
+        waiter = _StatusWaiter(resource_id, get_status_func,
+                               list_statuses_func, check, interval,
+                               poll_group in _notified_poll_groups)
+        return _get_status_poller(poll_group).wait(waiter)
 
-    loop = loopingcall.FixedIntervalLoopingCall(_poll)
-    return loop.start(interval=interval, initial_delay=interval).wait()
+    delay = backoff = min(_POLL_FIRST_INTERVAL, interval)
+    while True:
+        eventlet.sleep(delay)
+        result = check(get_status_func())
+        if result is not None:
+            return result
+        delay, backoff = _next_poll_delay(backoff, interval)
 
 
 def update_resource_verify_result(verify_record, resource_type, resource_id,
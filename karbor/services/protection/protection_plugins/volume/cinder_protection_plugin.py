@@ -54,6 +54,47 @@ def get_snapshot_status(cinder_client, snapshot_id):
                                'snapshot')
 
 
+# Shared polls list a page of _LIST_PAGE_FACTOR times as many resources as
+# they poll, and at least _LIST_PAGE_MIN
+_LIST_PAGE_FACTOR = 4
+_LIST_PAGE_MIN = 20
+
+
+def list_resource_statuses(resource_manager, resource_ids):
+    """Return the statuses of the polled resources found in a page
+
+    Cinder lists the newest resources first, where the resources being
+    created or backed up usually are. Only one page is listed, the resources
+    missing from it are polled one at a time by the shared poller.
+    """
+    resource_ids = set(resource_ids)
+    limit = max(len(resource_ids) * _LIST_PAGE_FACTOR, _LIST_PAGE_MIN)
+    LOG.debug('Listing the statuses of %(num)d resources in a page of '
+              '%(limit)d', {'num': len(resource_ids), 'limit': limit})
+    return {resource.id: resource.status
+            for resource in resource_manager.list(detailed=True, limit=limit)
+            if resource.id in resource_ids}
+
+
+_RESOURCE_MANAGERS = {
+    'backup': 'backups',
+    'snapshot': 'volume_snapshots',
+    'volume': 'volumes',
+}
+
+
+def shared_poll_args(cinder_client, resource_type, resource_id):
+    """Arguments of utils.status_poll to poll along other resources"""
+    resource_manager = getattr(cinder_client,
+                               _RESOURCE_MANAGERS[resource_type])
+    return {
+        'poll_group': 'cinder.%s' % resource_type,
+        'resource_id': resource_id,
+        'list_statuses_func': partial(list_resource_statuses,
+                                      resource_manager),
+    }
+
+
 def get_resource_status(resource_manager, resource_id, resource_type):
     LOG.debug('Polling %(resource_type)s (id: %(resource_id)s)', {
         'resource_type': resource_type,
@@ -93,6 +134,7 @@ class ProtectOperation(protection_plugin.Operation):
             failure_statuses={'error', 'error_deleting', 'deleting',
                               'not-found'},
             ignore_statuses={'creating', },
+            **shared_poll_args(cinder_client, 'snapshot', snapshot_id)
         )
         if not is_success:
             raise Exception
@@ -108,6 +150,7 @@ class ProtectOperation(protection_plugin.Operation):
             success_statuses={'not-found', },
             failure_statuses={'error', 'error_deleting', 'creating'},
             ignore_statuses={'deleting', },
+            **shared_poll_args(cinder_client, 'snapshot', snapshot_id)
         )
 
     def _create_backup(self, cinder_client, volume_id, backup_name,
@@ -130,6 +173,7 @@ class ProtectOperation(protection_plugin.Operation):
             success_statuses={'available'},
             failure_statuses={'error'},
             ignore_statuses={'creating'},
+            **shared_poll_args(cinder_client, 'backup', backup_id)
         )
 
         if not is_success:
@@ -187,6 +231,7 @@ class ProtectOperation(protection_plugin.Operation):
                               'not-found'},
             ignore_statuses={'attaching', 'creating', 'backing-up',
                              'restoring-backup'},
+            **shared_poll_args(cinder_client, 'volume', volume_id)
         )
         if not is_success:
             bank_section.update_object('status',
@@ -308,6 +353,7 @@ class RestoreOperation(protection_plugin.Operation):
             success_statuses={'available'},
             failure_statuses={'error', 'not-found'},
             ignore_statuses={'creating', 'restoring-backup', 'downloading'},
+            **shared_poll_args(cinder_client, 'volume', volume_id)
         )
 
 
@@ -378,6 +424,7 @@ class DeleteOperation(protection_plugin.Operation):
                 success_statuses={'deleted', 'not-found'},
                 failure_statuses={'error', 'error_deleting'},
                 ignore_statuses={'deleting'},
+                **shared_poll_args(cinder_client, 'backup', backup_id)
             )
             if not is_success:
                 raise exception.NotFound()
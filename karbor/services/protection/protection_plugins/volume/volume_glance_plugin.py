@@ -41,6 +41,23 @@ volume_glance_opts = [
                help='The size in bytes of temporary image objects. '
                     'The value must be a multiple of 65536('
                     'the size of image\'s chunk).'),
+    cfg.IntOpt('backup_image_upload_concurrency',
+               default=4,
+               min=1,
+               help='The number of temporary image objects uploaded to the '
+                    'bank concurrently while the image is being '
+                    'downloaded.'),
+    cfg.IntOpt('restore_image_download_concurrency',
+               default=4,
+               min=0,
+               help='The maximum number of temporary image objects '
+                    'downloaded from the bank or waiting for the temporary '
+                    'image upload. 0 or 1 downloads them one at a time.'),
+    cfg.BoolOpt('backup_image_dedup',
+                default=False,
+                help='Store temporary image objects once in a chunk store '
+                     'shared by all the checkpoints of the bank, identified '
+                     'by the SHA-256 of their content.'),
 ]
 
 VOLUME_SUCCESS_STATUSES = {'available', 'in-use',
@@ -90,11 +107,14 @@ def get_resource_status(resource_manager, resource_id, resource_type):
 
 
 class ProtectOperation(protection_plugin.Operation):
-    def __init__(self, poll_interval, backup_from_snapshot, image_object_size):
+    def __init__(self, poll_interval, backup_from_snapshot, image_object_size,
+                 upload_concurrency=1, dedup=False):
         super(ProtectOperation, self).__init__()
         self._interval = poll_interval
         self._backup_from_snapshot = backup_from_snapshot
         self._image_object_size = image_object_size
+        self._upload_concurrency = upload_concurrency
+        self._dedup = dedup
 
     def _create_snapshot(self, cinder_client, volume_id):
         LOG.info("Start creating snapshot of volume({0}).".format(volume_id))
@@ -112,6 +132,7 @@ class ProtectOperation(protection_plugin.Operation):
             failure_statuses={'error', 'error_deleting', 'deleting',
                               'not-found'},
             ignore_statuses={'creating', },
+            poll_group='cinder.snapshot', resource_id=snapshot_id,
         )
         if is_success is not True:
             try:
@@ -145,6 +166,7 @@ class ProtectOperation(protection_plugin.Operation):
             success_statuses=VOLUME_SUCCESS_STATUSES,
             failure_statuses=VOLUME_FAILURE_STATUSES,
             ignore_statuses=VOLUME_IGNORE_STATUSES,
+            poll_group='cinder.volume', resource_id=volume.id,
         )
         volume = cinder_client.volumes.get(volume.id)
         if is_success is not True:
@@ -178,7 +200,8 @@ class ProtectOperation(protection_plugin.Operation):
             interval=self._interval, success_statuses={'active'},
             ignore_statuses={'queued', 'saving'},
             failure_statuses={'killed', 'deleted', 'pending_delete',
-                              'deactivated', 'NotFound'}
+                              'deactivated', 'NotFound'},
+            poll_group='glance.image', resource_id=image_id,
         )
         image_info = glance_client.images.get(image_id)
         if is_success is not True:
@@ -201,7 +224,9 @@ class ProtectOperation(protection_plugin.Operation):
                 glance_client,
                 image_id,
                 bank_section,
-                self._image_object_size
+                self._image_object_size,
+                upload_concurrency=self._upload_concurrency,
+                dedup=self._dedup
             )
             image_info = glance_client.images.get(image_id)
             image_resource_definition = {
@@ -239,6 +264,7 @@ class ProtectOperation(protection_plugin.Operation):
             success_statuses=VOLUME_SUCCESS_STATUSES,
             failure_statuses=VOLUME_FAILURE_STATUSES,
             ignore_statuses=VOLUME_IGNORE_STATUSES,
+            poll_group='cinder.volume', resource_id=volume_id,
         )
         if not is_success:
             bank_section.update_object('status',
@@ -311,9 +337,10 @@ class ProtectOperation(protection_plugin.Operation):
 
 
 class RestoreOperation(protection_plugin.Operation):
-    def __init__(self, poll_interval):
+    def __init__(self, poll_interval, download_concurrency=0):
         super(RestoreOperation, self).__init__()
         self._interval = poll_interval
+        self._download_concurrency = download_concurrency
 
     def _create_volume_from_image(self, cinder_client, temporary_image,
                                   restore_name, original_vol_id, volume_size,
@@ -329,7 +356,8 @@ class RestoreOperation(protection_plugin.Operation):
             interval=self._interval,
             success_statuses=VOLUME_SUCCESS_STATUSES,
             failure_statuses=VOLUME_FAILURE_STATUSES,
-            ignore_statuses=VOLUME_IGNORE_STATUSES
+            ignore_statuses=VOLUME_IGNORE_STATUSES,
+            poll_group='cinder.volume', resource_id=volume.id,
         )
         if not is_success:
             LOG.error("Restore volume glance backup failed, volume_id: %s.",
@@ -383,7 +411,8 @@ class RestoreOperation(protection_plugin.Operation):
         try:
             image_info = utils.restore_image_from_bank(
                 glance_client, bank_section,
-                'temporary_image_of_{0}'.format(original_volume_id))
+                'temporary_image_of_{0}'.format(original_volume_id),
+                download_concurrency=self._download_concurrency)
 
             if image_info.status != "active":
                 is_success = utils.status_poll(
@@ -391,7 +420,8 @@ class RestoreOperation(protection_plugin.Operation):
                     interval=self._interval, success_statuses={'active'},
                     ignore_statuses={'queued', 'saving'},
                     failure_statuses={'killed', 'deleted', 'pending_delete',
-                                      'deactivated', 'not-found'}
+                                      'deactivated', 'not-found'},
+                    poll_group='glance.image', resource_id=image_info.id,
                 )
                 if is_success is not True:
                     LOG.error('The status of image is invalid. status:%s',
@@ -417,6 +447,10 @@ class RestoreOperation(protection_plugin.Operation):
 
 
 class DeleteOperation(protection_plugin.Operation):
+    def __init__(self, concurrency=1):
+        super(DeleteOperation, self).__init__()
+        self._concurrency = concurrency
+
     def on_main(self, checkpoint, resource, context, parameters, **kwargs):
         volume_id = resource.id
         bank_section = checkpoint.get_resource_bank_section(volume_id)
@@ -425,11 +459,7 @@ class DeleteOperation(protection_plugin.Operation):
         try:
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
-            objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            utils.delete_image_from_bank(bank_section, self._concurrency)
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
         except Exception as err:
@@ -454,6 +484,11 @@ class VolumeGlanceProtectionPlugin(protection_plugin.ProtectionPlugin):
         self._poll_interval = self._plugin_config.poll_interval
         self._backup_from_snapshot = self._plugin_config.backup_from_snapshot
         self._image_object_size = self._plugin_config.backup_image_object_size
+        self._upload_concurrency = (
+            self._plugin_config.backup_image_upload_concurrency)
+        self._download_concurrency = (
+            self._plugin_config.restore_image_download_concurrency)
+        self._dedup = self._plugin_config.backup_image_dedup
 
     @classmethod
     def get_supported_resources_types(cls):
@@ -478,10 +513,13 @@ class VolumeGlanceProtectionPlugin(protection_plugin.ProtectionPlugin):
     def get_protect_operation(self, resource):
         return ProtectOperation(self._poll_interval,
                                 self._backup_from_snapshot,
-                                self._image_object_size)
+                                self._image_object_size,
+                                self._upload_concurrency,
+                                self._dedup)
 
     def get_restore_operation(self, resource):
-        return RestoreOperation(self._poll_interval)
+        return RestoreOperation(self._poll_interval,
+                                self._download_concurrency)
 
     def get_delete_operation(self, resource):
-        return DeleteOperation()
+        return DeleteOperation(self._upload_concurrency)
@@ -14,8 +14,10 @@ import os
 
 from karbor import exception
 from karbor.i18n import _
+from karbor.services.protection import api_limiter
 from karbor.services.protection import bank_plugin
 from karbor.services.protection.checkpoint import CheckpointCollection
+from karbor.services.protection.flows import workflow
 from karbor import utils
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -39,6 +41,19 @@ provider_opts = [
     cfg.BoolOpt('enabled',
                 default=False,
                 help='enabled or not'),
+    cfg.StrOpt('flow_executor',
+               choices=workflow.FLOW_EXECUTORS,
+               help='The flow executor of the provider, overriding the '
+                    'flow_executor of the protection service.'),
+    cfg.IntOpt('flow_executor_max_workers',
+               min=1,
+               help='The size of a green thread pool used only by the flows '
+                    'of the provider, instead of the pool of the protection '
+                    'service.'),
+    cfg.DictOpt('flow_executor_operations',
+                default={},
+                help='The flow executor of some operation types of the '
+                     'provider. For example "protect:green,delete:serial".'),
 ]
 CONF = cfg.CONF
 
@@ -54,6 +69,8 @@ CONF.register_opt(cfg.StrOpt('provider_config_dir',
 
 
 class PluggableProtectionProvider(object):
+    _api_limiter = None
+
     def __init__(self, provider_config):
         super(PluggableProtectionProvider, self).__init__()
         self._config = provider_config
@@ -66,6 +83,7 @@ class PluggableProtectionProvider(object):
         self.checkpoint_collection = None
         self._bank_plugin = None
         self._plugin_map = {}
+        self._api_limiter = api_limiter.ApiLimiter.from_config(self._config)
 
         if (hasattr(self._config.provider, 'bank') and
                 not self._config.provider.bank):
@@ -106,6 +124,10 @@ class PluggableProtectionProvider(object):
     def plugins(self):
         return self._plugin_map
 
+    @property
+    def api_limiter(self):
+        return self._api_limiter
+
     def load_plugins(self):
         return {
             plugin_type: plugin_class(self._config)
@@ -141,6 +163,33 @@ class PluggableProtectionProvider(object):
                     self._extended_info_schema['saved_info_schema'][resource] \
                         = plugin.get_saved_info_schema(resource)
 
+    def get_flow_executor_options(self, operation_type):
+        """Return the executor options of the flows of an operation
+
+        Provider settings override the settings of the protection service,
+        and operation settings override the general ones.
+        """
+        candidates = []
+        max_workers = None
+        executor_group = None
+        if self._config is not None:
+            provider_config = self._config.provider
+            candidates.append(provider_config.flow_executor_operations.get(
+                operation_type))
+            candidates.append(provider_config.flow_executor)
+            max_workers = provider_config.flow_executor_max_workers
+            if max_workers:
+                executor_group = self._id
+        candidates.append(CONF.flow_executor_operations.get(operation_type))
+        candidates.append(CONF.flow_executor)
+        return {
+            'executor_type': next(executor_type
+                                  for executor_type in candidates
+                                  if executor_type),
+            'max_workers': max_workers or CONF.flow_executor_max_workers,
+            'executor_group': executor_group,
+        }
+
     def get_checkpoint_collection(self):
         return self.checkpoint_collection
 
@@ -9,11 +9,14 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+from collections import defaultdict
 from collections import namedtuple
 
 from karbor.common import constants
 from karbor import exception
+from karbor.services.protection import api_limiter
 from karbor.services.protection import graph
+from karbor.services.protection import protection_plugin
 from oslo_log import log as logging
 
 LOG = logging.getLogger(__name__)
@@ -50,6 +53,13 @@ def noop_handle(*args, **kwargs):
     pass
 
 
+def is_noop_hook(method, hook_type):
+    """Whether method is a hook the operation does not implement"""
+    func = getattr(method, '__func__', method)
+    return (func is noop_handle or
+            func is protection_plugin.Operation.__dict__[hook_type])
+
+
 class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
     def __init__(self, resource_flow, operation_type, context, parameters,
                  plugins, workflow_engine):
@@ -64,6 +74,11 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
         self.node_tasks = {}
         self.task_stack = []
         self.current_resource = None
+        self.task_count = 0
+        self.skipped_task_count = 0
+        # The ordering constraints between the hooks, by (resource id, hook
+        # type), including the hooks skipped as no-op
+        self._hook_successors = defaultdict(list)
 
     def _create_hook_tasks(self, operation_obj, resource):
         pre_begin_task = self._create_hook_task(operation_obj, resource,
@@ -79,10 +94,14 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
                              post_task)
 
     def _create_hook_task(self, operation_obj, resource, hook_type):
+        """Create the task of a hook, None when the hook is a no-op"""
         method = getattr(operation_obj, hook_type, noop_handle)
         assert callable(method), (
             'Resource {} method "{}" is not callable'
         ).format(resource.type, hook_type)
+        if is_noop_hook(method, hook_type):
+            self.skipped_task_count += 1
+            return None
 
         task_name = "{operation_type}_{hook_type}_{type}_{id}".format(
             type=resource.type,
@@ -108,14 +127,19 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
             injects['operation_log'] = self.parameters.get(
                 'operation_log')
 
-        requires = OPERATION_EXTRA_ARGS.get(self.operation_type, [])
+        requires = list(OPERATION_EXTRA_ARGS.get(self.operation_type, []))
         requires.append('operation_log')
         task = self.workflow_engine.create_task(method,
                                                 name=task_name,
                                                 inject=injects,
                                                 requires=requires)
+        self.task_count += 1
         return task
 
+    def _link_hooks(self, u_id, u_hook_type, v_id, v_hook_type):
+        self._hook_successors[(u_id, u_hook_type)].append(
+            (v_id, v_hook_type))
+
     def on_node_enter(self, node, already_visited):
         resource = node.value
         LOG.debug(
@@ -124,8 +148,8 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
              already_visited}
         )
         self.current_resource = resource
+        self.task_stack.append(resource.id)
         if already_visited:
-            self.task_stack.append(self.node_tasks[resource.id])
             return
 
         if resource.type not in self.plugins:
@@ -139,16 +163,12 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
         hooks = self._create_hook_tasks(operation_obj, resource)
         LOG.debug("added operation %s hooks", self.operation_type)
         self.node_tasks[resource.id] = hooks
-        self.task_stack.append(hooks)
-        self.workflow_engine.add_tasks(self.flow, hooks.on_prepare_begin,
-                                       hooks.on_prepare_finish, hooks.on_main,
-                                       hooks.on_complete)
-        self.workflow_engine.link_task(self.flow, hooks.on_prepare_begin,
-                                       hooks.on_prepare_finish)
-        self.workflow_engine.link_task(self.flow, hooks.on_prepare_finish,
-                                       hooks.on_main)
-        self.workflow_engine.link_task(self.flow, hooks.on_main,
-                                       hooks.on_complete)
+        tasks = [hook_task for hook_task in hooks if hook_task is not None]
+        if tasks:
+            self.workflow_engine.add_tasks(self.flow, *tasks)
+        for u_hook_type, v_hook_type in zip(HOOKS, HOOKS[1:]):
+            self._link_hooks(resource.id, u_hook_type,
+                             resource.id, v_hook_type)
 
     def on_node_exit(self, node):
         resource = node.value
@@ -156,22 +176,55 @@ class ResourceFlowGraphWalkerListener(graph.GraphWalkerListener):
             "Exit node (type: %(type)s id: %(id)s)",
             {"type": resource.type, "id": resource.id}
         )
-        child_hooks = self.task_stack.pop()
+        child_id = self.task_stack.pop()
         if len(self.task_stack) > 0:
-            parent_hooks = self.task_stack[-1]
-            self.workflow_engine.link_task(self.flow,
-                                           parent_hooks.on_prepare_begin,
-                                           child_hooks.on_prepare_begin)
-            self.workflow_engine.link_task(self.flow,
-                                           child_hooks.on_prepare_finish,
-                                           parent_hooks.on_prepare_finish)
-            self.workflow_engine.link_task(self.flow, child_hooks.on_complete,
-                                           parent_hooks.on_complete)
+            parent_id = self.task_stack[-1]
+            self._link_hooks(parent_id, HOOK_PRE_BEGIN,
+                             child_id, HOOK_PRE_BEGIN)
+            self._link_hooks(child_id, HOOK_PRE_FINISH,
+                             parent_id, HOOK_PRE_FINISH)
+            self._link_hooks(child_id, HOOK_COMPLETE,
+                             parent_id, HOOK_COMPLETE)
+
+    def _get_task(self, hook):
+        resource_id, hook_type = hook
+        return getattr(self.node_tasks[resource_id], hook_type)
+
+    def link_tasks(self):
+        """Link the tasks of the hooks once the graph is walked
+
+        A skipped hook passes on its ordering constraints: the tasks
+        preceding it are linked to the tasks following it.
+        """
+        skipped_successors = {}
+
+        def _get_successor_tasks(hook):
+            tasks = set()
+            for successor in self._hook_successors.get(hook, ()):
+                successor_task = self._get_task(successor)
+                if successor_task is not None:
+                    tasks.add(successor_task)
+                    continue
+                if successor not in skipped_successors:
+                    skipped_successors[successor] = _get_successor_tasks(
+                        successor)
+                tasks.update(skipped_successors[successor])
+            return tasks
+
+        for hook in list(self._hook_successors):
+            hook_task = self._get_task(hook)
+            if hook_task is None:
+                continue
+            for successor_task in _get_successor_tasks(hook):
+                self.workflow_engine.link_task(self.flow, hook_task,
+                                               successor_task)
 
 
 def build_resource_flow(operation_type, context, workflow_engine,
-                        plugins, resource_graph, parameters):
+                        plugins, resource_graph, parameters, limiter=None):
     LOG.info("Build resource flow for operation %s", operation_type)
+    # The clients created by the hooks are subject to the provider limits
+    context = api_limiter.bind_context(context, limiter)
 
     resource_graph_flow = workflow_engine.build_flow(
         'ResourceGraphFlow_{}'.format(operation_type),
@@ -187,5 +240,11 @@ def build_resource_flow(operation_type, context, workflow_engine,
     walker.register_listener(resource_walker)
     LOG.debug("Starting resource graph walk (operation %s)", operation_type)
     walker.walk_graph(resource_graph)
+    resource_walker.link_tasks()
     LOG.debug("Finished resource graph walk (operation %s)", operation_type)
+    LOG.info("Built resource flow for operation %(operation)s: %(tasks)d "
+             "tasks, %(skipped)d no-op hook tasks skipped",
+             {'operation': operation_type,
+              'tasks': resource_walker.task_count,
+              'skipped': resource_walker.skipped_task_count})
     return resource_graph_flow
@@ -23,7 +23,15 @@ from karbor.objects import base as objects_base
 from karbor import rpc
 
 
+rpcapi_cap_opt = cfg.StrOpt('protection',
+                            help='Set a version cap for messages sent to '
+                                 'the protection services. During a rolling '
+                                 'upgrade, set it to the version of the '
+                                 'oldest protection service, for example '
+                                 '"1.0".')
+
 CONF = cfg.CONF
+CONF.register_opt(rpcapi_cap_opt, 'upgrade_levels')
 
 
 class ProtectionAPI(object):
@@ -32,16 +40,18 @@ class ProtectionAPI(object):
     API version history:
 
         1.0 - Initial version.
+        1.1 - Add list_protectable_instances_with_dependents.
     """
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
 
     def __init__(self):
         super(ProtectionAPI, self).__init__()
         target = messaging.Target(topic=CONF.protection_topic,
                                   version=self.RPC_API_VERSION)
         serializer = objects_base.KarborObjectSerializer()
-        self.client = rpc.get_client(target, version_cap=None,
+        version_cap = CONF.upgrade_levels.protection
+        self.client = rpc.get_client(target, version_cap=version_cap,
                                      serializer=serializer)
 
     def restore(self, ctxt, restore=None, restore_auth=None):
@@ -133,6 +143,37 @@ class ProtectionAPI(object):
             filters=filters,
             parameters=parameters)
 
+    def list_protectable_instances_with_dependents(
+            self, ctxt, protectable_type=None,
+            marker=None, limit=None, sort_keys=None,
+            sort_dirs=None, filters=None, parameters=None):
+        if not self.client.can_send_version('1.1'):
+            # Protection services older than 1.1 list the dependents of
+            # one instance at a time
+            instances = self.list_protectable_instances(
+                ctxt, protectable_type=protectable_type, marker=marker,
+                limit=limit, sort_keys=sort_keys, sort_dirs=sort_dirs,
+                filters=filters, parameters=parameters)
+            for instance in instances:
+                instance['dependent_resources'] = (
+                    self.list_protectable_dependents(
+                        ctxt, protectable_id=instance.get('id'),
+                        protectable_type=protectable_type,
+                        protectable_name=instance.get('name')))
+            return instances
+
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(
+            ctxt,
+            'list_protectable_instances_with_dependents',
+            protectable_type=protectable_type,
+            marker=marker,
+            limit=limit,
+            sort_keys=sort_keys,
+            sort_dirs=sort_dirs,
+            filters=filters,
+            parameters=parameters)
+
     def list_protectable_dependents(self,
                                     ctxt, protectable_id=None,
                                     protectable_type=None,
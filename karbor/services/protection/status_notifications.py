@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging as messaging
+
+from karbor import rpc
+from karbor.services.protection.protection_plugins import utils
+
+status_notifications_opts = [
+    cfg.BoolOpt('status_notifications',
+                default=False,
+                help='Listen to the notifications of Cinder, Glance and Nova '
+                     'to learn the status of the resources being protected '
+                     'or restored as soon as it changes. The statuses are '
+                     'still polled every poll interval of the plugins in '
+                     'case a notification is missed.'),
+    cfg.ListOpt('status_notification_topics',
+                default=['notifications'],
+                help='The topics the notifications of the services are '
+                     'sent to.'),
+    cfg.StrOpt('status_notification_pool',
+               default='karbor-protection',
+               help='The pool of the notification listener, so that other '
+                    'consumers of the topics still get every '
+                    'notification.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(status_notifications_opts)
+
+LOG = logging.getLogger(__name__)
+
+# Nova notifications carry the vm_state of the server, not its API status
+_SERVER_STATUSES = {
+    'active': 'ACTIVE',
+    'building': 'BUILD',
+    'error': 'ERROR',
+    'rescued': 'RESCUE',
+    'resized': 'VERIFY_RESIZE',
+    'stopped': 'SHUTOFF',
+    'suspended': 'SUSPENDED',
+}
+
+
+def _cinder_status(id_key):
+    def _parse(event_type, payload):
+        if event_type.endswith('.delete.end'):
+            return payload.get(id_key), 'not-found'
+        return payload.get(id_key), payload.get('status')
+    return _parse
+
+
+def _image_status(event_type, payload):
+    return payload.get('id'), payload.get('status')
+
+
+def _server_status(event_type, payload):
+    return (payload.get('instance_id'),
+            _SERVER_STATUSES.get(payload.get('state')))
+
+
+# The poll group and the status parser of each service notification, by the
+# first part of the event type.
+_STATUS_NOTIFICATIONS = {
+    'volume': ('cinder.volume', _cinder_status('volume_id')),
+    'snapshot': ('cinder.snapshot', _cinder_status('snapshot_id')),
+    'backup': ('cinder.backup', _cinder_status('backup_id')),
+    'image': ('glance.image', _image_status),
+    'compute': ('nova.server', _server_status),
+}
+
+
+class StatusNotificationEndpoint(object):
+    """Notify the status pollers of the statuses in service notifications"""
+
+    filter_rule = messaging.NotificationFilter(
+        event_type=r'^(volume|snapshot|backup|image|compute\.instance)\.')
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        self._notify_status(event_type, payload)
+
+    def error(self, ctxt, publisher_id, event_type, payload, metadata):
+        self._notify_status(event_type, payload)
+
+    @staticmethod
+    def _notify_status(event_type, payload):
+        notification = _STATUS_NOTIFICATIONS.get(event_type.split('.')[0])
+        if notification is None or not isinstance(payload, dict):
+            return
+        poll_group, parse = notification
+        resource_id, status = parse(event_type, payload)
+        if resource_id is None or status is None:
+            return
+        LOG.debug('Notified %(group)s (id: %(id)s) status: %(status)s',
+                  {'group': poll_group, 'id': resource_id, 'status': status})
+        utils.notify_status(poll_group, resource_id, status)
+
+
+class StatusNotificationListener(object):
+    """Resolve the status polls of the plugins from service notifications"""
+
+    def __init__(self):
+        super(StatusNotificationListener, self).__init__()
+        self._listener = None
+
+    def start(self):
+        targets = [messaging.Target(topic=topic)
+                   for topic in CONF.status_notification_topics]
+        self._listener = rpc.get_notification_listener(
+            targets, [StatusNotificationEndpoint()],
+            pool=CONF.status_notification_pool)
+        self._listener.start()
+        utils.set_notified_poll_groups(
+            poll_group for poll_group, _ in _STATUS_NOTIFICATIONS.values())
+        LOG.info('Listening to status notifications on topics %s',
+                 CONF.status_notification_topics)
+
+    def stop(self):
+        if self._listener is None:
+            return
+        utils.set_notified_poll_groups(())
+        self._listener.stop()
+        self._listener.wait()
+        self._listener = None
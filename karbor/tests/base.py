@@ -23,6 +23,7 @@ from karbor.common import config  # noqa Need to register global_opts
 from karbor.db import migration
 from karbor.db.sqlalchemy import api as sqla_api
 from karbor import rpc
+from karbor.services.protection import client_factory
 from karbor.tests.unit import conf_fixture
 
 
@@ -68,6 +69,8 @@ class TestCase(base.BaseTestCase):
         rpc.add_extra_exmods("karbor.tests.unit")
         self.addCleanup(rpc.clear_extra_exmods)
         self.addCleanup(rpc.cleanup)
+        # Clients cached by a test may be mocks, or use patched modules
+        self.addCleanup(client_factory.ClientFactory.clear_client_cache)
 
         self.messaging_conf = messaging_conffixture.ConfFixture(CONF)
         self.messaging_conf.transport_url = 'fake:/'
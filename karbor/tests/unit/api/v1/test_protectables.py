@@ -59,16 +59,24 @@ class ProtectablesApiTest(base.TestCase):
 
     @mock.patch(
         'karbor.services.protection.api.API.'
-        'list_protectable_instances')
+        'list_protectable_dependents')
+    @mock.patch(
+        'karbor.services.protection.api.API.'
+        'list_protectable_instances_with_dependents')
     @mock.patch(
         'karbor.api.v1.protectables.ProtectablesController._get_all')
     def test_protectables_instances_index(self, moak_get_all,
-                                          moak_list_protectable_instances):
+                                          moak_list_protectable_instances,
+                                          moak_list_protectable_dependents):
         req = fakes.HTTPRequest.blank('/v1/protectables')
         moak_get_all.return_value = ["OS::Keystone::Project"]
+        moak_list_protectable_instances.return_value = [
+            {'id': 'fake_id', 'name': 'fake_name', 'extra_info': None,
+             'dependent_resources': []}]
         self.controller.instances_index(req, 'OS::Keystone::Project')
         self.assertTrue(moak_get_all.called)
         self.assertTrue(moak_list_protectable_instances.called)
+        self.assertFalse(moak_list_protectable_dependents.called)
 
     @mock.patch(
         'karbor.services.protection.api.API.'
@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from datetime import datetime
+from datetime import timedelta
+import eventlet
+
+from karbor.services.operationengine.engine.triggers.timetrigger import \
+    scheduler
+from karbor.tests import base
+
+
+class TriggerSchedulerTestCase(base.TestCase):
+
+    def setUp(self):
+        super(TriggerSchedulerTestCase, self).setUp()
+        self._scheduler = scheduler.TriggerScheduler()
+        self._triggers = []
+        self.addCleanup(self._kill_triggers)
+
+    def _kill_triggers(self):
+        for trigger in self._triggers:
+            trigger.kill()
+        eventlet.sleep(0)
+
+    def _schedule(self, run_time, function):
+        trigger = self._scheduler.schedule(run_time, function)
+        self._triggers.append(trigger)
+        return trigger
+
+    def test_schedule(self):
+        calls = []
+
+        def _function(run_time):
+            calls.append(run_time)
+            if len(calls) < 3:
+                return run_time + timedelta(milliseconds=100)
+
+        first_run_time = datetime.utcnow()
+        trigger = self._schedule(first_run_time, _function)
+        self.assertTrue(trigger.running)
+        eventlet.sleep(0.1)
+
+        self.assertEqual(
+            [first_run_time + timedelta(milliseconds=100 * i)
+             for i in range(3)],
+            calls)
+        self.assertFalse(trigger.running)
+        self.assertIsNone(trigger.pre_run_time)
+        self.assertEqual(0, self._scheduler.stats()['scheduled'])
+
+    def test_schedule_many(self):
+        calls = []
+        now = datetime.utcnow()
+        for i in range(100):
+            self._schedule(now, lambda run_time, i=i: calls.append(i))
+        eventlet.sleep(0.1)
+        self.assertEqual(list(range(100)), sorted(calls))
+        self.assertIsNone(self._scheduler._thread)
+
+    def test_schedule_earlier(self):
+        calls = []
+        self._schedule(datetime.utcnow() + timedelta(hours=1),
+                       calls.append)
+        eventlet.sleep(0.1)
+        self.assertEqual([], calls)
+
+        run_time = datetime.utcnow()
+        self._schedule(run_time, calls.append)
+        eventlet.sleep(0.1)
+        self.assertEqual([run_time], calls)
+        self.assertEqual(1, self._scheduler.stats()['scheduled'])
+
+    def test_kill(self):
+        calls = []
+        later = datetime.utcnow() + timedelta(hours=1)
+        triggers = [self._schedule(later, calls.append) for _ in range(100)]
+        for trigger in triggers[:80]:
+            trigger.kill()
+            self.assertFalse(trigger.running)
+        self.assertEqual(20, self._scheduler.stats()['scheduled'])
+        self.assertLess(len(self._scheduler._heap), 100)
+
+        trigger = self._schedule(datetime.utcnow(), calls.append)
+        trigger.kill()
+        eventlet.sleep(0.1)
+        self.assertEqual([], calls)
+
+    def test_function_error(self):
+        def _function(run_time):
+            raise Exception()
+
+        trigger = self._schedule(datetime.utcnow(), _function)
+        eventlet.sleep(0.1)
+        self.assertFalse(trigger.running)
@@ -221,11 +221,11 @@ class TimeTriggerTestCase(base.TestCase):
         }
         with mock.patch.object(FakeTimeFormat, 'compute_next_time') as c:
             c.return_value = datetime.utcnow() + timedelta(seconds=20)
-            old_id = id(trigger._greenthread)
+            old_id = id(trigger._schedule)
 
             trigger.update_trigger_property(trigger_property)
 
-            self.assertNotEqual(old_id, id(trigger._greenthread))
+            self.assertNotEqual(old_id, id(trigger._schedule))
 
     def _generate_trigger(self, end_time=None):
         if not end_time:
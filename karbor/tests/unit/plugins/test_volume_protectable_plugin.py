@@ -130,6 +130,30 @@ class VolumeProtectablePluginTest(base.TestCase):
                              Resource("OS::Nova::Server", 'abcdef', 'name',
                                       {'availability_zone': 'az1'})))
 
+    @mock.patch.object(volumes.VolumeManager, 'list')
+    def test_get_server_dependent_resources_bulk(self, mock_volume_list):
+        plugin = VolumeProtectablePlugin(self._context)
+
+        mock_volume_list.return_value = [
+            vol_info('123', [{'server_id': 'server1'}], 'name123',
+                     'available', 'az1'),
+            vol_info('456', [{'server_id': 'server2'}], 'name456',
+                     'available', 'az1'),
+            vol_info('789', [], 'name789', 'available', 'az1'),
+        ]
+        server1 = Resource("OS::Nova::Server", 'server1', 'name1')
+        server2 = Resource("OS::Nova::Server", 'server2', 'name2')
+        server3 = Resource("OS::Nova::Server", 'server3', 'name3')
+        self.assertEqual({
+            server1: [Resource('OS::Cinder::Volume', '123', 'name123',
+                               {'availability_zone': 'az1'})],
+            server2: [Resource('OS::Cinder::Volume', '456', 'name456',
+                               {'availability_zone': 'az1'})],
+            server3: [],
+        }, plugin.get_dependent_resources_bulk(
+            self._context, [server1, server2, server3]))
+        self.assertEqual(1, mock_volume_list.call_count)
+
     @mock.patch.object(volumes.VolumeManager, 'list')
     def test_get_project_dependent_resources(self, mock_volume_list):
         project = project_info('abcd', constants.PROJECT_RESOURCE_TYPE,
@@ -78,6 +78,16 @@ class FakeS3Connection(object):
         else:
             raise ClientError("error_bucket")
 
+    def delete_objects(self, Bucket, Delete):
+        if Bucket not in self.s3_dir.keys():
+            raise ClientError("error_bucket")
+        errors = []
+        for obj in Delete['Objects']:
+            if self.s3_dir[Bucket]['Keys'].pop(obj['Key'], None) is None:
+                errors.append({'Key': obj['Key'], 'Code': 'NoSuchKey',
+                               'Message': 'error_object'})
+        return {'Errors': errors} if errors else {}
+
 
 class FakeS3Stream(object):
     def __init__(self, data):
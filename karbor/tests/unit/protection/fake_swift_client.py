@@ -13,6 +13,8 @@
 import os
 import tempfile
 
+from oslo_serialization import jsonutils
+from six.moves.urllib import parse
 from swiftclient import ClientException
 
 
@@ -30,6 +32,30 @@ class FakeSwiftConnection(object):
         super(FakeSwiftConnection, self).__init__()
         self.swiftdir = tempfile.mkdtemp()
         self.object_headers = {}
+        self.capabilities = {'bulk_delete': {'max_deletes_per_request': 2}}
+        self.bulk_deletes = 0
+
+    def get_capabilities(self):
+        return self.capabilities
+
+    def post_account(self, headers, query_string=None, data=None):
+        if query_string != 'bulk-delete':
+            raise ClientException("error_query")
+        self.bulk_deletes += 1
+        deleted = 0
+        not_found = 0
+        for line in data.splitlines():
+            container, obj = parse.unquote(line).split('/', 1)
+            try:
+                self.delete_object(container, obj)
+                deleted += 1
+            except ClientException:
+                not_found += 1
+        return {}, jsonutils.dumps({'Number Deleted': deleted,
+                                    'Number Not Found': not_found,
+                                    'Errors': [],
+                                    'Response Status': '200 OK',
+                                    'Response Body': ''})
 
     def put_container(self, container):
         container_dir = self.swiftdir + "/" + container
@@ -82,6 +108,12 @@ class FakeSwiftConnection(object):
         else:
             raise ClientException("error_container")
 
+    def head_object(self, container, obj):
+        obj_file = self.swiftdir + "/" + container + "/" + obj
+        if not os.path.exists(obj_file):
+            raise ClientException("error_obj", http_status=404)
+        return self.object_headers[obj_file]
+
     def delete_object(self, container, obj):
         container_dir = self.swiftdir + "/" + container
         obj_file = container_dir + "/" + obj
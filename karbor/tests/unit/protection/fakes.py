@@ -266,14 +266,16 @@ class FakeCheckpoint(object):
         bank = Bank(FakeBankPlugin())
         return BankSection(bank, resource_id)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, with_resource_graph=True):
+        checkpoint_dict = {
             "id": self.id,
             "status": self.status,
-            "resource_graph": self.resource_graph,
             "protection_plan": None,
             "project_id": self.project_id
         }
+        if with_resource_graph:
+            checkpoint_dict["resource_graph"] = self.resource_graph
+        return checkpoint_dict
 
 
 class FakeCheckpointCollection(object):
@@ -285,6 +287,11 @@ class FakeCheckpointCollection(object):
             context=None):
         return FakeCheckpoint()
 
+    def get_many(self, checkpoint_ids, with_resource_graph=True,
+                 context=None):
+        return [FakeCheckpoint().to_dict(with_resource_graph)
+                for _ in checkpoint_ids]
+
 
 class FakeProvider(provider.PluggableProtectionProvider):
     def __init__(self):
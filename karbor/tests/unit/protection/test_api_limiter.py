@@ -0,0 +1,192 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+from oslo_config import cfg
+from oslo_config import fixture
+
+from karbor.context import RequestContext
+from karbor import exception
+from karbor.services.protection import api_limiter
+from karbor.services.protection import client_factory
+from karbor.tests import base
+
+
+class FakeBackups(object):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.api_version = '3.0'
+
+    def create(self, volume_id):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        eventlet.sleep(0.01)
+        self.running -= 1
+        return volume_id
+
+    def get(self, backup_id):
+        return backup_id
+
+    def data(self, backup_id):
+        for chunk in ('a', 'b'):
+            yield chunk
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.backups = FakeBackups()
+        self.volumes = mock.Mock()
+        self.management_url = 'http://127.0.0.1:8776/v3'
+
+
+class ApiLimiterTest(base.TestCase):
+    def _get_config(self, **limits):
+        config = cfg.ConfigOpts()
+        config_fixture = self.useFixture(fixture.Config(config))
+        config_fixture.load_raw_values(group='api_limits', **limits)
+        return config
+
+    def test_from_config(self):
+        self.assertIsNone(api_limiter.ApiLimiter.from_config(None))
+        self.assertIsNone(
+            api_limiter.ApiLimiter.from_config(self._get_config()))
+        limiter = api_limiter.ApiLimiter.from_config(self._get_config(
+            concurrency='cinder:20,cinder.backups.create:4',
+            rate='glance.images.upload:0.5'))
+        stats = limiter.stats()
+        self.assertEqual({'cinder', 'cinder.backups.create'},
+                         set(stats['concurrency']))
+        self.assertEqual({'glance.images.upload'}, set(stats['rate']))
+
+    def test_from_config_invalid(self):
+        self.assertRaises(
+            exception.InvalidInput, api_limiter.ApiLimiter.from_config,
+            self._get_config(concurrency='cinder:0'))
+        self.assertRaises(
+            exception.InvalidInput, api_limiter.ApiLimiter.from_config,
+            self._get_config(rate='cinder:fast'))
+
+    def test_get_limits(self):
+        limiter = api_limiter.ApiLimiter(
+            concurrency={'cinder.backups.create': 4, 'cinder': 20},
+            rate={'cinder.backups': 1})
+        self.assertEqual(
+            [('cinder', api_limiter.ConcurrencyLimit),
+             ('cinder.backups.create', api_limiter.ConcurrencyLimit),
+             ('cinder.backups', api_limiter.RateLimit)],
+            [(limit.name, type(limit))
+             for limit in limiter.get_limits('cinder.backups.create')])
+        self.assertEqual(
+            ['cinder'],
+            [limit.name for limit in limiter.get_limits('cinder.volumes')])
+        self.assertEqual([], limiter.get_limits('glance.images.upload'))
+
+    def test_concurrency_limit(self):
+        limiter = api_limiter.ApiLimiter(
+            concurrency={'cinder.backups.create': 2})
+        client = limiter.wrap_client(FakeClient(), 'cinder')
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(client.backups.create, range(6)))
+        self.assertEqual(list(range(6)), results)
+        self.assertEqual(2, client.backups._obj.max_running)
+        stats = limiter.stats()['concurrency']['cinder.backups.create']
+        self.assertEqual(0, stats['waiting'])
+        self.assertEqual(0, stats['running'])
+        self.assertEqual(6, stats['acquired'])
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    @mock.patch.object(api_limiter.eventlet, 'sleep')
+    @mock.patch.object(api_limiter.time, 'time')
+    def test_rate_limit(self, mock_time, mock_sleep):
+        mock_time.return_value = 100
+        limiter = api_limiter.ApiLimiter(rate={'glance.images.upload': 2})
+        for _ in range(4):
+            with limiter.limit('glance.images.upload'):
+                pass
+        self.assertEqual([mock.call(0.5), mock.call(1.0)],
+                         mock_sleep.call_args_list)
+
+        mock_sleep.reset_mock()
+        mock_time.return_value = 110
+        with limiter.limit('glance.images.upload'):
+            pass
+        mock_sleep.assert_not_called()
+
+    def test_limit_releases_on_error(self):
+        limiter = api_limiter.ApiLimiter(concurrency={'cinder': 1})
+
+        def _fail():
+            with limiter.limit('cinder.volumes.get'):
+                raise exception.KarborException()
+        self.assertRaises(exception.KarborException, _fail)
+        self.assertEqual(
+            0, limiter.stats()['concurrency']['cinder']['running'])
+
+    def test_limit_held_until_response_consumed(self):
+        limiter = api_limiter.ApiLimiter(concurrency={'cinder.backups': 1})
+        client = limiter.wrap_client(FakeClient(), 'cinder')
+        stats = limiter.stats
+        data = client.backups.data('fake_backup')
+        self.assertEqual(
+            1, stats()['concurrency']['cinder.backups']['running'])
+        self.assertEqual(['a', 'b'], list(data))
+        self.assertEqual(
+            0, stats()['concurrency']['cinder.backups']['running'])
+
+        data = client.backups.data('fake_backup')
+        self.assertEqual('a', next(data))
+        data.close()
+        self.assertEqual(
+            0, stats()['concurrency']['cinder.backups']['running'])
+
+    def test_wrap_client(self):
+        limiter = api_limiter.ApiLimiter(
+            concurrency={'cinder.backups': 2, 'glance': 1})
+        fake_client = FakeClient()
+        self.assertIs(fake_client, limiter.wrap_client(fake_client, 'nova'))
+
+        client = limiter.wrap_client(fake_client, 'cinder')
+        self.assertEqual('http://127.0.0.1:8776/v3', client.management_url)
+        self.assertIs(fake_client.volumes, client.volumes)
+        self.assertEqual('3.0', client.backups.api_version)
+        self.assertEqual('fake_backup', client.backups.get('fake_backup'))
+        stats = limiter.stats()['concurrency']['cinder.backups']
+        self.assertEqual(1, stats['acquired'])
+
+
+class ApiLimiterClientFactoryTest(base.TestCase):
+    def setUp(self):
+        super(ApiLimiterClientFactoryTest, self).setUp()
+        cfg.CONF.set_default('cinder_endpoint',
+                             'http://127.0.0.1:8776/v2',
+                             'cinder_client')
+        self.context = RequestContext(user_id='demo',
+                                      project_id='abcd',
+                                      auth_token='efgh')
+
+    def test_create_client_bound_context(self):
+        limiter = api_limiter.ApiLimiter(concurrency={'cinder': 1})
+        self.assertIs(self.context,
+                      api_limiter.bind_context(self.context, None))
+        context = api_limiter.bind_context(self.context, limiter)
+        self.assertIsNot(self.context, context)
+        self.assertIsNone(api_limiter.get_context_limiter(self.context))
+        self.assertIs(limiter, api_limiter.get_context_limiter(context))
+
+        client = client_factory.ClientFactory.create_client('cinder',
+                                                            context)
+        self.assertIsInstance(client, api_limiter._LimitedProxy)
+        client = client_factory.ClientFactory.create_client('cinder',
+                                                            self.context)
+        self.assertNotIsInstance(client, api_limiter._LimitedProxy)
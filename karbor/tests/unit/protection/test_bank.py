@@ -16,6 +16,7 @@ from oslo_utils import uuidutils
 
 from karbor import exception
 from karbor.services.protection.bank_plugin import Bank
+from karbor.services.protection.bank_plugin import BankIO
 from karbor.services.protection.bank_plugin import BankPlugin
 from karbor.services.protection.bank_plugin import BankSection
 from karbor.services.protection.bank_plugin import LeasePlugin
@@ -152,6 +153,28 @@ class BankSectionTest(base.TestCase):
         section.delete_object("/b")
         section.delete_object("//c")
 
+    def test_bulk_objects(self):
+        bank = self._create_test_bank()
+        section = BankSection(bank, "/prefix", is_writable=True)
+        section.update_objects({"a": "value-a", "/b": "value-b",
+                                "sub/c": {"key": "value-c"}})
+        self.assertEqual("value-b", bank.get_object("/prefix/b"))
+        self.assertEqual(
+            {"a": "value-a", "sub/c": {"key": "value-c"}},
+            section.get_objects(["a", "sub/c"]))
+        section.delete_objects(["a", "/b"])
+        self.assertEqual(["sub/c"], list(section.list_objects()))
+        self.assertRaises(exception.BankGetObjectFailed,
+                          section.get_objects, ["a", "sub/c"])
+
+        read_only_section = BankSection(bank, "/prefix", is_writable=False)
+        self.assertRaises(exception.BankReadonlyViolation,
+                          read_only_section.update_objects, {"a": "value"})
+        self.assertRaises(exception.BankReadonlyViolation,
+                          read_only_section.delete_objects, ["sub/c"])
+        self.assertRaises(exception.InvalidParameterValue,
+                          bank.delete_objects, ["/prefix/sub/c", "/a$"])
+
     def test_list_objects(self):
         bank = self._create_test_bank()
         section = BankSection(bank, "/prefix", is_writable=True)
@@ -261,3 +284,38 @@ class BankSectionTest(base.TestCase):
             "/mid",
             is_writable=True,
         )
+
+
+class BankIOTest(base.TestCase):
+    def setUp(self):
+        super(BankIOTest, self).setUp()
+        self.section = BankSection(Bank(_InMemoryBankPlugin()), "/data")
+        self.keys = ["data_%d" % i for i in range(1, 6)]
+        for key in self.keys:
+            self.section.update_object(key, key.encode())
+
+    def _read_all(self, bank_io):
+        result = []
+        data = bank_io.read()
+        while data:
+            result.append(data)
+            data = bank_io.read()
+        return result
+
+    def test_read(self):
+        bank_io = BankIO(self.section, self.keys)
+        self.assertEqual([key.encode() for key in self.keys],
+                         self._read_all(bank_io))
+
+    def test_read_ahead(self):
+        bank_io = BankIO(self.section, self.keys, prefetch=2)
+        self.assertEqual(b"data_1", bank_io.read())
+        self.assertEqual(2, bank_io.length)
+        self.assertEqual([key.encode() for key in self.keys[1:]],
+                         self._read_all(bank_io))
+        self.assertEqual('', bank_io.read())
+
+    def test_read_ahead_failed(self):
+        bank_io = BankIO(self.section, self.keys + ["data_6"], prefetch=3)
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self._read_all, bank_io)
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 from karbor.resource import Resource
 from karbor.services.protection import bank_plugin
 from karbor.services.protection import checkpoint
@@ -89,3 +91,78 @@ class CheckpointTest(base.TestCase):
         self.assertEqual(len(resource_graph), len(cp.resource_graph))
         for start_node in resource_graph:
             self.assertIn(start_node, cp.resource_graph)
+
+    def test_resource_graph_memoized(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        bank_lease = _InMemoryLeasePlugin()
+        checkpoints_section = bank_plugin.BankSection(bank, "/checkpoints")
+        indices_section = bank_plugin.BankSection(bank, "/indices")
+        cp = checkpoint.Checkpoint.create_in_section(
+            checkpoints_section=checkpoints_section,
+            indices_section=indices_section,
+            bank_lease=bank_lease,
+            owner_id=bank.get_owner_id(),
+            plan=fake_protection_plan())
+        resource_graph = graph.build_graph([A, B, C, D],
+                                           resource_map.__getitem__)
+        cp.resource_graph = resource_graph
+        cp.commit()
+
+        cp = checkpoint.Checkpoint.get_by_section(
+            checkpoints_section, indices_section, bank_lease, cp.id)
+        with mock.patch.object(graph, 'decode_resource_graph',
+                               wraps=graph.decode_resource_graph) as decode:
+            self.assertEqual(resource_graph, cp.resource_graph)
+            self.assertEqual(resource_graph, cp.resource_graph)
+            self.assertEqual(C, cp.get_resource_graph_node("C").value)
+            self.assertIsNone(cp.get_resource_graph_node("F"))
+            self.assertEqual(1, decode.call_count)
+
+            cp.reload_meta_data()
+            self.assertEqual(resource_graph, cp.resource_graph)
+            self.assertEqual(2, decode.call_count)
+
+    def test_resource_graph_serialized(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        bank_lease = _InMemoryLeasePlugin()
+        checkpoints_section = bank_plugin.BankSection(bank, "/checkpoints")
+        indices_section = bank_plugin.BankSection(bank, "/indices")
+        cp = checkpoint.Checkpoint.create_in_section(
+            checkpoints_section=checkpoints_section,
+            indices_section=indices_section,
+            bank_lease=bank_lease,
+            owner_id=bank.get_owner_id(),
+            plan=fake_protection_plan())
+        resource_graph = graph.build_graph([A, B, C, D],
+                                           resource_map.__getitem__)
+        cp.resource_graph = resource_graph
+        self.assertEqual("1.0", cp._md_cache["version"])
+        serialized = cp.to_dict()["resource_graph"]
+        self.assertEqual(resource_graph,
+                         graph.deserialize_resource_graph(serialized))
+
+        # Checkpoints saved before the compact encoding are still readable
+        cp._md_cache["version"] = "0.9"
+        cp._md_cache["resource_graph"] = serialized
+        self.assertEqual(serialized, cp.to_dict()["resource_graph"])
+        self.assertEqual(resource_graph, cp.resource_graph)
+        self.assertEqual(A, cp.get_resource_graph_node("A").value)
+
+    def test_to_dict_without_resource_graph(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        bank_lease = _InMemoryLeasePlugin()
+        checkpoints_section = bank_plugin.BankSection(bank, "/checkpoints")
+        indices_section = bank_plugin.BankSection(bank, "/indices")
+        cp = checkpoint.Checkpoint.create_in_section(
+            checkpoints_section=checkpoints_section,
+            indices_section=indices_section,
+            bank_lease=bank_lease,
+            owner_id=bank.get_owner_id(),
+            plan=fake_protection_plan())
+        cp.resource_graph = graph.build_graph([A, B, C, D],
+                                              resource_map.__getitem__)
+        with mock.patch.object(graph, 'decode_resource_graph') as decode:
+            cp.commit()
+            self.assertNotIn("resource_graph",
+                             cp.to_dict(with_resource_graph=False))
+            decode.assert_not_called()
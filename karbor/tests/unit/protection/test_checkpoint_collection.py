@@ -15,6 +15,7 @@ import mock
 
 from oslo_utils import timeutils
 
+from karbor import exception
 from karbor.services.protection.bank_plugin import Bank
 from karbor.services.protection.checkpoint import CheckpointCollection
 from karbor.tests import base
@@ -47,6 +48,57 @@ class CheckpointCollectionTest(base.TestCase):
         self.assertEqual(set(collection.list_ids(
             project_id=project_id, provider_id=provider_id)), result)
 
+    def test_get_many_checkpoints(self):
+        collection = self._create_test_collection()
+        plan = fake_protection_plan()
+        checkpoint_ids = [collection.create(plan).id for i in range(10)]
+        checkpoints = collection.get_many(checkpoint_ids)
+        self.assertEqual(checkpoint_ids,
+                         [checkpoint['id'] for checkpoint in checkpoints])
+        self.assertEqual(
+            collection.get(checkpoint_ids[0]).to_dict(), checkpoints[0])
+
+    def test_get_many_checkpoints_not_found(self):
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        self.assertRaises(exception.CheckpointNotFound,
+                          collection.get_many,
+                          [checkpoint.id, 'not_exist_checkpoint_id'])
+
+    def test_get_checkpoint_from_cache(self):
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        collection.get(checkpoint.id)
+        self.assertEqual(0, collection.cache_stats()['size'])
+
+        checkpoint.status = "available"
+        checkpoint.commit()
+        collection.get(checkpoint.id)
+        with mock.patch.object(collection._bank, 'get_object') as mock_get:
+            self.assertEqual("available",
+                             collection.get(checkpoint.id).status)
+            self.assertEqual(
+                "available",
+                collection.get_many([checkpoint.id])[0]['status'])
+            mock_get.assert_not_called()
+        self.assertEqual(2, collection.cache_stats()['hits'])
+
+        checkpoint.status = "deleting"
+        checkpoint.commit()
+        self.assertEqual("deleting", collection.get(checkpoint.id).status)
+
+    def test_checkpoint_cache_expired(self):
+        self.override_config('checkpoint_cache_ttl', 10)
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        checkpoint.status = "available"
+        checkpoint.commit()
+        collection.get(checkpoint.id)
+        with mock.patch.object(timeutils, 'is_older_than',
+                               return_value=True):
+            collection.get(checkpoint.id)
+        self.assertEqual(0, collection.cache_stats()['hits'])
+
     def test_list_checkpoints_by_plan_id(self):
         collection = self._create_test_collection()
         plan_1 = fake_protection_plan()
@@ -95,6 +147,59 @@ class CheckpointCollectionTest(base.TestCase):
             end_date=date2)),
             checkpoints_date_2)
 
+    def test_list_checkpoints_by_date_with_marker(self):
+        collection = self._create_test_collection()
+        plan = fake_protection_plan()
+        provider_id = plan['provider_id']
+        project_id = plan['project_id']
+        checkpoint_ids = []
+        for day in ("2016-06-12", "2016-06-13", "2016-06-14"):
+            date = datetime.strptime(day, "%Y-%m-%d")
+            with mock.patch.object(timeutils, 'utcnow', return_value=date):
+                checkpoint_ids.append(collection.create(plan).id)
+        other_plan = fake_protection_plan()
+        other_plan['project_id'] = 'fake_project_id_2'
+        collection.create(other_plan)
+
+        start_date = datetime.strptime("2016-06-11", "%Y-%m-%d")
+        end_date = datetime.strptime("2016-06-15", "%Y-%m-%d")
+        self.assertEqual(checkpoint_ids, collection.list_ids(
+            project_id=project_id, provider_id=provider_id,
+            start_date=start_date, end_date=end_date))
+        self.assertEqual(checkpoint_ids[1:2], collection.list_ids(
+            project_id=project_id, provider_id=provider_id,
+            start_date=start_date, end_date=end_date,
+            marker=checkpoint_ids[0], limit=1))
+        self.assertEqual(checkpoint_ids[2:], collection.list_ids(
+            project_id=project_id, provider_id=provider_id,
+            plan_id=plan['id'], start_date=start_date, end_date=end_date,
+            marker=checkpoint_ids[1]))
+
+    def test_list_checkpoints_by_long_date_range(self):
+        self.override_config('checkpoint_fetch_concurrency', 2)
+        collection = self._create_test_collection()
+        plan = fake_protection_plan()
+        checkpoint_ids = []
+        for day in ("2016-06-12", "2016-06-13", "2016-06-14"):
+            date = datetime.strptime(day, "%Y-%m-%d")
+            with mock.patch.object(timeutils, 'utcnow', return_value=date):
+                checkpoint_ids.append(collection.create(plan).id)
+
+        with mock.patch.object(
+                collection._indices_section, 'list_objects',
+                wraps=collection._indices_section.list_objects) as mock_list:
+            self.assertEqual(checkpoint_ids[:2], collection.list_ids(
+                project_id=plan['project_id'],
+                provider_id=plan['provider_id'], limit=2,
+                start_date=datetime.strptime("2016-06-12", "%Y-%m-%d"),
+                end_date=datetime.strptime("2019-06-12", "%Y-%m-%d")))
+        # The days after the first batch are not listed
+        self.assertEqual(2, mock_list.call_count)
+        self.assertEqual(['/by-date/2016-06-12/%s/' % plan['project_id'],
+                          '/by-date/2016-06-13/%s/' % plan['project_id']],
+                         [call[1]['prefix']
+                          for call in mock_list.call_args_list])
+
     def test_delete_checkpoint(self):
         collection = self._create_test_collection()
         plan = fake_protection_plan()
@@ -18,6 +18,8 @@ from karbor import exception
 from karbor.resource import Resource
 from karbor.services.protection import bank_plugin
 from karbor.services.protection import client_factory
+from karbor.services.protection.protection_plugins.volume \
+    import cinder_protection_plugin
 from karbor.services.protection.protection_plugins.volume. \
     cinder_protection_plugin import CinderBackupProtectionPlugin
 from karbor.services.protection.protection_plugins.volume \
@@ -466,3 +468,19 @@ class CinderProtectionPluginTest(base.TestCase):
     def test_get_supported_resources_types(self):
         types = self.plugin.get_supported_resources_types()
         self.assertEqual([constants.VOLUME_RESOURCE_TYPE], types)
+
+    def test_list_resource_statuses(self):
+        backups = mock.Mock()
+        backups.list.return_value = [
+            mock.Mock(id='backup_%d' % i, status='creating')
+            for i in range(3)]
+        self.assertEqual(
+            {'backup_0': 'creating', 'backup_2': 'creating'},
+            cinder_protection_plugin.list_resource_statuses(
+                backups, ['backup_0', 'backup_2', 'backup_old']))
+        backups.list.assert_called_once_with(detailed=True, limit=20)
+
+        backups.list.reset_mock()
+        cinder_protection_plugin.list_resource_statuses(
+            backups, ['backup_%d' % i for i in range(10)])
+        backups.list.assert_called_once_with(detailed=True, limit=40)
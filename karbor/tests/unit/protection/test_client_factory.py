@@ -0,0 +1,94 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo_config import cfg
+from oslo_utils import timeutils
+
+from karbor.context import RequestContext
+from karbor.services.protection import client_factory
+from karbor.tests import base
+
+
+class ClientFactoryTest(base.TestCase):
+    def setUp(self):
+        super(ClientFactoryTest, self).setUp()
+        cfg.CONF.set_default('cinder_endpoint',
+                             'http://127.0.0.1:8776/v3',
+                             'cinder_client')
+        cfg.CONF.set_default('glance_endpoint',
+                             'http://127.0.0.1:9292',
+                             'glance_client')
+        self.context = RequestContext(user_id='demo',
+                                      project_id='abcd',
+                                      auth_token='efgh')
+        self.factory = client_factory.ClientFactory
+
+    def test_create_client_cached(self):
+        cinder_client = self.factory.create_client('cinder', self.context)
+        self.assertIs(cinder_client,
+                      self.factory.create_client('cinder', self.context))
+        glance_client = self.factory.create_client('glance', self.context)
+        self.assertIsNot(cinder_client, glance_client)
+
+        other_context = RequestContext(user_id='demo',
+                                       project_id='abcd',
+                                       auth_token='ijkl')
+        self.assertIsNot(cinder_client,
+                         self.factory.create_client('cinder', other_context))
+        self.assertEqual({'size': 3, 'hits': 1, 'misses': 3},
+                         self.factory.cache_stats())
+
+    def test_create_client_not_cached(self):
+        self.override_config('client_cache_size', 0)
+        self.assertIsNot(self.factory.create_client('cinder', self.context),
+                         self.factory.create_client('cinder', self.context))
+
+    def test_cache_key(self):
+        self.assertEqual(('cinder', 'abcd', 'efgh', False),
+                         self.factory._cache_key(
+                             'cinder', self.context, cfg.CONF, False, {}))
+        self.assertIsNone(self.factory._cache_key(
+            'cinder', self.context, cfg.ConfigOpts(), False, {}))
+        self.assertIsNone(self.factory._cache_key(
+            'cinder', None, cfg.CONF, False, {}))
+        self.assertEqual(('cinder', None, None, True),
+                         self.factory._cache_key(
+                             'cinder', None, cfg.CONF, True, {}))
+
+    def test_create_client_token_expiry(self):
+        expires_at = timeutils.utcnow() + datetime.timedelta(minutes=5)
+        context = RequestContext(
+            user_id='demo', project_id='abcd', auth_token='efgh',
+            auth_token_info={'token': {
+                'expires_at': expires_at.isoformat() + 'Z'}})
+        client = self.factory.create_client('cinder', context)
+        self.assertIs(client, self.factory.create_client('cinder', context))
+
+        with mock.patch.object(client_factory.timeutils,
+                               'utcnow') as mock_utcnow:
+            mock_utcnow.return_value = expires_at - datetime.timedelta(
+                seconds=30)
+            self.assertIsNot(client,
+                             self.factory.create_client('cinder', context))
+
+    def test_sessions_share_http_session(self):
+        plugin = mock.Mock()
+        with mock.patch.object(self.factory, 'get_keystone_plugin',
+                               return_value=plugin):
+            session1 = self.factory._generate_session(self.context, 'cinder')
+            session2 = self.factory._generate_session(self.context, 'nova')
+        self.assertIsNot(session1, session2)
+        self.assertIs(session1.session, session2.session)
+        self.assertIs(self.factory.get_http_session(), session1.session)
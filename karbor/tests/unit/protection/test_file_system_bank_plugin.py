@@ -80,3 +80,18 @@ class FileSystemBankPluginTest(base.TestCase):
         value = self.fs_bank_plugin.get_object(
             "/index.json")
         self.assertEqual({"key": "value"}, value)
+
+    def test_delete_objects(self):
+        keys = ["/dir/key-1", "/dir/key-2", "/dir/sub/key-3", "/key-4"]
+        self.fs_bank_plugin.update_objects({key: "value" for key in keys})
+        self.fs_bank_plugin.delete_objects(keys[1:])
+        container_path = self.fs_bank_plugin.object_container_path
+        self.assertTrue(os.path.isfile(container_path + "/dir/key-1"))
+        self.assertFalse(os.path.exists(container_path + "/dir/sub"))
+        self.assertFalse(os.path.exists(container_path + "/key-4"))
+
+        self.fs_bank_plugin.delete_objects(keys[:1])
+        self.assertFalse(os.path.exists(container_path + "/dir"))
+        self.assertTrue(os.path.isdir(container_path))
+        self.assertRaises(exception.BankDeleteObjectFailed,
+                          self.fs_bank_plugin.delete_objects, keys[:1])
@@ -163,6 +163,63 @@ class GraphBuilderTest(base.TestCase):
                 '[["0x1", ["0x0"]]]]'
             ])
 
+    def test_resource_graph_encode_decode(self):
+        resource_a = resource.Resource('server', 'a', 'a', {'name': 'a'})
+        resource_b = resource.Resource('volume', 'b', 'b')
+        resource_c = resource.Resource('volume', 'c', 'c')
+        resource_d = resource.Resource('image', 'd', 'd')
+        test_base = {
+            resource_a: [resource_b, resource_c],
+            resource_b: [resource_d],
+            resource_c: [resource_d],
+            resource_d: [],
+        }
+        test_graph = graph.build_graph([resource_a, resource_b, resource_c,
+                                        resource_d], test_base.__getitem__)
+        encoded = graph.encode_resource_graph(test_graph)
+        self.assertEqual(4, len(encoded['nodes']))
+        self.assertEqual(['image', 'd', 'volume', 'b', 'c', 'server', 'a'],
+                         encoded['strings'])
+        decoded = graph.decode_resource_graph(
+            jsonutils.loads(jsonutils.dumps(encoded)))
+        self.assertEqual(test_graph, decoded)
+        self.assertEqual({'name': 'a'}, decoded[0].value.extra_info)
+        root_children = decoded[0].child_nodes
+        self.assertIs(root_children[0].child_nodes[0],
+                      root_children[1].child_nodes[0])
+
+    def test_resource_graph_decode_invalid(self):
+        resource_a = resource.Resource('server', 'a', 'a')
+        resource_b = resource.Resource('volume', 'b', 'b')
+        test_graph = graph.build_graph(
+            [resource_a], {resource_a: [resource_b], resource_b: []}.get)
+        encoded = graph.encode_resource_graph(test_graph)
+
+        unordered = dict(encoded, nodes=encoded['nodes'][::-1],
+                         children=[[1], []])
+        self.assertRaisesRegex(exception.InvalidInput, "topologically",
+                               graph.decode_resource_graph, unordered)
+        self.assertRaisesRegex(exception.InvalidInput, "version",
+                               graph.decode_resource_graph,
+                               dict(encoded, version=0))
+
+    def test_index_resource_graph(self):
+        test_base = {
+            "A1": ["B1", "B2"],
+            "B1": ["C1"],
+            "B2": ["C1"],
+            "C1": [],
+        }
+        test_resources = {key: resource.Resource('type', key, key)
+                          for key in test_base}
+        test_graph = graph.build_graph(
+            [test_resources["A1"]],
+            lambda r: [test_resources[key] for key in test_base[r.id]])
+        index = graph.index_resource_graph(test_graph)
+        self.assertEqual(set(test_base), set(index))
+        self.assertIs(test_graph[0], index["A1"])
+        self.assertEqual(test_resources["C1"], index["C1"].value)
+
     def test_graph_deserialize_unordered_adjacency(self):
         test_base = {
             "A1": ["B1", "B2"],
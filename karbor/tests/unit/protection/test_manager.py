@@ -15,6 +15,7 @@ import mock
 from oslo_config import cfg
 import oslo_messaging
 
+from karbor.common import constants
 from karbor import exception
 from karbor.resource import Resource
 from karbor.services.protection.flows import utils
@@ -113,6 +114,37 @@ class ProtectionServiceTest(base.TestCase):
                            'extra_info': None}],
                          result)
 
+    @mock.patch.object(protectable_registry.ProtectableRegistry,
+                       'fetch_dependent_resources_bulk')
+    @mock.patch.object(protectable_registry.ProtectableRegistry,
+                       'list_resources')
+    def test_list_protectable_instances_with_dependents(
+            self, mock_list_resources, mock_fetch_dependents):
+        server1 = Resource(type='OS::Nova::Server', id='123456',
+                           name='name123')
+        server2 = Resource(type='OS::Nova::Server', id='654321',
+                           name='name654')
+        mock_list_resources.return_value = [server1, server2]
+        mock_fetch_dependents.return_value = {
+            server1: [Resource(type='OS::Cinder::Volume', id='vol1',
+                               name='vol1')],
+            server2: []}
+        fake_cntx = mock.MagicMock()
+
+        result = self.pro_manager.list_protectable_instances_with_dependents(
+            fake_cntx, 'OS::Nova::Server')
+        mock_fetch_dependents.assert_called_once_with(fake_cntx,
+                                                      [server1, server2])
+        self.assertEqual([{'id': '123456', 'name': 'name123',
+                           'extra_info': None,
+                           'dependent_resources': [
+                               {'type': 'OS::Cinder::Volume', 'id': 'vol1',
+                                'name': 'vol1', 'extra_info': None}]},
+                          {'id': '654321', 'name': 'name654',
+                           'extra_info': None,
+                           'dependent_resources': []}],
+                         result)
+
     @mock.patch.object(protectable_registry.ProtectableRegistry,
                        'fetch_dependent_resources')
     def test_list_protectable_dependents(self, mocker):
@@ -146,6 +178,46 @@ class ProtectionServiceTest(base.TestCase):
                           None,
                           fakes.fake_protection_plan())
 
+    @mock.patch.object(manager.ProtectionManager, '_spawn')
+    @mock.patch.object(flow_manager.Worker, 'run_flow')
+    @mock.patch.object(flow_manager.Worker, 'get_flow')
+    @mock.patch.object(provider.ProviderRegistry, 'show_provider')
+    def test_protect_async(self, mock_provider, mock_get_flow,
+                           mock_run_flow, mock_spawn):
+        self.override_config('async_protect', True)
+        mock_provider.return_value = fakes.FakeProvider()
+        checkpoint_id = self.pro_manager.protect(
+            None, fakes.fake_protection_plan())
+        self.assertEqual('fake_checkpoint', checkpoint_id)
+        mock_get_flow.assert_not_called()
+
+        func, args = mock_spawn.call_args[0][0], mock_spawn.call_args[0][1:]
+        func(*args)
+        mock_get_flow.assert_called_once()
+        mock_run_flow.assert_called_once_with(mock_get_flow.return_value)
+
+    @mock.patch.object(manager.ProtectionManager, '_spawn')
+    @mock.patch.object(flow_manager.Worker, 'run_flow')
+    @mock.patch.object(flow_manager.Worker, 'get_flow')
+    @mock.patch.object(fakes.FakeCheckpointCollection, 'create')
+    @mock.patch.object(provider.ProviderRegistry, 'show_provider')
+    def test_protect_async_in_error(self, mock_provider, mock_create,
+                                    mock_get_flow, mock_run_flow,
+                                    mock_spawn):
+        self.override_config('async_protect', True)
+        mock_provider.return_value = fakes.FakeProvider()
+        checkpoint = fakes.FakeCheckpoint()
+        checkpoint.status = constants.CHECKPOINT_STATUS_PROTECTING
+        mock_create.return_value = checkpoint
+        mock_get_flow.side_effect = Exception()
+        self.pro_manager.protect(None, fakes.fake_protection_plan())
+
+        func, args = mock_spawn.call_args[0][0], mock_spawn.call_args[0][1:]
+        func(*args)
+        self.assertEqual(constants.CHECKPOINT_STATUS_ERROR,
+                         checkpoint.status)
+        mock_run_flow.assert_not_called()
+
     @mock.patch.object(provider.ProviderRegistry, 'show_provider')
     def test_show_checkpoint(self, mock_provider):
         mock_provider.return_value = fakes.FakeProvider()
@@ -20,6 +20,8 @@ from karbor.services.protection.bank_plugin import BankSection
 from karbor.services.protection import client_factory
 from karbor.services.protection.protection_plugins.network \
     import network_plugin_schemas
+from karbor.services.protection.protection_plugins.network \
+    import neutron_protection_plugin
 from karbor.services.protection.protection_plugins.network. \
     neutron_protection_plugin import NeutronProtectionPlugin
 from karbor.tests import base
@@ -204,20 +206,20 @@ def call_hooks(operation, checkpoint, resource, context, parameters, **kwargs):
 
 
 class FakeNeutronClient(object):
-    def list_networks(self):
-        return FakeNetworks
+    def list_networks(self, **kwargs):
+        return [FakeNetworks]
 
-    def list_subnets(self):
-        return FakeSubnets
+    def list_subnets(self, **kwargs):
+        return [FakeSubnets]
 
-    def list_ports(self):
-        return FakePorts
+    def list_ports(self, **kwargs):
+        return [FakePorts]
 
-    def list_routers(self):
-        return FakeRoutes
+    def list_routers(self, **kwargs):
+        return [FakeRoutes]
 
-    def list_security_groups(self):
-        return FakeSecGroup
+    def list_security_groups(self, **kwargs):
+        return [FakeSecGroup]
 
 
 class FakeBankPlugin(BankPlugin):
@@ -324,23 +326,56 @@ class NeutronProtectionPluginTest(base.TestCase):
         mock_neutron_create.return_value = self.neutron_client
 
         self.neutron_client.list_networks = mock.MagicMock()
-        self.neutron_client.list_networks.return_value = FakeNetworks
+        self.neutron_client.list_networks.return_value = [FakeNetworks]
 
         self.neutron_client.list_subnets = mock.MagicMock()
-        self.neutron_client.list_subnets.return_value = FakeSubnets
+        self.neutron_client.list_subnets.return_value = [FakeSubnets]
 
         self.neutron_client.list_ports = mock.MagicMock()
-        self.neutron_client.list_ports.return_value = FakePorts
+        self.neutron_client.list_ports.return_value = [FakePorts]
 
         self.neutron_client.list_routers = mock.MagicMock()
-        self.neutron_client.list_routers.return_value = FakeRoutes
+        self.neutron_client.list_routers.return_value = [FakeRoutes]
 
         self.neutron_client.list_security_groups = mock.MagicMock()
-        self.neutron_client.list_security_groups.return_value = FakeSecGroup
+        self.neutron_client.list_security_groups.return_value = [
+            FakeSecGroup]
 
         call_hooks(protect_operation, self.checkpoint, resource, self.cntxt,
                    {})
 
+        list_kwargs = self.neutron_client.list_ports.call_args[1]
+        self.assertFalse(list_kwargs['retrieve_all'])
+        self.assertEqual(1000, list_kwargs['limit'])
+        self.assertIn('fixed_ips', list_kwargs['fields'])
+        metadata = [call[0][1]
+                    for call in fake_bank_section.update_object.call_args_list
+                    if call[0][0] == "metadata"][0]
+        self.assertEqual(
+            {network['id'] for network in FakeNetworks['networks']},
+            set(metadata['network_metadata']))
+        for network in metadata['network_metadata'].values():
+            self.assertNotIn('provider:network_type', network)
+        self.assertEqual(len(FakePorts['ports']),
+                         len(metadata['port_metadata']))
+
+    def test_list_resources_by_page(self):
+        protect_operation = neutron_protection_plugin.ProtectOperation(2)
+        neutron_client = mock.Mock()
+        ports = [{'id': 'port-%d' % i, 'name': 'port', 'binding:host_id': 'h'}
+                 for i in range(3)]
+        neutron_client.list_ports.return_value = iter([
+            {'ports': ports[:2]}, {'ports': ports[2:]}])
+        ports_metadata = protect_operation._list_resources(
+            self.cntxt, neutron_client, 'ports', ['id', 'name'])
+        neutron_client.list_ports.assert_called_once_with(
+            retrieve_all=False, project_id=self.cntxt.project_id,
+            fields=['id', 'name'], limit=2)
+        self.assertEqual(
+            {port['id']: {'id': port['id'], 'name': 'port'}
+             for port in ports},
+            ports_metadata)
+
     @mock.patch('karbor.services.protection.clients.neutron.create')
     def test_delete_backup(self, mock_neutron_create):
         resource = Resource(id="network_id_1",
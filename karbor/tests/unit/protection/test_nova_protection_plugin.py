@@ -11,6 +11,7 @@
 #    under the License.
 
 from collections import namedtuple
+import greenlet
 import mock
 from oslo_config import cfg
 
@@ -196,11 +197,15 @@ class FakeCinderClient(object):
 
 
 class FakeNeutronClient(object):
-    def list_ports(self, mac_address):
+    def list_ports(self, mac_address=None, device_id=None):
         result_ports = []
         for port in FakePorts["ports"]:
-            if port["mac_address"] == mac_address:
-                result_ports.append(port)
+            if mac_address is not None and (
+                    port["mac_address"] != mac_address):
+                continue
+            if device_id is not None and port["device_id"] not in device_id:
+                continue
+            result_ports.append(port)
         return {"ports": result_ports}
 
 
@@ -259,6 +264,11 @@ class Checkpoint(object):
     def resource_graph(self, resource_graph):
         self.graph = resource_graph
 
+    def get_resource_graph_node(self, resource_id):
+        for resource_node in self.graph:
+            if resource_node.value.id == resource_id:
+                return resource_node
+
     def get_resource_bank_section(self, resource_id):
         return BankSection(
             bank=fake_bank,
@@ -415,6 +425,65 @@ class NovaProtectionPluginTest(base.TestCase):
             resource_definition
         )
 
+    @mock.patch('karbor.services.protection.clients.neutron.create')
+    @mock.patch('karbor.services.protection.clients.glance.create')
+    @mock.patch('karbor.services.protection.clients.nova.create')
+    @mock.patch('karbor.services.protection.clients.cinder.create')
+    def test_create_backup_prefetch(self, mock_cinder_client,
+                                    mock_nova_client,
+                                    mock_glance_client,
+                                    mock_neutron_client):
+        mock_cinder_client.return_value = self.cinder_client
+        mock_nova_client.return_value = self.nova_client
+        mock_glance_client.return_value = self.glance_client
+        neutron_client = mock.Mock(wraps=self.neutron_client)
+        mock_neutron_client.return_value = neutron_client
+        checkpoint = Checkpoint()
+        checkpoint.resource_graph = [
+            FakeGraphNode(value=Resource(
+                type=constants.SERVER_RESOURCE_TYPE, id=server_id,
+                name='None'), child_nodes=())
+            for server_id in ('vm_id_1', 'vm_id_2')]
+
+        for server_id in ('vm_id_1', 'vm_id_2'):
+            resource = Resource(id=server_id,
+                                type=constants.SERVER_RESOURCE_TYPE,
+                                name="fake_vm")
+            protect_operation = self.plugin.get_protect_operation(resource)
+            call_hooks(protect_operation, checkpoint, resource, self.cntxt,
+                       {})
+
+        neutron_client.list_ports.assert_called_once_with(
+            device_id=['vm_id_1', 'vm_id_2'])
+        for server_id, network_id in (('vm_id_1', 'network_id_1'),
+                                      ('vm_id_2', 'network_id_2')):
+            metadata = fake_bank._plugin._objects[
+                "/resource_data/checkpoint_id/%s/metadata" % server_id]
+            self.assertEqual([network_id],
+                             metadata["server_metadata"]["networks"])
+        self.assertEqual({}, self.plugin._prefetch._prefetches)
+
+        # Protecting the checkpoint again lists the ports again
+        protect_operation = self.plugin.get_protect_operation(resource)
+        call_hooks(protect_operation, checkpoint, resource, self.cntxt, {})
+        self.assertEqual(2, neutron_client.list_ports.call_count)
+
+    def test_prefetch_killed(self):
+        checkpoint = Checkpoint()
+        checkpoint.resource_graph = [
+            FakeGraphNode(value=Resource(
+                type=constants.SERVER_RESOURCE_TYPE, id=server_id,
+                name='None'), child_nodes=())
+            for server_id in ('vm_id_1', 'vm_id_2')]
+        prefetch = self.plugin._prefetch
+        with mock.patch.object(prefetch, '_fetch',
+                               side_effect=greenlet.GreenletExit):
+            self.assertRaises(greenlet.GreenletExit, prefetch.get,
+                              checkpoint, self.cntxt)
+        # The other servers don't wait for the killed prefetch
+        self.assertEqual(({}, {}), prefetch.get(checkpoint, self.cntxt))
+        self.assertEqual({}, prefetch._prefetches)
+
     @mock.patch('karbor.services.protection.clients.glance.create')
     def test_delete_backup(self, mock_glance_client):
         resource = Resource(id="vm_id_1",
@@ -10,6 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+import mock
+from oslo_utils import timeutils
+
+from karbor.exception import ListProtectableResourceFailed
 from karbor.resource import Resource
 from karbor.services.protection.protectable_plugin import ProtectablePlugin
 from karbor.services.protection.protectable_registry import ProtectableRegistry
@@ -49,6 +54,26 @@ class _FakeProtectablePlugin(ProtectablePlugin):
         return self.graph[parent_resource]
 
 
+class _FakeBulkProtectablePlugin(_FakeProtectablePlugin):
+    def __init__(self, cntx, conf=None):
+        super(_FakeBulkProtectablePlugin, self).__init__(cntx)
+        self.bulk_calls = []
+        self.bulk_error = False
+
+    def instance(self, cntx, conf=None):
+        new = super(_FakeBulkProtectablePlugin, self).instance(cntx)
+        new.bulk_calls = self.bulk_calls
+        new.bulk_error = self.bulk_error
+        return new
+
+    def get_dependent_resources_bulk(self, context, parent_resources):
+        self.bulk_calls.append(list(parent_resources))
+        if self.bulk_error:
+            raise ListProtectableResourceFailed(type=_FAKE_TYPE,
+                                                reason='fake')
+        return {parent: self.graph[parent] for parent in parent_resources}
+
+
 class ProtectableRegistryTest(base.TestCase):
     def setUp(self):
         super(ProtectableRegistryTest, self).setUp()
@@ -88,3 +113,125 @@ class ProtectableRegistryTest(base.TestCase):
             found = set(child.value for child in item.child_nodes)
             self.assertEqual(expected, found)
             self.assert_graph(item.child_nodes, g_dict)
+
+    def test_graph_building_bulk(self):
+        plugin = _FakeBulkProtectablePlugin(None)
+        self.protectable_registry.register_plugin(plugin)
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        B = Resource(_FAKE_TYPE, "B", 'nameB')
+        C = Resource(_FAKE_TYPE, "C", 'nameC')
+        D = Resource(_FAKE_TYPE, "D", 'nameD')
+        plugin.graph = {A: [C, D], B: [C], C: [D], D: []}
+
+        result_graph = self.protectable_registry.build_graph(None, [A, B])
+        self.assert_graph(result_graph, plugin.graph)
+        self.assertEqual([[A, B], [C, D]], plugin.bulk_calls)
+
+    def test_graph_building_bulk_failed(self):
+        plugin = _FakeBulkProtectablePlugin(None)
+        plugin.bulk_error = True
+        self.protectable_registry.register_plugin(plugin)
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        B = Resource(_FAKE_TYPE, "B", 'nameB')
+        plugin.graph = {A: [B], B: []}
+
+        result_graph = self.protectable_registry.build_graph(None, [A])
+        self.assert_graph(result_graph, plugin.graph)
+        self.assertEqual([[A], [B]], plugin.bulk_calls)
+
+    def test_list_resources_cache(self):
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        self._fake_plugin.graph = {A: []}
+        calls = []
+        list_resources = _FakeProtectablePlugin.list_resources
+
+        def _list_resources(plugin, context, parameters=None):
+            calls.append(parameters)
+            return list(list_resources(plugin, context))
+
+        with mock.patch.object(_FakeProtectablePlugin, 'list_resources',
+                               _list_resources):
+            registry = self.protectable_registry
+            self.assertEqual([[]], registry.list_resources(None, _FAKE_TYPE))
+            self.assertEqual([[]], registry.list_resources(None, _FAKE_TYPE))
+            self.assertEqual(1, len(calls))
+            registry.list_resources(None, _FAKE_TYPE, {'key': 'value'})
+            self.assertEqual(2, len(calls))
+            registry.list_resources(None, _FAKE_TYPE, use_cache=False)
+            self.assertEqual(3, len(calls))
+            with mock.patch.object(timeutils, 'is_older_than',
+                                   return_value=True):
+                registry.list_resources(None, _FAKE_TYPE)
+            self.assertEqual(4, len(calls))
+        self.assertEqual({'size': 2, 'hits': 1, 'misses': 3, 'coalesced': 0},
+                         registry.cache_stats())
+
+    def test_list_resources_cache_coalesced(self):
+        calls = []
+
+        def _list_resources(plugin, context, parameters=None):
+            calls.append(parameters)
+            eventlet.sleep(0.01)
+            return ['resource']
+
+        with mock.patch.object(_FakeProtectablePlugin, 'list_resources',
+                               _list_resources):
+            registry = self.protectable_registry
+            threads = [eventlet.spawn(registry.list_resources, None,
+                                      _FAKE_TYPE) for i in range(3)]
+            results = [thread.wait() for thread in threads]
+        self.assertEqual([['resource']] * 3, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(2, registry.cache_stats()['coalesced'])
+
+    def test_fetch_dependent_resources_bulk_cache(self):
+        plugin = _FakeBulkProtectablePlugin(None)
+        self.protectable_registry.register_plugin(plugin)
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        B = Resource(_FAKE_TYPE, "B", 'nameB')
+        plugin.graph = {A: [B], B: []}
+
+        registry = self.protectable_registry
+        self.assertEqual({A: [B]},
+                         registry.fetch_dependent_resources_bulk(None, [A]))
+        self.assertEqual({A: [B], B: []},
+                         registry.fetch_dependent_resources_bulk(None,
+                                                                 [A, B]))
+        self.assertEqual([[A], [B]], plugin.bulk_calls)
+        registry.build_graph(None, [A])
+        self.assertEqual([[A], [B], [A], [B]], plugin.bulk_calls)
+
+    def test_fetch_dependent_resources_bulk_concurrently(self):
+        events = []
+
+        class _SlowPlugin(_FakeBulkProtectablePlugin):
+            def __init__(self, cntx, resource_type=None):
+                super(_SlowPlugin, self).__init__(cntx)
+                self.resource_type = resource_type
+
+            def instance(self, cntx, conf=None):
+                return self
+
+            def get_resource_type(self):
+                return self.resource_type
+
+            def get_dependent_resources_bulk(self, context, parent_resources):
+                events.append(('start', self.resource_type))
+                eventlet.sleep(0.01)
+                events.append(('end', self.resource_type))
+                return {parent: [Resource(self.resource_type, parent.id,
+                                          parent.name)]
+                        for parent in parent_resources}
+
+        registry = self.protectable_registry
+        registry._plugin_map = {}
+        for resource_type in ('Karbor::Test::Slow1', 'Karbor::Test::Slow2'):
+            registry.register_plugin(_SlowPlugin(None, resource_type))
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+
+        result = registry.fetch_dependent_resources_bulk(None, [A])
+        self.assertEqual(['start', 'start', 'end', 'end'],
+                         [event[0] for event in events])
+        self.assertEqual({A: [Resource('Karbor::Test::Slow1', 'A', 'nameA'),
+                              Resource('Karbor::Test::Slow2', 'A', 'nameA')]},
+                         result)
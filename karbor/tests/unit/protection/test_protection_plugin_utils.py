@@ -0,0 +1,229 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+
+import mock
+
+from karbor import exception
+from karbor.services.protection.bank_plugin import Bank
+from karbor.services.protection.bank_plugin import BankSection
+from karbor.services.protection.protection_plugins import utils
+from karbor.tests import base
+from karbor.tests.unit.protection.test_bank import _InMemoryBankPlugin
+
+
+class BackupImageToBankTest(base.TestCase):
+    def setUp(self):
+        super(BackupImageToBankTest, self).setUp()
+        self.bank = Bank(_InMemoryBankPlugin())
+        self.bank_section = BankSection(self.bank,
+                                        "/resource-data/fake_image/")
+        self.glance_client = mock.MagicMock()
+
+    def _backup(self, image_chunks, object_size, upload_concurrency=1,
+                dedup=False, bank_section=None):
+        self.glance_client.images.data.return_value = iter(image_chunks)
+        return utils.backup_image_to_bank(
+            self.glance_client, 'fake_image',
+            bank_section or self.bank_section,
+            object_size, upload_concurrency=upload_concurrency, dedup=dedup)
+
+    def _chunk_store_objects(self):
+        return sorted(self.bank.list_objects('/chunk-store/data/'))
+
+    def test_backup_image_to_bank(self):
+        image_chunks = [b'a' * 4, b'b' * 4, b'c' * 4, b'd' * 2]
+        chunks_num = self._backup(image_chunks, 8, upload_concurrency=2)
+        self.assertEqual(2, chunks_num)
+        self.assertEqual(b'aaaabbbb', self.bank_section.get_object('data_1'))
+        self.assertEqual(b'ccccdd', self.bank_section.get_object('data_2'))
+
+    def test_backup_image_to_bank_unaligned_chunks(self):
+        image_chunks = [b'a' * 5, b'b' * 7, b'c' * 4]
+        chunks_num = self._backup(image_chunks, 8)
+        self.assertEqual(2, chunks_num)
+        self.assertEqual(b'aaaaabbb', self.bank_section.get_object('data_1'))
+        self.assertEqual(b'bbbbcccc', self.bank_section.get_object('data_2'))
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self.bank_section.get_object, 'data_3')
+
+    def test_backup_empty_image_to_bank(self):
+        self.assertEqual(0, self._backup([], 8))
+        self.assertEqual([], self.bank_section.list_objects())
+
+    def test_backup_image_to_bank_upload_failed(self):
+        self.bank_section.update_object = mock.MagicMock(
+            side_effect=exception.BankUpdateObjectFailed(reason='fake',
+                                                         key='data_1'))
+        self.assertRaises(exception.BankUpdateObjectFailed,
+                          self._backup, [b'a' * 16, b'b' * 16], 8)
+
+    def test_backup_image_to_bank_dedup(self):
+        image_chunks = [b'a' * 8, b'b' * 8, b'a' * 8]
+        chunks_num = self._backup(image_chunks, 8, upload_concurrency=2,
+                                  dedup=True)
+        self.assertEqual(3, chunks_num)
+        digests = self.bank_section.get_object('chunks')
+        self.assertEqual(3, len(digests))
+        self.assertEqual(digests[0], digests[2])
+        self.assertEqual(2, len(self._chunk_store_objects()))
+        self.assertNotIn('data_1', self.bank_section.list_objects())
+
+        other_section = BankSection(self.bank, "/resource-data/other/")
+        self._backup(image_chunks, 8, dedup=True, bank_section=other_section)
+        self.assertEqual(digests, other_section.get_object('chunks'))
+        self.assertEqual(2, len(self._chunk_store_objects()))
+
+    def test_restore_image_from_bank_dedup(self):
+        self._backup([b'a' * 8, b'b' * 4], 8, dedup=True)
+        self.bank_section.update_object('metadata', {
+            'chunks_num': 2,
+            'image_metadata': {'disk_format': 'raw',
+                               'container_format': 'bare',
+                               'checksum': 'fake_checksum'}})
+        self.glance_client.images.get.return_value = mock.MagicMock(
+            checksum='fake_checksum')
+        utils.restore_image_from_bank(self.glance_client, self.bank_section,
+                                      'restored')
+        image_data = self.glance_client.images.upload.call_args[0][1]
+        self.assertEqual(b'aaaaaaaa', image_data.read())
+        self.assertEqual(b'bbbb', image_data.read())
+
+    def test_delete_image_from_bank_dedup(self):
+        other_section = BankSection(self.bank, "/resource-data/other/")
+        self._backup([b'a' * 8, b'b' * 8], 8, dedup=True)
+        self._backup([b'a' * 8], 8, dedup=True, bank_section=other_section)
+        self.bank_section.update_object('status', 'deleting')
+
+        utils.delete_image_from_bank(self.bank_section, concurrency=2)
+        self.assertEqual(['status'], self.bank_section.list_objects())
+        self.assertEqual(1, len(list(self.bank.list_objects(
+            '/chunk-store/refs/'))))
+        self.assertEqual(1, len(self._chunk_store_objects()))
+
+        utils.delete_image_from_bank(other_section)
+        self.assertEqual([], list(self.bank.list_objects(
+            '/chunk-store/refs/')))
+        self.assertEqual([], self._chunk_store_objects())
+
+    def test_backup_image_to_bank_dedup_object_deleted(self):
+        other_section = BankSection(self.bank, "/resource-data/other/")
+        self._backup([b'a' * 8], 8, dedup=True, bank_section=other_section)
+        put = utils._ChunkStore.put
+
+        def _put(chunk_store, digest, data):
+            stored = put(chunk_store, digest, data)
+            # A release of the other reference which missed this one in a
+            # stale listing deletes the object
+            chunk_store.section.delete_object(chunk_store.data_key(digest))
+            return stored
+
+        with mock.patch.object(utils._ChunkStore, 'put', _put):
+            self.assertRaises(Exception, self._backup, [b'a' * 8], 8,
+                              dedup=True)
+        self.assertNotIn('chunks', self.bank_section.list_objects())
+        self.assertEqual(['/chunk-store/refs/%s/resource-data@other' %
+                          hashlib.sha256(b'a' * 8).hexdigest()],
+                         list(self.bank.list_objects('/chunk-store/refs/')))
+
+    def test_backup_image_to_bank_dedup_upload_failed(self):
+        other_section = BankSection(self.bank, "/resource-data/other/")
+        self._backup([b'a' * 8], 8, dedup=True, bank_section=other_section)
+        put = utils._ChunkStore.put
+
+        def _put(chunk_store, digest, data):
+            if data == b'b' * 8:
+                raise exception.BankUpdateObjectFailed(reason='fake',
+                                                       key=digest)
+            return put(chunk_store, digest, data)
+
+        with mock.patch.object(utils._ChunkStore, 'put', _put):
+            self.assertRaises(exception.BankUpdateObjectFailed,
+                              self._backup, [b'a' * 8, b'b' * 8], 8,
+                              dedup=True)
+        self.assertNotIn('chunks', self.bank_section.list_objects())
+        self.assertEqual(1, len(self._chunk_store_objects()))
+        self.assertEqual(1, len(list(self.bank.list_objects(
+            '/chunk-store/refs/'))))
+
+
+class StatusPollTest(base.TestCase):
+    @mock.patch.object(utils.random, 'uniform', return_value=1)
+    @mock.patch.object(utils.eventlet, 'sleep')
+    def test_status_poll_backoff(self, mock_sleep, mock_uniform):
+        get_status = mock.Mock(side_effect=['creating'] * 4 + ['available'])
+        self.assertTrue(utils.status_poll(
+            get_status, interval=5, success_statuses={'available'},
+            ignore_statuses={'creating'}))
+        self.assertEqual([mock.call(delay) for delay in (1, 2, 4, 5, 5)],
+                         mock_sleep.call_args_list)
+
+    def test_status_poll_failure(self):
+        get_status = mock.Mock(side_effect=['creating', 'unknown'])
+        self.assertFalse(utils.status_poll(
+            get_status, interval=0, success_statuses={'available'},
+            failure_statuses={'error'}, ignore_statuses={'creating'}))
+
+    def _shared_poll(self, resource_id, list_statuses, get_status=None):
+        return utils.eventlet.spawn(
+            utils.status_poll, get_status or mock.Mock(), interval=0,
+            success_statuses={'available'}, failure_statuses={'error'},
+            ignore_statuses={'creating'}, poll_group='test.poll',
+            resource_id=resource_id, list_statuses_func=list_statuses)
+
+    def test_status_poll_shared(self):
+        list_statuses = mock.Mock(side_effect=[
+            {'a': 'creating', 'b': 'available', 'c': 'creating'},
+            {'a': 'available', 'c': 'error'},
+        ])
+        threads = [self._shared_poll(resource_id, list_statuses)
+                   for resource_id in ('a', 'b', 'c')]
+        self.assertEqual([True, True, False],
+                         [thread.wait() for thread in threads])
+        self.assertEqual([mock.call(['a', 'b', 'c']), mock.call(['a', 'c'])],
+                         list_statuses.call_args_list)
+
+    def test_status_poll_shared_list_failed(self):
+        list_statuses = mock.Mock(side_effect=Exception('fake'))
+        get_a = mock.Mock(return_value='available')
+        get_b = mock.Mock(side_effect=Exception('get failed'))
+        thread_a = self._shared_poll('a', list_statuses, get_a)
+        thread_b = self._shared_poll('b', list_statuses, get_b)
+        self.assertTrue(thread_a.wait())
+        self.assertRaises(Exception, thread_b.wait)
+        self.assertEqual(1, list_statuses.call_count)
+        self.assertEqual(1, get_a.call_count)
+
+    def test_status_poll_shared_notified_while_polling(self):
+        poller = utils._get_status_poller('test.poll')
+
+        def _get_status():
+            # Notified while the status is being fetched
+            poller.notify('a', 'available')
+            raise Exception('get failed')
+
+        thread = self._shared_poll('a', None, _get_status)
+        self.assertTrue(thread.wait())
+        self.assertIsNone(poller._thread)
+
+    def test_status_poll_shared_poller_failed(self):
+        poller = utils._get_status_poller('test.poll')
+        with mock.patch.object(poller, '_poll',
+                               side_effect=RuntimeError('fake')):
+            thread = self._shared_poll('a', None)
+            self.assertRaises(RuntimeError, thread.wait)
+        self.assertIsNone(poller._thread)
+
+        get_status = mock.Mock(return_value='available')
+        self.assertTrue(self._shared_poll('a', None, get_status).wait())
+
@@ -116,3 +116,27 @@ class ProviderRegistryTest(base.TestCase):
         provider_list = pr.list_providers()
         for provider_node in provider_list:
             self.assertTrue(pr.show_provider(provider_node['id']))
+
+    def test_get_flow_executor_options(self):
+        self.override_config('flow_executor_operations', {'delete': 'serial'})
+        self.override_config('flow_executor_max_workers', 16)
+        fake_provider = fakes.FakeProvider()
+        self.assertEqual(
+            {'executor_type': 'green', 'max_workers': 16,
+             'executor_group': None},
+            fake_provider.get_flow_executor_options('protect'))
+        self.assertEqual(
+            {'executor_type': 'serial', 'max_workers': 16,
+             'executor_group': None},
+            fake_provider.get_flow_executor_options('delete'))
+
+    def test_get_flow_executor_options_provider_pool(self):
+        fake_provider = fakes.FakeProvider()
+        fake_provider._config = mock.Mock()
+        fake_provider._config.provider = mock.Mock(
+            flow_executor=None, flow_executor_operations={},
+            flow_executor_max_workers=4)
+        self.assertEqual(
+            {'executor_type': 'green', 'max_workers': 4,
+             'executor_group': 'test'},
+            fake_provider.get_flow_executor_options('protect'))
@@ -14,9 +14,12 @@ from functools import partial
 import mock
 
 from karbor.common import constants
+from karbor.context import RequestContext
 from karbor.resource import Resource
+from karbor.services.protection import api_limiter
 from karbor.services.protection.flows.workflow import TaskFlowEngine
 from karbor.services.protection import graph
+from karbor.services.protection import protection_plugin
 from karbor.services.protection import resource_flow
 from karbor.tests import base
 from karbor.tests.unit.protection import fakes
@@ -52,7 +55,7 @@ class ResourceFlowTest(base.TestCase):
 
     def _walk_operation(self, protection, operation_type,
                         checkpoint='checkpoint', parameters={}, context=None,
-                        **kwargs):
+                        limiter=None, **kwargs):
         plugin_map = {
             parent_type: protection,
             child_type: protection,
@@ -63,7 +66,8 @@ class ResourceFlowTest(base.TestCase):
                                                  self.taskflow_engine,
                                                  plugin_map,
                                                  self.test_graph,
-                                                 parameters)
+                                                 parameters,
+                                                 limiter=limiter)
 
         store = {
             'checkpoint': checkpoint,
@@ -120,6 +124,23 @@ class ResourceFlowTest(base.TestCase):
             self.assertEqual(mock_operation.on_complete.call_count,
                              len(self.resource_graph))
 
+    @mock.patch('karbor.tests.unit.protection.fakes.FakeProtectionPlugin')
+    def test_resource_flow_limiter(self, mock_protection):
+        fake_operation = fakes.FakeOperation()
+        mock_protection.get_protect_operation.return_value = fake_operation
+        context = RequestContext(user_id='demo', project_id='abcd')
+        limiter = api_limiter.ApiLimiter(concurrency={'cinder': 1})
+        self._walk_operation(mock_protection, constants.OPERATION_PROTECT,
+                             context=context, limiter=limiter)
+
+        for resource in self.resource_graph:
+            invokes = fake_operation.all_invokes[resource]
+            hook_context = invokes['on_main']['context']
+            self.assertIsNot(context, hook_context)
+            self.assertEqual(context.project_id, hook_context.project_id)
+            self.assertIs(limiter,
+                          api_limiter.get_context_limiter(hook_context))
+
     @mock.patch('karbor.tests.unit.protection.fakes.FakeProtectionPlugin')
     def test_resource_flow_parameters(self, mock_protection):
         resource_a1_id = "{}#{}".format(parent_type, 'A1')
@@ -222,3 +243,74 @@ class ResourceFlowTest(base.TestCase):
                             order_list.index(('main', resource_id)))
             self.assertLess(order_list.index(('main', resource_id)),
                             order_list.index(('complete', resource_id)))
+
+    @mock.patch('karbor.tests.unit.protection.fakes.FakeProtectionPlugin')
+    def test_resource_flow_skip_noop_hooks(self, mock_protection):
+        order_list = []
+
+        class _Operation(protection_plugin.Operation):
+            def on_prepare_begin(self, checkpoint, resource, *args,
+                                 **kwargs):
+                order_list.append(('pre_begin', resource.id))
+
+            def on_complete(self, checkpoint, resource, *args, **kwargs):
+                order_list.append(('complete', resource.id))
+
+        mock_protection.get_protect_operation.return_value = _Operation()
+        with mock.patch.object(resource_flow.LOG, 'info') as mock_log:
+            self._walk_operation(mock_protection,
+                                 constants.OPERATION_PROTECT)
+        log_args = mock_log.call_args[0][1]
+        self.assertEqual(6, log_args['tasks'])
+        self.assertEqual(6, log_args['skipped'])
+
+        self.assertEqual(6, len(order_list))
+        self.assertLess(order_list.index(('pre_begin', parent.id)),
+                        order_list.index(('pre_begin', child.id)))
+        self.assertLess(order_list.index(('pre_begin', child.id)),
+                        order_list.index(('pre_begin', grandchild.id)))
+        self.assertLess(order_list.index(('pre_begin', grandchild.id)),
+                        order_list.index(('complete', grandchild.id)))
+        self.assertGreater(order_list.index(('complete', parent.id)),
+                           order_list.index(('complete', child.id)))
+        self.assertGreater(order_list.index(('complete', child.id)),
+                           order_list.index(('complete', grandchild.id)))
+
+    def test_resource_flow_skip_noop_hooks_links(self):
+        class _Operation(protection_plugin.Operation):
+            def on_prepare_finish(self, *args, **kwargs):
+                pass
+
+            def on_main(self, *args, **kwargs):
+                pass
+
+        protection = mock.Mock()
+        protection.get_protect_operation.return_value = _Operation()
+        plugin_map = {
+            parent_type: protection,
+            child_type: protection,
+            grandchild_type: protection,
+        }
+        flow = resource_flow.build_resource_flow(constants.OPERATION_PROTECT,
+                                                 None,
+                                                 self.taskflow_engine,
+                                                 plugin_map,
+                                                 self.test_graph,
+                                                 {})
+        self.assertEqual(6, len(flow))
+        links = set((u.name, v.name) for u, v, _ in flow.iter_links())
+
+        def _name(hook_type, resource):
+            return '{}_{}_{}_{}'.format(constants.OPERATION_PROTECT,
+                                        hook_type, resource.type,
+                                        resource.id)
+        self.assertEqual({
+            (_name('on_prepare_finish', grandchild),
+             _name('on_prepare_finish', child)),
+            (_name('on_prepare_finish', child),
+             _name('on_prepare_finish', parent)),
+            (_name('on_prepare_finish', grandchild),
+             _name('on_main', grandchild)),
+            (_name('on_prepare_finish', child), _name('on_main', child)),
+            (_name('on_prepare_finish', parent), _name('on_main', parent)),
+        }, links)
@@ -0,0 +1,70 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from karbor import context
+from karbor.services.protection import rpcapi
+from karbor.tests import base
+
+
+class ProtectionRpcAPITest(base.TestCase):
+    def setUp(self):
+        super(ProtectionRpcAPITest, self).setUp()
+        self.context = context.get_admin_context()
+        patcher = mock.patch.object(rpcapi.rpc, 'get_client')
+        self.mock_get_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = self.mock_get_client.return_value
+        self.cctxt = self.client.prepare.return_value
+
+    def test_version_cap(self):
+        self.override_config('protection', '1.0', group='upgrade_levels')
+        rpcapi.ProtectionAPI()
+        self.assertEqual(
+            '1.0', self.mock_get_client.call_args[1]['version_cap'])
+
+    def test_list_protectable_instances_with_dependents(self):
+        self.client.can_send_version.return_value = True
+        self.cctxt.call.return_value = [{'id': 'vol1', 'name': 'vol1',
+                                         'dependent_resources': []}]
+        result = rpcapi.ProtectionAPI(
+        ).list_protectable_instances_with_dependents(
+            self.context, protectable_type='OS::Cinder::Volume')
+        self.assertEqual(self.cctxt.call.return_value, result)
+        self.client.prepare.assert_called_once_with(version='1.1')
+        self.assertEqual('list_protectable_instances_with_dependents',
+                         self.cctxt.call.call_args[0][1])
+
+    def test_list_protectable_instances_with_dependents_fallback(self):
+        self.client.can_send_version.return_value = False
+        self.cctxt.call.side_effect = [
+            [{'id': 'server1', 'name': 'a'}, {'id': 'server2', 'name': 'b'}],
+            [{'id': 'vol1', 'type': 'OS::Cinder::Volume'}],
+            [],
+        ]
+        result = rpcapi.ProtectionAPI(
+        ).list_protectable_instances_with_dependents(
+            self.context, protectable_type='OS::Nova::Server')
+        self.assertEqual(
+            [{'id': 'server1', 'name': 'a', 'dependent_resources': [
+                {'id': 'vol1', 'type': 'OS::Cinder::Volume'}]},
+             {'id': 'server2', 'name': 'b', 'dependent_resources': []}],
+            result)
+        self.assertEqual([mock.call(version='1.0')] * 3,
+                         self.client.prepare.call_args_list)
+        self.assertEqual(
+            ['list_protectable_instances', 'list_protectable_dependents',
+             'list_protectable_dependents'],
+            [call[0][1] for call in self.cctxt.call.call_args_list])
+        self.assertEqual(
+            'server2', self.cctxt.call.call_args[1]['protectable_id'])
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from karbor import exception
+from karbor.services.protection import bank_plugin
 from karbor.services.protection.clients import s3
 from karbor.tests import base
 from karbor.tests.unit.protection.fake_s3_client import FakeS3Client
@@ -95,3 +97,51 @@ class S3BankPluginTest(base.TestCase):
         self.s3_bank_plugin.update_object("dict_object", {"key": "value"})
         value = self.s3_bank_plugin.get_object("dict_object")
         self.assertEqual(value, {"key": "value"})
+
+    def _compressed_bank_plugin(self, compression):
+        # Connect before the new plugin, connecting creates the bucket again
+        self.assertIsNotNone(self.s3_bank_plugin.connection)
+        self.override_config('object_compression', compression,
+                             group='bank_plugin')
+        s3_bank_plugin_cls = importutils.import_class(
+            "karbor.services.protection.bank_plugins."
+            "s3_bank_plugin.S3BankPlugin")
+        return s3_bank_plugin_cls(CONF, None)
+
+    def _test_update_compressed_object(self, compression):
+        s3_bank_plugin = self._compressed_bank_plugin(compression)
+        data = b'\0' * 65536
+        s3_bank_plugin.update_object("data", data)
+        stored = self.fake_connection.get_object(
+            s3_bank_plugin.bank_object_bucket, "data")
+        self.assertEqual(compression,
+                         stored['Metadata']['x-object-meta-compression'])
+        self.assertLess(len(stored['Body'].read()), len(data))
+        self.assertEqual(data, s3_bank_plugin.get_object("data"))
+        # Objects are read back whatever the configured codec
+        self.assertEqual(data, self.s3_bank_plugin.get_object("data"))
+
+    def test_update_zlib_compressed_object(self):
+        self._test_update_compressed_object('zlib')
+
+    def test_update_lzma_compressed_object(self):
+        if bank_plugin.lzma is None:
+            self.skipTest('The lzma module is not available')
+        self._test_update_compressed_object('lzma')
+
+    def test_update_compressed_dict_object(self):
+        s3_bank_plugin = self._compressed_bank_plugin('zlib')
+        s3_bank_plugin.update_object("dict_object", {"key": "value"})
+        stored = self.fake_connection.get_object(
+            s3_bank_plugin.bank_object_bucket, "dict_object")
+        self.assertNotIn('x-object-meta-compression', stored['Metadata'])
+        self.assertEqual({"key": "value"},
+                         s3_bank_plugin.get_object("dict_object"))
+
+    def test_delete_objects(self):
+        self.s3_bank_plugin.update_objects({"key-1": "value-1",
+                                            "key-2": "value-2"})
+        self.s3_bank_plugin.delete_objects(["key-1", "key-2"])
+        self.assertEqual([], self.s3_bank_plugin.list_objects())
+        self.assertRaises(exception.BankDeleteObjectFailed,
+                          self.s3_bank_plugin.delete_objects, ["key-1"])
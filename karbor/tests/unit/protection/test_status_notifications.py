@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+import oslo_messaging as messaging
+
+from karbor import rpc
+from karbor.services.protection.protection_plugins import utils
+from karbor.services.protection import status_notifications
+from karbor.tests import base
+
+
+class StatusNotificationEndpointTest(base.TestCase):
+    def setUp(self):
+        super(StatusNotificationEndpointTest, self).setUp()
+        self.endpoint = status_notifications.StatusNotificationEndpoint()
+
+    @mock.patch.object(utils, 'notify_status')
+    def test_notify_status(self, mock_notify):
+        self.endpoint.info({}, 'volume.host', 'volume.create.end',
+                           {'volume_id': 'v1', 'status': 'available'}, {})
+        self.endpoint.error({}, 'volume.host', 'snapshot.create.end',
+                            {'snapshot_id': 's1', 'status': 'error'}, {})
+        self.endpoint.info({}, 'volume.host', 'backup.delete.end',
+                           {'backup_id': 'b1', 'status': 'deleting'}, {})
+        self.endpoint.info({}, 'image.host', 'image.upload',
+                           {'id': 'i1', 'status': 'active'}, {})
+        self.endpoint.info({}, 'compute.host', 'compute.instance.create.end',
+                           {'instance_id': 'n1', 'state': 'active'}, {})
+        self.assertEqual([
+            mock.call('cinder.volume', 'v1', 'available'),
+            mock.call('cinder.snapshot', 's1', 'error'),
+            mock.call('cinder.backup', 'b1', 'not-found'),
+            mock.call('glance.image', 'i1', 'active'),
+            mock.call('nova.server', 'n1', 'ACTIVE'),
+        ], mock_notify.call_args_list)
+
+    @mock.patch.object(utils, 'notify_status')
+    def test_notify_status_ignored(self, mock_notify):
+        self.endpoint.info({}, 'volume.host', 'volume.create.end',
+                           {'status': 'available'}, {})
+        self.endpoint.info({}, 'compute.host', 'compute.instance.update',
+                           {'instance_id': 'n1', 'state': 'unknown'}, {})
+        self.endpoint.info({}, 'network.host', 'network.create.end',
+                           {'id': 'net1', 'status': 'ACTIVE'}, {})
+        mock_notify.assert_not_called()
+
+
+class StatusNotificationListenerTest(base.TestCase):
+    def test_notification_wakes_status_poll(self):
+        listener = status_notifications.StatusNotificationListener()
+        listener.start()
+        self.addCleanup(listener.stop)
+
+        get_status = mock.Mock(return_value='creating')
+        thread = eventlet.spawn(
+            utils.status_poll, get_status, interval=60,
+            success_statuses={'available'}, ignore_statuses={'creating'},
+            poll_group='cinder.volume', resource_id='fake_volume')
+        eventlet.sleep(0)
+
+        notifier = messaging.Notifier(rpc.NOTIFICATION_TRANSPORT,
+                                      publisher_id='volume.host',
+                                      driver='messaging',
+                                      topics=['notifications'])
+        notifier.info({}, 'volume.create.end',
+                      {'volume_id': 'fake_volume', 'status': 'available'})
+        with eventlet.Timeout(5):
+            self.assertTrue(thread.wait())
+        get_status.assert_not_called()
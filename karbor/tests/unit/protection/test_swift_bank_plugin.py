@@ -82,6 +82,11 @@ class SwiftBankPluginTest(base.TestCase):
         value = self.swift_bank_plugin.get_object("key")
         self.assertEqual("value", value)
 
+    def test_object_exists(self):
+        self.swift_bank_plugin.update_object("key", "value")
+        self.assertTrue(self.swift_bank_plugin.object_exists("key"))
+        self.assertFalse(self.swift_bank_plugin.object_exists("missing"))
+
     def test_list_objects(self):
         self.swift_bank_plugin.update_object("key-1", "value-1")
         self.swift_bank_plugin.update_object("key-2", "value-2")
@@ -102,3 +107,21 @@ class SwiftBankPluginTest(base.TestCase):
         self.swift_bank_plugin.update_object("dict_object", {"key": "value"})
         value = self.swift_bank_plugin.get_object("dict_object")
         self.assertEqual({"key": "value"}, value)
+
+    def test_delete_objects(self):
+        keys = ["key-%d" % i for i in range(5)]
+        self.swift_bank_plugin.update_objects({key: key for key in keys})
+        self.swift_bank_plugin.delete_objects(keys + ["missing"])
+        self.assertEqual(3, self.fake_connection.bulk_deletes)
+        self.assertEqual([], self.swift_bank_plugin.list_objects(prefix=None))
+
+    def test_delete_objects_without_bulk_delete(self):
+        self.fake_connection.capabilities = {}
+        keys = ["key-%d" % i for i in range(5)]
+        self.swift_bank_plugin.update_objects({key: key for key in keys})
+        self.assertEqual({"key-1": "key-1", "key-3": "key-3"},
+                         self.swift_bank_plugin.get_objects(
+                             ["key-1", "key-3"]))
+        self.swift_bank_plugin.delete_objects(keys)
+        self.assertEqual(0, self.fake_connection.bulk_deletes)
+        self.assertEqual([], self.swift_bank_plugin.list_objects(prefix=None))
@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from karbor import exception
 from karbor.services.protection.flows import workflow
 from karbor.tests import base
 
@@ -40,3 +41,33 @@ class WorkFlowTest(base.TestCase):
         self.workflow_engine.add_tasks(flow, task1, task2)
         result = self.workflow_engine.search_task(flow, 'fake_func2')
         self.assertEqual('fake_func2', getattr(result, 'name'))
+
+    def test_get_engine_shared_executor(self):
+        flow = self.workflow_engine.build_flow('test')
+        self.workflow_engine.add_tasks(
+            flow, self.workflow_engine.create_task(fake_func, name='fake'))
+        engine1 = self.workflow_engine.get_engine(flow, max_workers=4)
+        engine2 = self.workflow_engine.get_engine(flow, max_workers=4)
+        engine3 = self.workflow_engine.get_engine(flow, max_workers=8)
+        engine4 = self.workflow_engine.get_engine(
+            flow, max_workers=4, executor_group='fake_provider')
+        executor = engine1.options['executor']
+        self.assertIs(executor, engine2.options['executor'])
+        self.assertIsNot(executor, engine3.options['executor'])
+        self.assertIsNot(executor, engine4.options['executor'])
+        self.workflow_engine.run_engine(engine1)
+
+    def test_get_engine_serial(self):
+        self.override_config('flow_executor', 'serial')
+        flow = self.workflow_engine.build_flow('test')
+        self.workflow_engine.add_tasks(
+            flow, self.workflow_engine.create_task(fake_func, name='fake'))
+        engine = self.workflow_engine.get_engine(flow)
+        self.assertIsNone(engine.options.get('executor'))
+        self.workflow_engine.run_engine(engine)
+
+    def test_get_engine_invalid_executor(self):
+        flow = self.workflow_engine.build_flow('test')
+        self.assertRaises(exception.InvalidInput,
+                          self.workflow_engine.get_engine, flow,
+                          executor_type='process')